@@ -13,5 +13,24 @@ If you want to replace this with a Flask application run:
 and then choose `flask` as template.
 """
 
+import hashlib
+import os
+from functools import lru_cache
+from typing import Tuple
+
 # example constant variable
 NAME = "cube_list_printer"
+
+with open(os.path.join(os.path.dirname(__file__), "VERSION"), encoding="utf-8") as _version_file:
+    VERSION = _version_file.read().strip()
+
+
+@lru_cache(maxsize=None)
+def source_fingerprint(module_files: Tuple[str, ...]) -> str:
+    """Hash of the sources of the given files of this package, for cache keys that must follow code changes."""
+    digest = hashlib.sha256()
+    for name in module_files:
+        with open(os.path.join(os.path.dirname(__file__), name), "rb") as f:
+            digest.update(f"{name}:".encode("utf-8"))
+            digest.update(f.read())
+    return digest.hexdigest()
@@ -0,0 +1,233 @@
+"""
+Print many cubes in one process, loading the Scryfall data and mana icons once.
+
+    cube_list_printer batch data/cubes/*.csv --output-dir out/
+    cube_list_printer batch cubes.yaml --workers 4
+"""
+
+import argparse
+import glob
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import yaml
+
+from cube_list_printer.image_cache import image_cache_from_config
+from cube_list_printer.main import (
+    CONFIG_PATH,
+    attach_images,
+    build_boosters,
+    bulk_data_path,
+    load_config,
+    load_icons,
+    read_boosters,
+    render_pdf,
+)
+from cube_list_printer.metrics import collect, report, set_counter, stage
+
+MANIFEST_EXTENSIONS = (".yaml", ".yml")
+
+
+@dataclass
+class BatchJob:
+    csv_path: str
+    output_path: str
+
+
+@dataclass
+class BatchResult:
+    csv_path: str
+    output_path: str
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def read_manifest(manifest_path: str) -> List[Tuple[str, Optional[str]]]:
+    """
+    Read a YAML list of cubes. Each entry is a CSV path or a mapping with `csv` and optionally `output`.
+    Relative paths are relative to the manifest.
+    """
+    with open(manifest_path, "r") as f:
+        entries = yaml.safe_load(f) or []
+    base_dir = os.path.dirname(manifest_path)
+
+    cubes = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"csv": entry}
+        output = entry.get("output")
+        cubes.append((os.path.join(base_dir, entry["csv"]), os.path.join(base_dir, output) if output else None))
+    return cubes
+
+
+def expand_inputs(inputs: Sequence[str], output_dir: str) -> List[BatchJob]:
+    """
+    Turn CSV paths, globs and manifests into jobs. Cubes without an explicit output are printed to
+    `output_dir`, named after their CSV, or after its path below their common directory where CSVs share a name.
+
+    Raises ValueError if two cubes would still be printed to the same file.
+    """
+    cubes: List[Tuple[str, Optional[str]]] = []
+    for item in inputs:
+        if item.endswith(MANIFEST_EXTENSIONS):
+            cubes.extend(read_manifest(item))
+        else:
+            # A pattern that matches nothing is kept, so the missing file is reported as a failed cube.
+            cubes.extend((path, None) for path in sorted(glob.glob(item)) or [item])
+
+    names = default_output_names([csv_path for csv_path, output_path in cubes if output_path is None])
+    jobs = []
+    printed_to: Dict[str, str] = {}
+    for csv_path, output_path in cubes:
+        if output_path is None:
+            output_path = os.path.join(output_dir, f"{names[csv_path]}.pdf")
+        key = os.path.normcase(os.path.abspath(output_path))
+        if key in printed_to:
+            raise ValueError(f"{printed_to[key]} and {csv_path} would both be printed to {output_path}.")
+        printed_to[key] = csv_path
+        jobs.append(BatchJob(csv_path, output_path))
+    return jobs
+
+
+def default_output_names(csv_paths: Sequence[str]) -> Dict[str, str]:
+    """
+    Name each CSV's PDF after the CSV. CSVs sharing a name, like `cubes/*/boosters.csv`, are named after their
+    path below the directory they have in common instead, e.g. `a_boosters` and `b_boosters`.
+    """
+    stems = Counter(csv_stem(csv_path) for csv_path in csv_paths)
+    clashing = [os.path.abspath(csv_path) for csv_path in csv_paths if stems[csv_stem(csv_path)] > 1]
+    common_dir = os.path.commonpath([os.path.dirname(path) for path in clashing]) if clashing else ""
+
+    names = {}
+    for csv_path in csv_paths:
+        name = csv_stem(csv_path)
+        if stems[name] > 1:
+            name = os.path.splitext(os.path.relpath(os.path.abspath(csv_path), common_dir))[0].replace(os.sep, "_")
+        names[csv_path] = name
+    return names
+
+
+def csv_stem(csv_path: str) -> str:
+    return os.path.splitext(os.path.basename(csv_path))[0]
+
+
+_worker_config: Dict[str, Any] = {}
+_worker_icon_map: Dict[str, Any] = {}
+
+
+def _init_batch_worker(config: Dict[str, Any], icon_map: Dict[str, Any]) -> None:
+    global _worker_config, _worker_icon_map
+    _worker_config = config
+    _worker_icon_map = icon_map
+
+
+def _render_cube(args: Tuple[BatchJob, Dict[str, Any]]) -> BatchResult:
+    job, boosters = args
+    return render_cube(_worker_config, job, boosters, _worker_icon_map, workers=1)
+
+
+def render_cube(
+    config: Dict[str, Any], job: BatchJob, boosters: Dict[str, Any], icon_map: Dict[str, Any], **overrides: Any
+) -> BatchResult:
+    start = time.perf_counter()
+    try:
+        output_dir = os.path.dirname(job.output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        render_pdf(config, boosters, icon_map, job.output_path, **overrides)
+    except Exception as e:
+        return BatchResult(job.csv_path, job.output_path, f"{type(e).__name__}: {e}", time.perf_counter() - start)
+    return BatchResult(job.csv_path, job.output_path, seconds=time.perf_counter() - start)
+
+
+def run_batch(config: Dict[str, Any], jobs: List[BatchJob], workers: int = 1) -> List[BatchResult]:
+    """
+    Print every job's cube, returning one result per job in order. A cube that fails is reported in its
+    result and doesn't stop the others.
+
+    The CSVs are read first so the Scryfall data is looked up once for all of them, and the images of all
+    cubes are fetched together under one rate limit. With `workers` > 1 the cubes are rendered in worker
+    processes, which get the icon map once when they start; each cube is then rendered on a single process.
+    """
+    from cube_list_printer.data_loader import get_booster_scryfall_ids, load_scryfall_map
+
+    results: Dict[int, BatchResult] = {}
+    grouped: Dict[int, Dict[str, Any]] = {}
+    with stage("load_data"):
+        for n, job in enumerate(jobs):
+            try:
+                grouped[n] = read_boosters(config, job.csv_path)
+            except Exception as e:
+                results[n] = BatchResult(job.csv_path, job.output_path, f"{type(e).__name__}: {e}")
+        wanted = set().union(*(get_booster_scryfall_ids(boosters) for boosters in grouped.values()))
+        scryfall_map = load_scryfall_map(bulk_data_path(config), wanted)
+
+    cubes: Dict[int, Dict[str, Any]] = {}
+    with stage("build_boosters"):
+        for n, boosters in grouped.items():
+            try:
+                cubes[n] = build_boosters(boosters, scryfall_map)
+            except Exception as e:
+                results[n] = BatchResult(jobs[n].csv_path, jobs[n].output_path, f"{type(e).__name__}: {e}")
+    del grouped, scryfall_map
+
+    with stage("fetch_images"):
+        attach_images(config, list(cubes.values()), image_cache_from_config(config))
+    icon_map = load_icons(config)
+
+    with stage("generate_pdf"):
+        if workers <= 1 or len(cubes) <= 1:
+            for n, boosters in cubes.items():
+                results[n] = render_cube(config, jobs[n], boosters, icon_map)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(cubes)), initializer=_init_batch_worker, initargs=(config, icon_map)
+            ) as pool:
+                tasks = [(jobs[n], boosters) for n, boosters in cubes.items()]
+                results.update(zip(cubes, pool.map(_render_cube, tasks)))
+
+    return [results[n] for n in range(len(jobs))]
+
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(prog="cube_list_printer batch", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="CSV files, glob patterns or YAML manifests of cubes")
+    parser.add_argument("--output-dir", help="where to put PDFs (default: the directory of paths.output_pdf)")
+    parser.add_argument("--workers", type=int, help="cubes rendered in parallel (default: render_workers)")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    output_dir = args.output_dir or os.path.dirname(config["paths"]["output_pdf"])
+    workers = args.workers if args.workers is not None else config.get("render_workers", 1)
+    try:
+        jobs = expand_inputs(args.inputs, output_dir)
+    except ValueError as e:
+        parser.error(str(e))
+
+    metrics_config = config.get("metrics") or {}
+    with collect(metrics_config.get("trace_memory", False)) as run_metrics:
+        try:
+            results = run_batch(config, jobs, workers)
+            failed = [result for result in results if not result.ok]
+            set_counter("batch.cubes", len(results))
+            set_counter("batch.failed", len(failed))
+        finally:
+            report(run_metrics, metrics_config.get("json"), metrics_config.get("summary", False))
+
+    for result in results:
+        if result.ok:
+            logging.info(f"Printed {result.csv_path} to {result.output_path} in {result.seconds:.1f}s.")
+        else:
+            logging.error(f"Failed to print {result.csv_path}: {result.error}")
+    logging.info(f"Printed {len(results) - len(failed)} of {len(results)} cubes.")
+    return 1 if failed else 0
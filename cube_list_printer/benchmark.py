@@ -0,0 +1,263 @@
+"""
+Offline benchmarks of the pipeline stages on synthetic cubes.
+
+    python -m cube_list_printer.benchmark run --output benchmarks.json
+    python -m cube_list_printer.benchmark compare --baseline benchmarks.json
+    python -m cube_list_printer.benchmark startup
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Sequence, Set, Tuple
+
+from cube_list_printer.base import VERSION
+
+DEFAULT_SIZES = ((45, 15), (450, 15))
+DEFAULT_TOLERANCE = 0.25
+# Differences smaller than this are noise, whatever the ratio.
+MIN_REGRESSION_SECONDS = 0.005
+
+# Importing the CLI must stay within this budget and mustn't pull in any of the heavy dependencies.
+STARTUP_MODULE = "cube_list_printer.main"
+STARTUP_BUDGET_SECONDS = 0.2
+HEAVY_MODULES = ("pandas", "numpy", "reportlab", "PIL", "cairosvg", "requests", "pypdf")
+
+# Image URIs Scryfall gives every card.
+SCRYFALL_IMAGE_SIZES = ("small", "normal", "large", "png", "art_crop", "border_crop")
+
+STAGES = (
+    "load_data",
+    "load_data_streaming",
+    "get_boosters_from_dataframe",
+    "enrich_boosters_with_scryfall_data",
+    "load_cached_boosters",
+    "most_valuable_scan",
+    "most_valuable_stored",
+    "load_mana_icons",
+    "generate_pdf",
+)
+
+
+def best_of(repeat: int, func: Callable[[], Any]) -> Tuple[float, Any]:
+    best = float("inf")
+    result = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark_cube(boosters: int, cards_per_booster: int, repeat: int = 3) -> Dict[str, float]:
+    """Time each stage on a synthetic cube, returning the best wall-clock seconds per stage."""
+    from cube_list_printer.booster_cache import BoosterCache
+    from cube_list_printer.card import most_valuable_card
+    from cube_list_printer.data_loader import (
+        enrich_boosters_with_scryfall_data,
+        get_boosters_from_dataframe,
+        load_data,
+    )
+    from cube_list_printer.pdf_generator import generate_pdf, load_mana_icons
+    from cube_list_printer.synthetic import generate_cube
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cube = generate_cube(tmp_dir, boosters, cards_per_booster, extra_cards=boosters * cards_per_booster * 4)
+
+        # The sidecar index is built once per bulk file; time lookups against a warm index.
+        load_data(cube.csv_path, cube.bulk_path)
+        timings["load_data"], (df, scryfall_map) = best_of(repeat, lambda: load_data(cube.csv_path, cube.bulk_path))
+        timings["load_data_streaming"], _ = best_of(
+            repeat, lambda: load_data(cube.csv_path, cube.bulk_path, use_index=False)
+        )
+        timings["get_boosters_from_dataframe"], _ = best_of(repeat, lambda: get_boosters_from_dataframe(df))
+
+        def enrich() -> Dict[str, Any]:
+            boosters_data = get_boosters_from_dataframe(df)
+            enrich_boosters_with_scryfall_data(boosters_data, scryfall_map)
+            return boosters_data
+
+        timings["enrich_boosters_with_scryfall_data"], boosters_data = best_of(repeat, enrich)
+        timings["enrich_boosters_with_scryfall_data"] -= timings["get_boosters_from_dataframe"]
+
+        # A rerun with unchanged inputs loads the enriched boosters instead of all three stages above.
+        booster_cache = BoosterCache(os.path.join(tmp_dir, "boosters"), cube.csv_path, cube.bulk_path)
+        booster_cache.store(boosters_data)
+        timings["load_cached_boosters"], _ = best_of(repeat, booster_cache.load)
+
+        # Images and pages each used to scan every booster for its most valuable card; now it's picked once
+        # during enrichment and both read it.
+        booster_list = list(boosters_data.values())
+        timings["most_valuable_scan"], _ = best_of(
+            repeat, lambda: [max(data["cards"], key=lambda c: c.value) for data in booster_list * 2]
+        )
+        timings["most_valuable_stored"], _ = best_of(
+            repeat,
+            lambda: [most_valuable_card(data["cards"]) for data in booster_list]
+            + [data["most_valuable"] for data in booster_list * 2],
+        )
+
+        for n, data in enumerate(boosters_data.values()):
+            data["cards"].sort(key=lambda c: c.name.lower())
+            data["most_valuable"].image_local_path = cube.image_paths[n % len(cube.image_paths)]
+
+        timings["load_mana_icons"], icon_map = best_of(repeat, lambda: load_mana_icons(cube.symbol_map))
+
+        output_path = os.path.join(tmp_dir, "out.pdf")
+        timings["generate_pdf"], _ = best_of(
+            repeat, lambda: generate_pdf(output_path, boosters_data, icon_map, 63, 88)
+        )
+    return timings
+
+
+def measure_card_memory(count: int = 10000) -> Dict[str, float]:
+    """Bytes per card of a `Card` record and of the dict with every image URI that it replaced."""
+    from cube_list_printer.card import Card
+
+    def as_dict(n: int) -> Dict[str, Any]:
+        uris = {size: f"https://cards.scryfall.io/{size}/front/{n:036d}.jpg" for size in SCRYFALL_IMAGE_SIZES}
+        return {
+            "name": f"Card {n}",
+            "scryfall_id": f"{n:036d}",
+            "mana_cost": "{2}{W}{U}",
+            "image_uris": uris,
+            "value": n / 100,
+            "image_local_path": None,
+        }
+
+    def as_record(n: int) -> Card:
+        uri = f"https://cards.scryfall.io/large/front/{n:036d}.jpg"
+        return Card(f"Card {n}", f"{n:036d}", "{2}{W}{U}", uri, n / 100)
+
+    sizes = {}
+    for name, make in (("card_dict", as_dict), ("card_record", as_record)):
+        tracemalloc.start()
+        cards = [make(n) for n in range(count)]
+        sizes[f"{name}_bytes"] = tracemalloc.get_traced_memory()[0] / count
+        tracemalloc.stop()
+        del cards
+    return sizes
+
+
+def measure_startup(module: str = STARTUP_MODULE) -> Tuple[float, Set[str]]:
+    """
+    Import `module` in a fresh interpreter with `-X importtime`.
+
+    :return: The cumulative import time of `module` in seconds, and the top-level packages it imported.
+    """
+    # Import this copy of the package, whatever the working directory.
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [package_root, os.environ.get("PYTHONPATH")])))
+    command = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    proc = subprocess.run(command, capture_output=True, text=True, check=True, env=env)
+    seconds = 0.0
+    packages = set()
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        packages.add(name.strip().split(".")[0])
+        if name.strip() == module:
+            seconds = int(cumulative) / 1e6
+    return seconds, packages
+
+
+def run_benchmarks(sizes: Sequence[Tuple[int, int]] = DEFAULT_SIZES, repeat: int = 3) -> Dict[str, Any]:
+    results = {}
+    for boosters, cards_per_booster in sizes:
+        key = f"{boosters}x{cards_per_booster}"
+        logging.info(f"Benchmarking {key} cube...")
+        results[key] = benchmark_cube(boosters, cards_per_booster, repeat)
+    results["startup"] = {"import": min(measure_startup()[0] for _ in range(max(1, repeat)))}
+    return {
+        "version": VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+        "memory": measure_card_memory(),
+    }
+
+
+def compare_results(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = DEFAULT_TOLERANCE
+) -> List[str]:
+    """Return a description of every stage that got slower than `baseline` by more than `tolerance`."""
+    regressions = []
+    for size, stages in current["results"].items():
+        for stage, seconds in stages.items():
+            before = baseline["results"].get(size, {}).get(stage)
+            if before is None:
+                continue
+            if seconds > before * (1 + tolerance) and seconds - before > MIN_REGRESSION_SECONDS:
+                regressions.append(f"{size} {stage}: {before:.4f}s -> {seconds:.4f}s (+{seconds / before - 1:.0%})")
+    return regressions
+
+
+def format_results(results: Dict[str, Any]) -> str:
+    lines = []
+    for size, stages in results["results"].items():
+        lines.append(f"{size}:")
+        lines.extend(f"  {stage:<36} {seconds * 1000:10.2f} ms" for stage, seconds in stages.items())
+    if "memory" in results:
+        lines.append("memory:")
+        lines.extend(f"  {name:<36} {size:10.0f} B" for name, size in results["memory"].items())
+    return "\n".join(lines)
+
+
+def parse_sizes(value: str) -> List[Tuple[int, int]]:
+    sizes = []
+    for size in value.split(","):
+        boosters, _, cards = size.partition("x")
+        sizes.append((int(boosters), int(cards or 15)))
+    return sizes
+
+
+def main(argv: Sequence[str] = ()) -> int:
+    parser = argparse.ArgumentParser(prog="cube_list_printer.benchmark", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["run", "compare", "startup"])
+    parser.add_argument("--sizes", type=parse_sizes, default=list(DEFAULT_SIZES), help="e.g. 45x15,450x15")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args(argv or sys.argv[1:])
+
+    if args.command == "compare" and not args.baseline:
+        parser.error("compare needs --baseline")
+
+    if args.command == "startup":
+        seconds, packages = measure_startup()
+        heavy = sorted(packages.intersection(HEAVY_MODULES))
+        print(f"import {STARTUP_MODULE}: {seconds * 1000:.1f} ms (budget {STARTUP_BUDGET_SECONDS * 1000:.0f} ms)")
+        if heavy:
+            print(f"Heavy dependencies imported at startup: {', '.join(heavy)}")
+        return 1 if heavy or seconds > STARTUP_BUDGET_SECONDS else 0
+
+    results = run_benchmarks(args.sizes, args.repeat)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.command == "compare":
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s]: %(message)s")
+    sys.exit(main())
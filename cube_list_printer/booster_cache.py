@@ -0,0 +1,74 @@
+import hashlib
+import logging
+import os
+import pickle
+from typing import Any, Dict, Optional
+
+from cube_list_printer.base import VERSION, source_fingerprint
+
+# Bumped when the cached structure changes in a way VERSION doesn't capture.
+CACHE_FORMAT = 1
+HASH_BLOCK_SIZE = 1 << 20
+# Modules whose code decides what the cached boosters hold: the CSV readers and enrichment, the Card class, and
+# the sorting in main.build_boosters.
+CODE_MODULES = ("card.py", "data_loader.py", "main.py")
+
+
+class BoosterCache:
+    """
+    The enriched, sorted boosters of one CSV from an earlier run, keyed by a hash of the CSV's contents, the
+    identity of the Scryfall bulk file, the CSV reader and the code that builds them, so printing an unchanged
+    cube again skips loading and enrichment.
+
+    Each CSV gets its own directory under `cache_dir`, holding only the entry for its latest inputs. Entries are
+    pickles, which load in a fraction of the time enrichment takes; only point `cache_dir` at a trusted directory.
+    """
+
+    def __init__(self, cache_dir: str, csv_path: str, bulk_path: str, csv_reader: str = "pandas"):
+        csv_key = hashlib.sha1(os.path.abspath(csv_path).encode("utf-8")).hexdigest()[:16]
+        self.dir = os.path.join(cache_dir, csv_key)
+        self.key = booster_inputs_key(csv_path, bulk_path, csv_reader)
+        self.path = os.path.join(self.dir, f"{self.key}.pickle")
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, AttributeError, ValueError, pickle.UnpicklingError) as e:
+            logging.warning(f"Ignoring unreadable cached boosters {self.path}: {e}")
+            return None
+
+    def store(self, boosters: Dict[str, Any]) -> None:
+        """Atomically save `boosters` for the current inputs, dropping the entries of earlier ones."""
+        os.makedirs(self.dir, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(boosters, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        for filename in os.listdir(self.dir):
+            if filename != os.path.basename(self.path) and not filename.endswith(".tmp"):
+                try:
+                    os.remove(os.path.join(self.dir, filename))
+                except OSError as e:
+                    logging.warning(f"Could not prune cached boosters {filename}: {e}")
+
+
+def booster_inputs_key(csv_path: str, bulk_path: str, csv_reader: str = "pandas") -> str:
+    """
+    Hash of everything enrichment depends on. The CSV is hashed by content; the bulk file, being far larger,
+    by path, size and modification time, which change whenever it's synced or replaced. The code is covered by
+    a hash of the sources of `CODE_MODULES`, so editing them invalidates the cache without a version bump.
+    """
+    digest = hashlib.sha256(f"{CACHE_FORMAT}:{VERSION}:{code_fingerprint()}:{csv_reader}:".encode("utf-8"))
+    with open(csv_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    stat = os.stat(bulk_path)
+    digest.update(f":{os.path.abspath(bulk_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def code_fingerprint() -> str:
+    return source_fingerprint(CODE_MODULES)
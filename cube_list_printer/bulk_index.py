@@ -0,0 +1,272 @@
+"""
+Columnar sidecar index of the Scryfall bulk file.
+
+The bulk JSON is parsed once and converted into a memory-mapped file next to it, so later runs look up
+cards by ID without decoding any JSON. Layout (little endian):
+
+    header        magic, record count, id width
+    meta          JSON describing the source file, padded to META_SIZE bytes
+    ids           count * id_width bytes, sorted, NUL padded
+    mana_cost     count * (offset u64, length u32) into the string heap
+    image_uris    count * (offset u64, length u32) into the string heap (JSON encoded)
+    usd           count * f64, NaN when missing
+    usd_foil      count * f64, NaN when missing
+    usd_etched    count * f64, NaN when missing
+    heap          UTF-8 strings
+"""
+
+import hashlib
+import json
+import logging
+import math
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cube_list_printer.data_loader import PRICE_FIELDS, iter_json_array, open_bulk
+
+INDEX_MAGIC = b"CLPIDX01"
+INDEX_SUFFIX = ".idx"
+HEADER = struct.Struct("<8sQQ")
+META_SIZE = 512
+STRING_REF = struct.Struct("<QI")
+PRICE = struct.Struct("<d")
+
+
+def get_index_path(json_path: str) -> str:
+    return json_path + INDEX_SUFFIX
+
+
+def describe_source(json_path: str, with_hash: bool = True) -> Dict[str, Any]:
+    stat = os.stat(json_path)
+    source: Dict[str, Any] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if with_hash:
+        source["sha256"] = hash_file(json_path)
+    return source
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BulkIndex:
+    """Read-only view of a sidecar index, backed by mmap."""
+
+    def __init__(self, index_path: str):
+        self.path = index_path
+        self._file = open(index_path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Empty index file: {index_path}")
+
+        magic, self.count, self.id_width = HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"Not a Scryfall index file: {index_path}")
+        meta_start = HEADER.size
+        meta_end = meta_start + META_SIZE
+        self.meta = json.loads(self._mm[meta_start:meta_end].decode("utf-8"))
+
+        n = self.count
+        self._ids_at = HEADER.size + META_SIZE
+        self._mana_at = self._ids_at + n * self.id_width
+        self._uris_at = self._mana_at + n * STRING_REF.size
+        self._prices_at = [self._uris_at + n * STRING_REF.size + i * n * PRICE.size for i in range(len(PRICE_FIELDS))]
+        self._heap_at = self._prices_at[-1] + n * PRICE.size
+
+    def close(self) -> None:
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "BulkIndex":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, scryfall_id: str) -> bool:
+        return self._find(scryfall_id) is not None
+
+    def _id_at(self, i: int) -> bytes:
+        start = self._ids_at + i * self.id_width
+        end = start + self.id_width
+        return self._mm[start:end]
+
+    def _find(self, scryfall_id: str) -> Optional[int]:
+        key = scryfall_id.encode("utf-8")
+        if len(key) > self.id_width:
+            return None
+        key = key.ljust(self.id_width, b"\0")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._id_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._id_at(lo) == key:
+            return lo
+        return None
+
+    def _string(self, column_at: int, i: int) -> str:
+        offset, length = STRING_REF.unpack_from(self._mm, column_at + i * STRING_REF.size)
+        start = self._heap_at + offset
+        end = start + length
+        return self._mm[start:end].decode("utf-8")
+
+    def _price(self, field_index: int, i: int) -> Optional[str]:
+        (value,) = PRICE.unpack_from(self._mm, self._prices_at[field_index] + i * PRICE.size)
+        return None if math.isnan(value) else f"{value:.2f}"
+
+    def get(self, scryfall_id: str) -> Optional[Dict[str, Any]]:
+        """Return the card in the same trimmed shape as `data_loader.trim_card`, or None."""
+        i = self._find(scryfall_id)
+        if i is None:
+            return None
+        card: Dict[str, Any] = {"id": scryfall_id, "mana_cost": self._string(self._mana_at, i)}
+        image_uris = self._string(self._uris_at, i)
+        if image_uris:
+            card["image_uris"] = json.loads(image_uris)
+        card["prices"] = {field: self._price(n, i) for n, field in enumerate(PRICE_FIELDS)}
+        return card
+
+    def lookup(self, scryfall_ids: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        for s_id in scryfall_ids:
+            card = self.get(s_id)
+            if card is not None:
+                found[s_id] = card
+        return found
+
+
+def _parse_price(value: Any) -> float:
+    if value is None:
+        return math.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def build_index(json_path: str, index_path: Optional[str] = None, source: Optional[Dict[str, Any]] = None) -> str:
+    """Convert the Scryfall bulk JSON into a sidecar index. The file is replaced atomically."""
+    index_path = index_path or get_index_path(json_path)
+    source = source or describe_source(json_path)
+    logging.info(f"Building Scryfall index {index_path}...")
+
+    directory = os.path.dirname(os.path.abspath(index_path))
+    records: List[Tuple[bytes, int, int, int, int, float, float, float]] = []
+    with tempfile.TemporaryFile(dir=directory) as heap, open_bulk(json_path) as f:
+        heap_size = 0
+
+        def put(text: str) -> Tuple[int, int]:
+            nonlocal heap_size
+            data = text.encode("utf-8")
+            heap.write(data)
+            offset = heap_size
+            heap_size += len(data)
+            return offset, len(data)
+
+        for card in iter_json_array(f):
+            c_id = card.get("id")
+            if not c_id:
+                logging.warning("Card in Scryfall data missing 'id' field.")
+                continue
+            mana = put(card.get("mana_cost") or "")
+            uris = put(json.dumps(card["image_uris"], separators=(",", ":")) if "image_uris" in card else "")
+            prices = card.get("prices") or {}
+            records.append(
+                (c_id.encode("utf-8"), *mana, *uris, *(_parse_price(prices.get(field)) for field in PRICE_FIELDS))
+            )
+
+        records.sort(key=lambda r: r[0])
+        for prev, cur in zip(records, records[1:]):
+            if prev[0] == cur[0]:
+                logging.warning(f"Duplicate Scryfall ID {cur[0].decode()} in bulk data.")
+        id_width = max((len(r[0]) for r in records), default=0)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=INDEX_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(HEADER.pack(INDEX_MAGIC, len(records), id_width))
+                out.write(_pack_meta(source))
+                out.write(b"".join(r[0].ljust(id_width, b"\0") for r in records))
+                out.write(b"".join(STRING_REF.pack(r[1], r[2]) for r in records))
+                out.write(b"".join(STRING_REF.pack(r[3], r[4]) for r in records))
+                for column in (5, 6, 7):
+                    out.write(b"".join(PRICE.pack(r[column]) for r in records))
+                heap.seek(0)
+                shutil.copyfileobj(heap, out)
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    logging.info(f"Indexed {len(records)} Scryfall cards.")
+    return index_path
+
+
+def _pack_meta(source: Dict[str, Any]) -> bytes:
+    meta = json.dumps({"source": source}).encode("utf-8")
+    if len(meta) > META_SIZE:
+        raise ValueError("Index metadata does not fit in the header.")
+    return meta.ljust(META_SIZE, b" ")
+
+
+def _read_source(index_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(index_path, "rb") as f:
+            header = f.read(HEADER.size + META_SIZE)
+    except FileNotFoundError:
+        return None
+    if len(header) < HEADER.size + META_SIZE or not header.startswith(INDEX_MAGIC):
+        return None
+    meta_start = HEADER.size
+    meta = header[meta_start:]
+    try:
+        return json.loads(meta.decode("utf-8"))["source"]
+    except (ValueError, KeyError):
+        return None
+
+
+def _write_source(index_path: str, source: Dict[str, Any]) -> None:
+    with open(index_path, "r+b") as f:
+        f.seek(HEADER.size)
+        f.write(_pack_meta(source))
+
+
+def ensure_index(json_path: str, index_path: Optional[str] = None) -> BulkIndex:
+    """
+    Open the sidecar index for `json_path`, (re)building it when the source changed.
+
+    Size and mtime are checked first; the source is only hashed when they differ, so a touched but
+    otherwise identical file just gets its recorded mtime refreshed.
+    """
+    index_path = index_path or get_index_path(json_path)
+    current = describe_source(json_path, with_hash=False)
+    recorded = _read_source(index_path)
+
+    if recorded is None:
+        build_index(json_path, index_path)
+    elif recorded.get("size") != current["size"] or recorded.get("mtime_ns") != current["mtime_ns"]:
+        current["sha256"] = hash_file(json_path)
+        if recorded.get("size") == current["size"] and recorded.get("sha256") == current["sha256"]:
+            logging.info("Scryfall bulk file was touched but not changed, reusing index.")
+            _write_source(index_path, current)
+        else:
+            build_index(json_path, index_path, current)
+
+    return BulkIndex(index_path)
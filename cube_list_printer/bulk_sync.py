@@ -0,0 +1,175 @@
+"""
+Download the Scryfall bulk data when Scryfall has published a newer dump.
+
+    cube_list_printer sync
+    cube_list_printer sync --force
+
+The dump is stored gzip compressed, as Scryfall serves it, and read through streaming decompression, so it
+is never held uncompressed on disk or in memory. It is swapped in atomically, so runs reading it while a
+sync is in progress see either the old dump or the new one.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from cube_list_printer import http_client, metrics
+
+BULK_DATA_API = "https://api.scryfall.com/bulk-data"
+# Scryfall's dump with one object per card printing, the one whose IDs the booster CSVs use.
+DEFAULT_BULK_TYPE = "default_cards"
+STATE_SUFFIX = ".sync.json"
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+# Level 6 compresses the dump nearly as well as 9 at a fraction of the CPU.
+COMPRESS_LEVEL = 6
+
+
+def get_state_path(bulk_path: str) -> str:
+    return bulk_path + STATE_SUFFIX
+
+
+def sync_bulk_data(
+    bulk_path: str, bulk_type: str = DEFAULT_BULK_TYPE, api_url: str = BULK_DATA_API, force: bool = False
+) -> bool:
+    """
+    Download the `bulk_type` dump to `bulk_path` if Scryfall's `updated_at` for it changed since the last sync.
+
+    :param bulk_path: Where the dump is kept, gzip compressed whatever its name. ".gz" is the clearest ending.
+    :param force: Download even if the dump is up to date.
+    :return: Whether a new dump was downloaded.
+    """
+    resp = http_client.get(api_url)
+    resp.raise_for_status()
+    entry = find_bulk_entry(resp.json(), bulk_type)
+
+    state = load_state(bulk_path)
+    if not force and is_current(bulk_path, state, entry):
+        logging.info(f"Scryfall {bulk_type} bulk data is up to date ({entry['updated_at']}).")
+        return False
+
+    logging.info(f"Downloading Scryfall {bulk_type} bulk data updated {entry['updated_at']}...")
+    size = download_gzipped(entry["download_uri"], bulk_path)
+    save_state(
+        bulk_path,
+        {
+            "type": bulk_type,
+            "updated_at": entry["updated_at"],
+            "download_uri": entry["download_uri"],
+            "size": size,
+            "synced_at": time.time(),
+        },
+    )
+    logging.info(f"Saved {size / 2**20:.1f} MiB of compressed bulk data to {bulk_path}.")
+    return True
+
+
+def find_bulk_entry(bulk_index: Dict[str, Any], bulk_type: str) -> Dict[str, Any]:
+    for entry in bulk_index.get("data", []):
+        if entry.get("type") == bulk_type and entry.get("download_uri") and entry.get("updated_at"):
+            return entry
+    raise ValueError(f"Scryfall has no {bulk_type!r} bulk data.")
+
+
+def is_current(bulk_path: str, state: Optional[Dict[str, Any]], entry: Dict[str, Any]) -> bool:
+    if state is None or not os.path.exists(bulk_path):
+        return False
+    return (
+        state.get("updated_at") == entry["updated_at"]
+        and state.get("download_uri") == entry["download_uri"]
+        and state.get("size") == os.path.getsize(bulk_path)
+    )
+
+
+def download_gzipped(url: str, bulk_path: str) -> int:
+    """
+    Stream `url` into `bulk_path` as gzip and swap it in atomically, returning its compressed size.
+
+    A response that is already gzip encoded is saved as it arrives, after checking it decompresses cleanly;
+    anything else is compressed on the way to disk.
+    """
+    directory = os.path.dirname(os.path.abspath(bulk_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(bulk_path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out, http_client.get(url, stream=True) as resp:
+            resp.raise_for_status()
+            if resp.headers.get("Content-Encoding", "").lower() == "gzip":
+                for chunk in verified_gzip(resp.raw.stream(DOWNLOAD_CHUNK_SIZE, decode_content=False)):
+                    out.write(chunk)
+            else:
+                with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=COMPRESS_LEVEL, mtime=0) as gz:
+                    for chunk in resp.iter_content(DOWNLOAD_CHUNK_SIZE):
+                        metrics.count("bulk.bytes_downloaded", len(chunk))
+                        gz.write(chunk)
+            size = out.tell()
+        os.replace(tmp_path, bulk_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return size
+
+
+def verified_gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Pass gzip data through, raising ValueError at the end if it's truncated or corrupt."""
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        metrics.count("bulk.bytes_downloaded", len(chunk))
+        try:
+            # Only the checksums matter; the output is dropped a chunk at a time.
+            decompressor.decompress(chunk, DOWNLOAD_CHUNK_SIZE)
+            while decompressor.unconsumed_tail:
+                decompressor.decompress(decompressor.unconsumed_tail, DOWNLOAD_CHUNK_SIZE)
+        except zlib.error as e:
+            raise ValueError(f"Corrupt gzip download: {e}") from e
+        yield chunk
+    if not decompressor.eof:
+        raise ValueError("Truncated gzip download.")
+
+
+def load_state(bulk_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(get_state_path(bulk_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        logging.warning("Ignoring corrupt bulk data sync state.")
+        return None
+
+
+def save_state(bulk_path: str, state: Dict[str, Any]) -> None:
+    path = get_state_path(bulk_path)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def main(argv: Sequence[str]) -> int:
+    from cube_list_printer.bulk_index import ensure_index
+    from cube_list_printer.main import CONFIG_PATH, load_config
+
+    parser = argparse.ArgumentParser(prog="cube_list_printer sync", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--type", help=f"bulk data type (default: bulk_type, or {DEFAULT_BULK_TYPE})")
+    parser.add_argument("--force", action="store_true", help="download even if the dump is up to date")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    bulk_path = config["paths"]["scryfall_bulk"]
+    bulk_type = args.type or config.get("bulk_type", DEFAULT_BULK_TYPE)
+    if sync_bulk_data(bulk_path, bulk_type, config.get("bulk_data_url", BULK_DATA_API), args.force):
+        # Index the new dump now rather than on the next run.
+        ensure_index(bulk_path).close()
+    return 0
@@ -0,0 +1,61 @@
+from typing import Any, Dict, Iterable, Optional
+
+# Image sizes to download, in order of preference.
+IMAGE_SIZES = ("large", "normal")
+
+
+class Card:
+    """
+    One card of a booster, holding only what the pipeline uses.
+
+    Of the card's Scryfall image URIs only the one that gets downloaded is kept. Slots keep a record a few
+    times smaller than the equivalent dict, which adds up over tens of thousands of boosters.
+    """
+
+    __slots__ = ("name", "scryfall_id", "mana_cost", "image_uri", "value", "image_local_path")
+
+    def __init__(
+        self,
+        name: str,
+        scryfall_id: str,
+        mana_cost: str = "",
+        image_uri: Optional[str] = None,
+        value: float = 0.0,
+        image_local_path: Optional[str] = None,
+    ):
+        self.name = name
+        self.scryfall_id = scryfall_id
+        self.mana_cost = mana_cost
+        self.image_uri = image_uri
+        self.value = value
+        self.image_local_path = image_local_path
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Card):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"Card({self.name!r}, {self.scryfall_id!r}, mana_cost={self.mana_cost!r}, value={self.value!r})"
+
+
+def pick_image_uri(image_uris: Optional[Dict[str, str]]) -> Optional[str]:
+    for size in IMAGE_SIZES:
+        uri = (image_uris or {}).get(size)
+        if uri:
+            return uri
+    return None
+
+
+def most_valuable_card(cards: Iterable[Card]) -> Optional[Card]:
+    """
+    The card with the highest value, in one pass. Ties go to the name that sorts first, as the card list is
+    printed in name order.
+    """
+    best = None
+    for card in cards:
+        if best is None or card.value > best.value:
+            best = card
+        elif card.value == best.value and card.name.lower() < best.name.lower():
+            best = card
+    return best
@@ -1,70 +1,324 @@
+import csv
+import gzip
 import json
 import logging
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Set, Tuple
 
 import pandas as pd
 
+from cube_list_printer.card import Card, most_valuable_card, pick_image_uri
 
-def load_data(csv_path: str, json_path: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+# Only these fields of a Scryfall card object are used by the pipeline.
+SCRYFALL_FIELDS = ("mana_cost", "image_uris", "prices")
+# Card value falls back through these prices in order.
+PRICE_FIELDS = ("usd", "usd_foil", "usd_etched")
+
+JSON_CHUNK_SIZE = 1 << 20
+GZIP_MAGIC = b"\x1f\x8b"
+# Options for reading a booster CSV with pandas the way the csv module does: every cell is a string, so binder
+# names like "01" or "10" stay as written and sort as text, and only empty cells are missing.
+CSV_OPTIONS: Dict[str, Any] = {"dtype": str, "keep_default_na": False, "na_values": [""]}
+
+
+def load_data(csv_path: str, json_path: str, use_index: bool = True) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     logging.info("Loading CSV and JSON data...")
-    df = pd.read_csv(csv_path)
+    df = pd.read_csv(csv_path, **CSV_OPTIONS)
+
+    wanted = get_scryfall_ids(df)
+    scryfall_map = load_scryfall_map(json_path, wanted, use_index)
+
+    return df, scryfall_map
+
 
-    with open(json_path, "r", encoding="utf-8") as f:
-        scryfall_data = json.load(f)
+def get_scryfall_ids(df: pd.DataFrame) -> Set[str]:
+    if "Scryfall ID" not in df.columns:
+        return set()
+    return set(df["Scryfall ID"].dropna())
+
+
+def load_scryfall_map(
+    json_path: str, wanted: Optional[Iterable[str]] = None, use_index: bool = True
+) -> Dict[str, Any]:
+    """
+    Stream the Scryfall bulk file and keep only the cards whose IDs are in `wanted`.
+
+    Each kept card is trimmed down to its `id` and SCRYFALL_FIELDS, so memory depends on the
+    number of wanted cards instead of the size of the dump. Passing `wanted=None` keeps every card.
+
+    When `use_index` is set, the cards are looked up in the sidecar index next to the bulk file
+    (built on first use and rebuilt when the bulk file changes) instead of parsing the JSON.
+    """
+    wanted_ids = None if wanted is None else set(wanted)
+
+    if use_index and wanted_ids is not None:
+        from cube_list_printer.bulk_index import ensure_index
+
+        try:
+            with ensure_index(json_path) as index:
+                return index.lookup(wanted_ids)
+        except OSError as e:
+            logging.warning(f"Could not use Scryfall index, parsing {json_path} instead: {e}")
 
     scryfall_map = {}
-    for card in scryfall_data:
-        c_id = card.get("id")
-        if c_id:
-            scryfall_map[c_id] = card
-        else:
-            logging.warning("Card in Scryfall data missing 'id' field.")
+    with open_bulk(json_path) as f:
+        for card in iter_json_array(f):
+            c_id = card.get("id")
+            if not c_id:
+                logging.warning("Card in Scryfall data missing 'id' field.")
+                continue
+            if wanted_ids is not None and c_id not in wanted_ids:
+                continue
+            scryfall_map[c_id] = trim_card(card)
 
-    return df, scryfall_map
+    if wanted_ids is not None and len(scryfall_map) < len(wanted_ids):
+        logging.info(f"Found {len(scryfall_map)} of {len(wanted_ids)} Scryfall IDs in {json_path}.")
+    return scryfall_map
 
 
-def get_boosters_from_dataframe(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
-    boosters = {}
-    for booster_id, grp in df.groupby("Binder Name"):
-        cards = []
-        for _, row in grp.iterrows():
-            s_id = row.get("Scryfall ID")
-            name = row.get("Name", "Unknown")
-            if pd.isnull(s_id):
-                logging.warning(f"Card '{name}' in booster '{booster_id}' missing Scryfall ID.")
+def open_bulk(json_path: str) -> IO[str]:
+    """
+    Open the Scryfall bulk file as text, decompressing it as it's read if it's gzipped. Compression is told by
+    the file's leading bytes, not its name, so a dump synced to a path without ".gz" still reads.
+    """
+    with open(json_path, "rb") as f:
+        gzipped = f.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    if gzipped:
+        return gzip.open(json_path, "rt", encoding="utf-8")
+    return open(json_path, "r", encoding="utf-8")
+
+
+def trim_card(card: Dict[str, Any]) -> Dict[str, Any]:
+    trimmed = {"id": card["id"]}
+    for field in SCRYFALL_FIELDS:
+        if field in card:
+            trimmed[field] = card[field]
+    return trimmed
+
+
+def iter_json_array(f: IO[str], chunk_size: int = JSON_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Incrementally decode a top-level JSON array, yielding one element at a time.
+
+    Only the current chunk and the element being decoded are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip(chars: str) -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in chars:
+                pos += 1
+            if pos < len(buf) or not fill():
+                return
+
+    skip(" \t\r\n")
+    if pos >= len(buf) or buf[pos] != "[":
+        raise ValueError("Expected a JSON array at the top level of the Scryfall bulk file.")
+    pos += 1
+
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buf):
+            raise ValueError("Unexpected end of Scryfall bulk file.")
+        if buf[pos] == "]":
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
                 continue
-            card_info = {"name": name, "scryfall_id": s_id}
-            cards.append(card_info)
-        boosters[booster_id] = {"cards": cards}
+            # A number can be cut off at a chunk boundary and still decode.
+            if end == len(buf) and fill():
+                continue
+            break
+        pos = end
+        yield item
+
+
+def get_boosters_from_dataframe(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Group a booster CSV read into `df`, with `CSV_OPTIONS`, by `Binder Name`, in binder name order. Binder names
+    are made strings even if `df` was read without them, but numeric names then lose their leading zeros.
+    """
+    binders = df["Binder Name"]
+    frame = pd.DataFrame(
+        {
+            "booster": binders.where(binders.isna(), binders.astype(str)),
+            "name": df["Name"] if "Name" in df.columns else "Unknown",
+            "scryfall_id": df["Scryfall ID"] if "Scryfall ID" in df.columns else None,
+        }
+    )
+    frame = frame[frame["booster"].notna()].sort_values("booster", kind="stable")
+
+    missing = frame["scryfall_id"].isna()
+    for booster_id, name in zip(frame.loc[missing, "booster"].tolist(), frame.loc[missing, "name"].tolist()):
+        logging.warning(f"Card '{name}' in booster '{booster_id}' missing Scryfall ID.")
+
+    boosters: Dict[str, Dict[str, Any]] = {booster_id: {"cards": []} for booster_id in frame["booster"].unique()}
+
+    valid = frame[~missing]
+    names = valid["name"].tolist()
+    s_ids = valid["scryfall_id"].tolist()
+    start = 0
+    # Rows are sorted by booster, so each group is a contiguous slice of the column lists.
+    for booster_id, count in valid.groupby("booster", sort=True).size().items():
+        end = start + count
+        boosters[booster_id]["cards"] = [Card(name, s_id) for name, s_id in zip(names[start:end], s_ids[start:end])]
+        start = end
     return boosters
 
 
+def read_boosters_csv(f: IO[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Stream a booster CSV with the csv module, grouping rows by `Binder Name` and keeping only `Name` and
+    `Scryfall ID`.
+
+    Gives the same boosters, in the same order and with the same warnings, as `get_boosters_from_dataframe`
+    on the same file read with `CSV_OPTIONS`.
+    """
+    reader = csv.DictReader(f)
+    columns = reader.fieldnames or []
+    if "Binder Name" not in columns:
+        raise KeyError("Binder Name")
+    has_name = "Name" in columns
+    has_id = "Scryfall ID" in columns
+
+    cards_by_booster: Dict[str, List[Card]] = {}
+    missing = []
+    for row in reader:
+        booster_id = row["Binder Name"]
+        if not booster_id:
+            continue
+        name = row["Name"] if has_name else "Unknown"
+        s_id = row["Scryfall ID"] if has_id else None
+        cards = cards_by_booster.setdefault(booster_id, [])
+        if s_id:
+            cards.append(Card(name, s_id))
+        else:
+            missing.append((booster_id, name))
+
+    for booster_id, name in sorted(missing, key=lambda card: card[0]):
+        logging.warning(f"Card '{name}' in booster '{booster_id}' missing Scryfall ID.")
+    return {booster_id: {"cards": cards_by_booster[booster_id]} for booster_id in sorted(cards_by_booster)}
+
+
+def iter_boosters_csv(f: IO[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Stream a booster CSV like `read_boosters_csv`, but yield each booster as soon as its rows end, in file order.
+
+    Only the current booster is held in memory, so each binder's rows have to be contiguous; a binder that
+    shows up again later raises ValueError.
+    """
+    reader = csv.DictReader(f)
+    columns = reader.fieldnames or []
+    if "Binder Name" not in columns:
+        raise KeyError("Binder Name")
+    has_name = "Name" in columns
+    has_id = "Scryfall ID" in columns
+
+    seen: Set[str] = set()
+    current: Optional[str] = None
+    cards: List[Card] = []
+    for row in reader:
+        booster_id = row["Binder Name"]
+        if not booster_id:
+            continue
+        if booster_id != current:
+            if current is not None:
+                yield current, {"cards": cards}
+            if booster_id in seen:
+                raise ValueError(f"Rows of booster '{booster_id}' aren't contiguous, sort the CSV by binder.")
+            seen.add(booster_id)
+            current, cards = booster_id, []
+        name = row["Name"] if has_name else "Unknown"
+        s_id = row["Scryfall ID"] if has_id else None
+        if s_id:
+            cards.append(Card(name, s_id))
+        else:
+            logging.warning(f"Card '{name}' in booster '{booster_id}' missing Scryfall ID.")
+    if current is not None:
+        yield current, {"cards": cards}
+
+
+def get_booster_scryfall_ids(boosters: Dict[str, Dict[str, Any]]) -> Set[str]:
+    return {card.scryfall_id for booster_data in boosters.values() for card in booster_data["cards"]}
+
+
+def get_scryfall_frame(scryfall_map: Dict[str, Any], scryfall_ids: Iterable[str]) -> pd.DataFrame:
+    """
+    Build a frame indexed by Scryfall ID with the metadata the pipeline uses, for the given IDs only.
+    Columns: mana_cost, image_uri, usd, usd_foil, usd_etched.
+    """
+    records = []
+    for s_id in scryfall_ids:
+        card_meta = scryfall_map.get(s_id)
+        if card_meta is None:
+            continue
+        prices = card_meta.get("prices") or {}
+        records.append(
+            (
+                s_id,
+                card_meta.get("mana_cost", ""),
+                pick_image_uri(card_meta.get("image_uris")),
+                *(prices.get(field) for field in PRICE_FIELDS),
+            )
+        )
+    frame = pd.DataFrame.from_records(
+        records, columns=["scryfall_id", "mana_cost", "image_uri", *PRICE_FIELDS], index="scryfall_id"
+    )
+    for field in PRICE_FIELDS:
+        frame[field] = pd.to_numeric(frame[field], errors="coerce")
+    return frame
+
+
 def enrich_boosters_with_scryfall_data(boosters: Dict[str, Any], scryfall_map: Dict[str, Any]) -> None:
-    for booster_id, booster_data in boosters.items():
-        for card in booster_data["cards"]:
-            s_id = card["scryfall_id"]
-            if s_id in scryfall_map:
-                card_meta = scryfall_map[s_id]
-                card["mana_cost"] = card_meta.get("mana_cost", "")
-                card["image_uris"] = card_meta.get("image_uris", {})
-                # Using usd for value, fallback to 0
-                card["value"] = get_price(card_meta)
-                logging.info(f"Card value for {card['name']} is ${card['value']:0.2f}")
-            else:
-                logging.warning(f"Scryfall data not found for Scryfall ID: {s_id}")
-                card["mana_cost"] = ""
-                card["image_uris"] = {}
-                card["value"] = 0.0
-
-
-def get_price(card_meta: Any) -> float:
-    if "prices" not in card_meta:
-        return 0.0
-    prices = card_meta["prices"]
-    if "usd" in prices and prices["usd"] is not None:
-        return float(prices["usd"])
-    if "usd_foil" in prices and prices["usd_foil"] is not None:
-        return float(prices["usd_foil"])
-    if "usd_etched" in prices and prices["usd_etched"] is not None:
-        return float(prices["usd_etched"])
-    return 0.0
+    """
+    Fill in each card's mana cost, image URI and value, and store each booster's most valuable card under
+    `most_valuable` (None for a booster without cards).
+    """
+    cards = [card for booster_data in boosters.values() for card in booster_data["cards"]]
+    if cards:
+        enrich_cards(cards, scryfall_map)
+    for booster_data in boosters.values():
+        booster_data["most_valuable"] = most_valuable_card(booster_data["cards"])
+
+
+def enrich_cards(cards: List[Card], scryfall_map: Dict[str, Any]) -> None:
+    ids = pd.Series([card.scryfall_id for card in cards], dtype=object)
+    meta = get_scryfall_frame(scryfall_map, ids.unique())
+    joined = meta.reindex(ids)
+
+    found = ids.isin(meta.index).tolist()
+    # Using usd for value, falling back to usd_foil, usd_etched and finally 0
+    values = joined["usd"].fillna(joined["usd_foil"]).fillna(joined["usd_etched"]).fillna(0.0).astype(float)
+
+    for card, is_found, mana_cost, image_uri, value in zip(
+        cards, found, joined["mana_cost"].tolist(), joined["image_uri"].tolist(), values.tolist()
+    ):
+        if is_found:
+            card.mana_cost = mana_cost
+            card.image_uri = image_uri
+            card.value = value
+        else:
+            logging.warning(f"Scryfall data not found for Scryfall ID: {card.scryfall_id}")
+            card.mana_cost = ""
+            card.image_uri = None
+            card.value = 0.0
+    logging.info(f"Enriched {len(cards)} cards with Scryfall data.")
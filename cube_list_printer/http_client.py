@@ -0,0 +1,97 @@
+import email.utils
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from cube_list_printer import metrics
+from cube_list_printer.base import VERSION
+
+if TYPE_CHECKING:
+    import requests
+
+# Transient failures worth another try.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRIES = 3
+BACKOFF = 0.5
+MAX_DELAY = 60.0
+TIMEOUT = 10
+# Connections kept alive per host, enough for every fetch worker.
+POOL_SIZE = 16
+USER_AGENT = f"cube_list_printer/{VERSION}"
+
+_session: Optional["requests.Session"] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """The process-wide session, so requests to the same host reuse kept-alive connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            # Scryfall asks API clients to identify themselves.
+            session.headers.update({"User-Agent": USER_AGENT, "Accept": "*/*"})
+            _session = session
+        return _session
+
+
+def retry_delay(attempt: int, backoff: float, retry_after: Optional[str] = None) -> float:
+    """Seconds to wait before retry number `attempt` + 1: what `Retry-After` asks for, else exponential backoff."""
+    if retry_after:
+        try:
+            return min(max(0.0, float(retry_after)), MAX_DELAY)
+        except ValueError:
+            pass
+        try:
+            retry_at = email.utils.parsedate_to_datetime(retry_after).timestamp()
+        except (TypeError, ValueError):
+            pass
+        else:
+            return min(max(0.0, retry_at - time.time()), MAX_DELAY)
+    return min(backoff * 2**attempt, MAX_DELAY)
+
+
+def get(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = TIMEOUT,
+    retries: int = RETRIES,
+    backoff: float = BACKOFF,
+    stream: bool = False,
+) -> "requests.Response":
+    """
+    GET `url` on the shared session, retrying connection errors, timeouts and 429/5xx responses up to `retries`
+    times with exponential backoff, or after as long as the server's `Retry-After` asks.
+
+    The last response is returned whatever its status; callers check it with `raise_for_status`.
+    """
+    import requests
+
+    attempt = 0
+    while True:
+        retry_after = None
+        try:
+            response = get_session().get(url, headers=headers, timeout=timeout, stream=stream)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt >= retries:
+                raise
+            reason: Any = e
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            reason = f"HTTP {response.status_code}"
+            retry_after = response.headers.get("Retry-After")
+            response.close()
+
+        delay = retry_delay(attempt, backoff, retry_after)
+        logging.warning(f"Retrying {url} in {delay:.1f}s after {reason}.")
+        metrics.count("http.retries")
+        time.sleep(delay)
+        attempt += 1
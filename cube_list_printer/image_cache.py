@@ -0,0 +1,268 @@
+"""
+Inspect and trim the card image cache.
+
+    cube_list_printer cache stats
+    cube_list_printer cache prune --max-mb 512
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Sequence, Set
+
+INDEX_NAME = "index.json"
+IMAGE_EXTENSIONS = (".jpg", ".png")
+
+
+class ImageCache:
+    """
+    Card images in `cache_dir`, kept under `max_bytes` by evicting the least recently used ones.
+
+    Sizes and access times live in an index next to the images. Images are written to a temporary file and
+    renamed into place, so a crash never leaves a partial image behind. On read an image with its indexed size
+    is trusted; images the index doesn't know about, e.g. from before the index existed or from a process whose
+    index update was lost, or whose size changed, are checked by decoding them once and adopted if they decode.
+    Images used through this instance are never evicted by it, so paths it returned stay valid while they're
+    rendered.
+    A `max_bytes` of None never evicts.
+
+    Backgrounds resampled into `derived_dir` count against the same budget. They're written by renders, often in
+    other processes, so each instance adopts the ones made since the index was last written, ordered for eviction
+    by when they were made.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None, derived_dir: Optional[str] = None):
+        self.dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries = load_index(cache_dir)
+        self._used: Set[str] = set()
+        # Derived images are indexed by their path relative to the cache directory.
+        self.derived = os.path.relpath(derived_dir, cache_dir) if derived_dir else None
+        self.track_derived()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def get(self, name: str) -> Optional[str]:
+        """Return the path of image `name` if it's cached and intact, recording the access."""
+        path = self.path(name)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            with self._lock:
+                self._entries.pop(name, None)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(name)
+        # An image of another size than indexed may just have been replaced by another process, so it's only
+        # discarded if it doesn't decode either; otherwise it's kept and reindexed at its new size.
+        if (entry is None or entry["size"] != size) and not is_valid_image(path):
+            logging.warning(f"Discarding damaged cached image {name}.")
+            self.remove(name)
+            return None
+
+        with self._lock:
+            self._entries[name] = {"size": size, "accessed": time.time()}
+            self._used.add(name)
+        return path
+
+    def put(self, name: str, data: bytes) -> str:
+        """Atomically store image `name`, evicting older images if the cache grows over budget."""
+        return self.put_stream(name, [data])
+
+    def put_stream(self, name: str, chunks: Iterable[bytes]) -> str:
+        """Like `put`, writing the image as its chunks arrive. Nothing is stored if they fail part way."""
+        path = self.path(name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        size = 0
+        # A long-lived instance, like the service's, outlives the directory being cleared.
+        os.makedirs(self.dir, exist_ok=True)
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._entries[name] = {"size": size, "accessed": time.time()}
+            self._used.add(name)
+        if self.max_bytes is not None:
+            self.prune(self.max_bytes)
+        return path
+
+    def remove(self, name: str) -> None:
+        with self._lock:
+            self._entries.pop(name, None)
+            self._used.discard(name)
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, max_bytes: int) -> int:
+        """Evict the least recently used images until the cache fits in `max_bytes`. Returns bytes freed."""
+        with self._lock:
+            total = sum(entry["size"] for entry in self._entries.values())
+            candidates = sorted(
+                (name for name in self._entries if name not in self._used),
+                key=lambda name: self._entries[name].get("accessed", 0),
+            )
+        freed = 0
+        for name in candidates:
+            if total - freed <= max_bytes:
+                break
+            with self._lock:
+                entry = self._entries.get(name)
+            if entry is None:
+                continue
+            self.remove(name)
+            freed += entry["size"]
+        if total - freed > max_bytes:
+            logging.warning(f"Image cache is {(total - freed) / 2**20:.1f} MiB, over budget with images in use.")
+        return freed
+
+    def track_derived(self) -> None:
+        """Index derived images the index doesn't know yet. They're written atomically, so their size is trusted."""
+        for name in self._list_images(self.derived) if self.derived is not None else set():
+            with self._lock:
+                if name in self._entries:
+                    continue
+            try:
+                stat = os.stat(self.path(name))
+            except OSError:
+                continue
+            with self._lock:
+                self._entries.setdefault(name, {"size": stat.st_size, "accessed": stat.st_mtime})
+
+    def _list_images(self, subdir: Optional[str] = None, remove_leftovers: bool = False) -> Set[str]:
+        """Names of the images in the cache directory, or in `subdir` of it."""
+        directory = self.path(subdir) if subdir else self.dir
+        try:
+            filenames = os.listdir(directory)
+        except FileNotFoundError:
+            return set()
+        names = set()
+        for filename in filenames:
+            name = os.path.join(subdir, filename) if subdir else filename
+            if filename.endswith(".tmp") and remove_leftovers:
+                try:
+                    os.remove(self.path(name))
+                except OSError as e:
+                    logging.warning(f"Could not remove leftover {name}: {e}")
+            elif filename.endswith(IMAGE_EXTENSIONS):
+                names.add(name)
+        return names
+
+    def scan(self) -> None:
+        """Adopt intact images missing from the index, and drop index entries and leftovers with no image."""
+        names = self._list_images(remove_leftovers=True)
+        derived = self._list_images(self.derived, remove_leftovers=True) if self.derived is not None else set()
+        with self._lock:
+            for name in set(self._entries) - names - derived:
+                del self._entries[name]
+            unknown = names - set(self._entries)
+        for name in unknown:
+            self.get(name)
+        self.track_derived()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "dir": self.dir,
+                "images": len(self._entries),
+                "bytes": sum(entry["size"] for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+    def flush(self) -> None:
+        """
+        Write the index, merged with the one on disk so concurrent processes sharing the cache keep each
+        other's entries.
+        """
+        with self._lock:
+            entries = load_index(self.dir)
+            for name, entry in self._entries.items():
+                if entry.get("accessed", 0) >= entries.get(name, {}).get("accessed", 0):
+                    entries[name] = entry
+            entries = {name: entry for name, entry in entries.items() if os.path.exists(self.path(name))}
+            self._entries = entries
+            path = os.path.join(self.dir, INDEX_NAME)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            os.makedirs(self.dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f, sort_keys=True)
+            os.replace(tmp_path, path)
+
+
+def load_index(cache_dir: str) -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(os.path.join(cache_dir, INDEX_NAME), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        logging.warning("Ignoring corrupt image cache index.")
+        return {}
+    entries = index.get("entries") if isinstance(index, dict) else None
+    return entries if isinstance(entries, dict) else {}
+
+
+def is_valid_image(path: str) -> bool:
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            img.load()
+    except Exception:
+        return False
+    return True
+
+
+def max_bytes_from_config(config: Dict[str, Any]) -> Optional[int]:
+    max_mb = config.get("image_cache_max_mb")
+    return int(max_mb * 2**20) if max_mb is not None else None
+
+
+def image_cache_from_config(config: Dict[str, Any], max_bytes: Optional[int] = None) -> ImageCache:
+    """The image cache of `config`, budgeted at `max_bytes` or else `image_cache_max_mb`."""
+    cache_dir = config["paths"]["image_cache_dir"]
+    # Without derived_image_dir, backgrounds are resampled into a `derived` directory next to the source.
+    derived_dir = config["paths"].get("derived_image_dir") or os.path.join(cache_dir, "derived")
+    return ImageCache(cache_dir, max_bytes if max_bytes is not None else max_bytes_from_config(config), derived_dir)
+
+
+def main(argv: Sequence[str]) -> int:
+    from cube_list_printer.main import CONFIG_PATH, load_config
+
+    parser = argparse.ArgumentParser(prog="cube_list_printer cache", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("action", choices=["stats", "prune"])
+    parser.add_argument("--max-mb", type=float, help="size to prune down to (default: image_cache_max_mb)")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    max_bytes = int(args.max_mb * 2**20) if args.max_mb is not None else max_bytes_from_config(config)
+    cache = image_cache_from_config(config, max_bytes)
+    cache.scan()
+
+    if args.action == "prune":
+        if max_bytes is None:
+            parser.error("no size to prune to, pass --max-mb or set image_cache_max_mb")
+        freed = cache.prune(max_bytes)
+        logging.info(f"Freed {freed / 2**20:.1f} MiB.")
+    cache.flush()
+
+    stats = cache.stats()
+    budget = f" of {stats['max_bytes'] / 2**20:.1f} MiB" if stats["max_bytes"] is not None else ""
+    print(f"{stats['dir']}: {stats['images']} images, {stats['bytes'] / 2**20:.1f} MiB{budget}")
+    return 0
@@ -1,41 +1,162 @@
+import functools
 import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from typing import Dict
+from typing import Dict, Iterator, Optional
 
-import requests
-from PIL import Image
+from cube_list_printer import http_client, metrics
+from cube_list_printer.image_cache import ImageCache
+from cube_list_printer.rate_limit import TokenBucket
+
+JPEG_QUALITY = 85
+PLACEHOLDER_SUFFIX = "_placeholder.png"
+DOWNLOAD_CHUNK_SIZE = 64 << 10
 
 
 def fetch_image(
     scryfall_id: str,
-    image_uris: Dict[str, str],
-    cache_dir: str,
+    image_url: Optional[str],
+    cache: ImageCache,
     delay: float = 1.0,
+    limiter: Optional[TokenBucket] = None,
 ) -> str:
-    os.makedirs(cache_dir, exist_ok=True)
-    filename = os.path.join(cache_dir, f"{scryfall_id}.jpg")
+    name = f"{scryfall_id}.jpg"
 
-    if os.path.exists(filename):
-        return filename
+    cached = cache.get(name)
+    if cached is not None:
+        metrics.count("images.cache_hits")
+        return cached
+    metrics.count("images.cache_misses")
 
-    image_url = image_uris.get("large") or image_uris.get("normal")
     if not image_url:
-        logging.warning(f"No image URIs for card {scryfall_id}, using placeholder.")
-        return generate_placeholder_image(cache_dir, scryfall_id)
-
-    time.sleep(delay)
-    resp = requests.get(image_url, timeout=10)
-    resp.raise_for_status()
-    img = Image.open(BytesIO(resp.content))
-    img.save(filename, format="JPEG")
-    return filename
-
-
-def generate_placeholder_image(cache_dir: str, scryfall_id: str) -> str:
-    placeholder_path = os.path.join(cache_dir, f"{scryfall_id}_placeholder.png")
-    if not os.path.exists(placeholder_path):
-        img = Image.new("RGB", (480, 680), color="grey")
-        img.save(placeholder_path, format="JPEG")
-    return placeholder_path
+        logging.warning(f"No image URI for card {scryfall_id}, using placeholder.")
+        return generate_placeholder_image(cache, scryfall_id)
+
+    if limiter is not None:
+        limiter.acquire()
+    else:
+        time.sleep(delay)
+    with http_client.get(image_url, stream=True) as resp:
+        resp.raise_for_status()
+        content_type = resp.headers.get("Content-Type", "image/jpeg")
+        if not content_type.startswith("image/"):
+            raise ValueError(f"Expected an image from {image_url}, got {content_type}.")
+
+        def chunks() -> Iterator[bytes]:
+            for chunk in resp.iter_content(DOWNLOAD_CHUNK_SIZE):
+                metrics.count("images.bytes_downloaded", len(chunk))
+                yield chunk
+
+        # Scryfall serves the JPEG we want, so it's stored as is rather than decoded and encoded again.
+        return cache.put_stream(name, chunks())
+
+
+def fetch_images(
+    image_urls_by_id: Dict[str, Optional[str]],
+    cache: ImageCache,
+    delay: float = 1.0,
+    max_workers: int = 4,
+) -> Dict[str, str]:
+    """
+    Fetch images for many cards on a bounded thread pool into `cache`, then bring it back under its budget,
+    evicting images not used by this call, and write its index.
+
+    :param image_urls_by_id: Mapping of Scryfall ID to the URI of the card's image, if it has one.
+    :param delay: Minimum interval between requests, enforced across all workers.
+    :return: Mapping of Scryfall ID to the local image path. Cards whose download fails get a placeholder.
+    """
+    limiter = TokenBucket.from_delay(delay)
+
+    def fetch_one(s_id: str) -> str:
+        return fetch_image_or_placeholder(s_id, image_urls_by_id[s_id], limiter, cache)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            return dict(zip(image_urls_by_id, pool.map(fetch_one, image_urls_by_id)))
+    finally:
+        # Derived images adopted since the last run may have put the cache over budget without any download.
+        if cache.max_bytes is not None:
+            cache.prune(cache.max_bytes)
+        cache.flush()
+
+
+def fetch_image_or_placeholder(
+    scryfall_id: str, image_url: Optional[str], limiter: TokenBucket, cache: ImageCache
+) -> str:
+    """Fetch one card's image like `fetch_image`, falling back to a placeholder if the download fails."""
+    try:
+        return fetch_image(scryfall_id, image_url, cache, limiter=limiter)
+    except Exception as e:
+        logging.error(f"Failed to fetch image for card {scryfall_id}: {e}")
+        return generate_placeholder_image(cache, scryfall_id)
+
+
+def generate_placeholder_image(cache: ImageCache, scryfall_id: str) -> str:
+    name = f"{scryfall_id}{PLACEHOLDER_SUFFIX}"
+    metrics.count("images.placeholders")
+    cached = cache.get(name)
+    if cached is not None:
+        return cached
+    return cache.put(name, placeholder_image_bytes())
+
+
+def is_placeholder(path: str) -> bool:
+    return path.endswith(PLACEHOLDER_SUFFIX)
+
+
+@functools.lru_cache(maxsize=None)
+def placeholder_image_bytes() -> bytes:
+    """The grey background of cards without an image, as JPEG bytes, encoded once per process and shared."""
+    from PIL import Image
+
+    img = Image.new("RGB", (480, 680), color="grey")
+    out = BytesIO()
+    img.save(out, format="JPEG")
+    return out.getvalue()
+
+
+def get_resampled_image(
+    source_path: str,
+    scryfall_id: str,
+    width_mm: float,
+    height_mm: float,
+    dpi: int,
+    quality: int = JPEG_QUALITY,
+    derived_dir: Optional[str] = None,
+) -> str:
+    """
+    Return a copy of `source_path` resampled to fill a `width_mm` x `height_mm` slot at `dpi`.
+
+    Derived images are cached under `derived_dir` (default: a `derived` directory next to the source), keyed by
+    Scryfall ID, pixel size, DPI and JPEG quality, so builds at different resolutions share the source cache.
+    The source is returned unchanged if it isn't larger than the slot.
+    """
+    from PIL import Image
+
+    width_px = max(1, round(width_mm / 25.4 * dpi))
+    height_px = max(1, round(height_mm / 25.4 * dpi))
+    derived_dir = derived_dir or os.path.join(os.path.dirname(source_path), "derived")
+    derived_path = os.path.join(derived_dir, f"{scryfall_id}_{width_px}x{height_px}_{dpi}dpi_q{quality}.jpg")
+
+    if os.path.exists(derived_path) and os.path.getmtime(derived_path) >= os.path.getmtime(source_path):
+        return derived_path
+
+    with Image.open(source_path) as img:
+        if img.width <= width_px and img.height <= height_px:
+            return source_path
+        resampled = img.convert("RGB").resize((width_px, height_px), Image.Resampling.LANCZOS)
+
+    os.makedirs(derived_dir, exist_ok=True)
+    # Render workers and concurrent runs may resample the same background, so each writes its own file.
+    tmp_path = f"{derived_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        resampled.save(tmp_path, format="JPEG", quality=quality, optimize=True)
+        os.replace(tmp_path, derived_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return derived_path
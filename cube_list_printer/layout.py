@@ -0,0 +1,126 @@
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Tuple
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from cube_list_printer.card import Card
+
+
+class Glyph(NamedTuple):
+    """An icon or a run of text, `x` points from the start of the mana cost."""
+
+    is_icon: bool
+    text: str
+    x: float
+
+
+class ManaRun(NamedTuple):
+    glyphs: Tuple[Glyph, ...]
+    width: float
+
+
+class Line(NamedTuple):
+    """One card in a booster's card list. Mana glyphs are placed `mana_x` points after the name starts."""
+
+    name: str
+    mana_x: float
+    mana: ManaRun
+
+
+class CacheStats:
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
+
+
+class LayoutEngine:
+    """
+    Lays out booster card lists, memoizing the parts that repeat across boosters and builds.
+
+    Each distinct mana cost is parsed once into a run of glyphs with precomputed offsets, and each distinct
+    string's width is measured once. Whether a symbol is drawn as an icon depends on the icon set, so an
+    engine is bound to the names of the icons available.
+    """
+
+    def __init__(
+        self,
+        icon_names: FrozenSet[str],
+        font_name: str,
+        font_size: float,
+        icon_size: float,
+        separator: str,
+        padding: float,
+    ):
+        self.icon_names = icon_names
+        self.font_name = font_name
+        self.font_size = font_size
+        self.icon_size = icon_size
+        self.separator = separator
+        self.padding = padding
+        self._widths: Dict[str, float] = {}
+        self._runs: Dict[str, ManaRun] = {}
+        self.width_stats = CacheStats()
+        self.run_stats = CacheStats()
+
+    def text_width(self, text: str) -> float:
+        width = self._widths.get(text)
+        if width is None:
+            self.width_stats.misses += 1
+            width = self._widths[text] = stringWidth(text, self.font_name, self.font_size)
+        else:
+            self.width_stats.hits += 1
+        return width
+
+    def mana_run(self, mana_cost: str) -> ManaRun:
+        run = self._runs.get(mana_cost)
+        if run is None:
+            self.run_stats.misses += 1
+            run = self._runs[mana_cost] = self._parse_mana_cost(mana_cost)
+        else:
+            self.run_stats.hits += 1
+        return run
+
+    def _parse_mana_cost(self, mana_cost: str) -> ManaRun:
+        parts = mana_cost.split(self.separator)
+        glyphs: List[Glyph] = []
+        offset_x = 0.0
+
+        for i, part in enumerate(parts):
+            symbols = part.strip("{}").split("}{") if "{" in part else []
+            segment_x = 0.0
+            for sym in symbols:
+                sym = sym.upper()
+                # Some costs might be numeric like {2}, {3}, or hybrid symbols without an icon: draw them as text
+                if sym in self.icon_names:
+                    glyphs.append(Glyph(True, sym, offset_x + segment_x))
+                    segment_x += self.icon_size + self.padding
+                else:
+                    glyphs.append(Glyph(False, sym, offset_x + segment_x))
+                    segment_x += self.text_width(sym) + self.padding
+            offset_x += segment_x - self.padding if segment_x > 0 else 0
+
+            if i < len(parts) - 1:
+                glyphs.append(Glyph(False, self.separator, offset_x))
+                offset_x += self.text_width(self.separator) + self.padding
+
+        return ManaRun(tuple(glyphs), offset_x + 4)
+
+    def layout_lines(self, cards: Iterable[Card]) -> List[Line]:
+        lines = []
+        for card in cards:
+            mana = self.mana_run(card.mana_cost) if card.mana_cost else EMPTY_RUN
+            lines.append(Line(card.name, self.text_width(card.name) + 4, mana))
+        return lines
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {"text_width": self.width_stats.as_dict(), "mana_cost": self.run_stats.as_dict()}
+
+
+EMPTY_RUN = ManaRun((), 0.0)
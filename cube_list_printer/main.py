@@ -1,76 +1,472 @@
+import argparse
+import io
+import itertools
 import logging
+import os
 import sys
+from typing import IO, TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import yaml
 
-from cube_list_printer.data_loader import enrich_boosters_with_scryfall_data, get_boosters_from_dataframe, load_data
-from cube_list_printer.image_handler import fetch_image, generate_placeholder_image
-from cube_list_printer.pdf_generator import generate_pdf, load_mana_icons
-from cube_list_printer.symbol_handler import fetch_symbols
+from cube_list_printer.metrics import collect, count, report, set_counter, stage
+
+if TYPE_CHECKING:
+    from cube_list_printer.card import Card
+    from cube_list_printer.image_cache import ImageCache
+    from cube_list_printer.pdf_generator import RenderReport
+
+# pandas, reportlab, PIL and requests take hundreds of milliseconds to import, so each stage imports what it
+# needs when it runs. A run with everything cached never imports requests, and subcommands and argument errors
+# import none of them.
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s]: %(message)s")
 
+CONFIG_PATH = "config/settings.yaml"
+
+
+def load_config(path: str = CONFIG_PATH) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def bulk_data_path(config: Dict[str, Any]) -> str:
+    """
+    The Scryfall bulk file to read. Until `sync` has written a gzipped `paths.scryfall_bulk`, an uncompressed file
+    of the same name without `.gz`, where it was kept before the default path changed, is read instead.
+    """
+    path = config["paths"]["scryfall_bulk"]
+    if path.endswith(".gz") and not os.path.exists(path):
+        uncompressed = os.path.splitext(path)[0]
+        if os.path.exists(uncompressed):
+            logging.warning(f"{path} not found, reading {uncompressed}. Run `cube_list_printer sync` to replace it.")
+            return uncompressed
+    return path
+
+
+def batch(args: Sequence[str]) -> int:
+    from cube_list_printer.batch import main as batch_main
+
+    return batch_main(args)
+
+
+def cache(args: Sequence[str]) -> int:
+    from cube_list_printer.image_cache import main as cache_main
+
+    return cache_main(args)
+
+
+def sync(args: Sequence[str]) -> int:
+    from cube_list_printer.bulk_sync import main as sync_main
+
+    return sync_main(args)
+
+
+def serve(args: Sequence[str]) -> int:
+    from cube_list_printer.service import main as serve_main
+
+    return serve_main(args)
+
+
+# Subcommands, dispatched on the first argument. Anything else is the CSV to print.
+COMMANDS: Dict[str, Callable[[Sequence[str]], int]] = {
+    "batch": batch,
+    "cache": cache,
+    "serve": serve,
+    "sync": sync,
+}
+
 
 def main():
-    with open("config/settings.yaml", "r") as f:
-        config = yaml.safe_load(f)
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
+
+    parser = argparse.ArgumentParser(prog="cube_list_printer", description="Print booster card lists to a PDF.")
+    parser.add_argument("csv", nargs="?", help="booster CSV to print (default: paths.csv_file)")
+    parser.add_argument(
+        "--refresh", action="store_true", help="rebuild the boosters even if they're cached for unchanged inputs"
+    )
+    args = parser.parse_args()
+
+    config = load_config()
+    csv_path = args.csv or config["paths"]["csv_file"]
+    metrics_config = config.get("metrics") or {}
+    with collect(metrics_config.get("trace_memory", False)) as run_metrics:
+        try:
+            if config.get("streaming"):
+                run_streaming(config, csv_path)
+            else:
+                run(config, csv_path, args.refresh)
+        finally:
+            report(run_metrics, metrics_config.get("json"), metrics_config.get("summary", False))
+
+
+def run(config: Dict[str, Any], csv_path: str, refresh: bool = False) -> None:
+    from cube_list_printer.pdf_merge import count_embedded_images
 
-    csv_path = sys.argv[1] if len(sys.argv) > 1 else config["paths"]["csv_file"]
-    json_path = config["paths"]["scryfall_bulk"]
-    image_cache_dir = config["paths"]["image_cache_dir"]
-    symbol_cache_dir = config["paths"].get("symbol_cache_dir", "data/symbols")
     output_pdf = config["paths"]["output_pdf"]
-    delay = config["fetch_delay"]
-    card_width_mm = config["card_width_mm"]
-    card_height_mm = config["card_height_mm"]
 
     # Load data
     try:
-        df, scryfall_map = load_data(csv_path, json_path)
+        boosters = load_boosters(config, csv_path, refresh)
     except FileNotFoundError as e:
         logging.error(f"File not found: {e}")
         sys.exit(1)
     except Exception as e:
         logging.error(f"Error loading data: {e}")
         sys.exit(1)
+    set_counter("boosters", len(boosters))
 
-    boosters = get_boosters_from_dataframe(df)
-    enrich_boosters_with_scryfall_data(boosters, scryfall_map)
+    # Warm builds go through the page cache instead, as there's nothing to download while drawing.
+    pipelined = config.get("pipeline", False) and has_missing_images(config, boosters)
+    if not pipelined:
+        from cube_list_printer.image_cache import image_cache_from_config
 
-    # Sort each booster's cards alphabetically by name
-    for booster_id, data in boosters.items():
-        data["cards"].sort(key=lambda c: c["name"].lower())
+        with stage("fetch_images"):
+            attach_images(config, [boosters], image_cache_from_config(config))
+        icon_map = load_icons(config)
 
-    # Fetch images for each booster's most valuable card
-    for booster_id, data in boosters.items():
-        cards = data["cards"]
-        if not cards:
-            logging.warning(f"Booster '{booster_id}' has no cards.")
-            continue
-        most_valuable = max(cards, key=lambda x: x.get("value", 0))
+    # Generate PDF
+    try:
+        if pipelined:
+            with stage("render_pipelined"):
+                pdf_report, _ = render_pipelined(config, boosters, output_pdf)
+        else:
+            with stage("generate_pdf"):
+                pdf_report = render_pdf(config, boosters, icon_map, output_pdf)
+        set_counter("pdf.pages", pdf_report.pages)
+        set_counter("pdf.pages_reused", pdf_report.reused)
+        set_counter("pdf.images_embedded", count_embedded_images(output_pdf))
+        set_counter("pdf.bytes", os.path.getsize(output_pdf))
+        logging.info(f"PDF successfully created: {output_pdf}")
+    except Exception as e:
+        logging.error(f"Error generating PDF: {e}")
+        sys.exit(1)
 
-        s_id = most_valuable["scryfall_id"]
-        image_uris = most_valuable.get("image_uris", {})
-        try:
-            local_path = fetch_image(s_id, image_uris, image_cache_dir, delay)
-            most_valuable["image_local_path"] = local_path
-        except Exception as e:
-            logging.error(f"Failed to fetch image for card {most_valuable['name']} (Booster {booster_id}): {e}")
-            most_valuable["image_local_path"] = generate_placeholder_image(image_cache_dir, s_id)
 
-    # Fetch and cache mana symbols from Scryfall
-    symbol_map = fetch_symbols(symbol_cache_dir, fetch_delay=0.2)
-    # Load mana icons from cached PNGs
-    icon_map = load_mana_icons(symbol_map)
+def run_streaming(config: Dict[str, Any], csv_path: str) -> None:
+    """
+    Print `csv_path` in memory that doesn't grow with the cube: boosters are read in file order, enriched,
+    given their images and drawn `stream_pages_per_part` pages at a time, and each chunk is let go once its
+    pages are written. Binders must be contiguous in the CSV, and pages aren't cached or rendered in parallel.
+    """
+    from cube_list_printer.bulk_index import BulkIndex, ensure_index
+    from cube_list_printer.data_loader import get_booster_scryfall_ids, iter_boosters_csv
+    from cube_list_printer.image_cache import image_cache_from_config
+    from cube_list_printer.image_handler import JPEG_QUALITY
+    from cube_list_printer.pdf_generator import COLS, ROWS, generate_pdf_streaming
+
+    output_pdf = config["paths"]["output_pdf"]
+    chunk_size = config.get("stream_pages_per_part", 20) * ROWS * COLS
+    icon_map = load_icons(config)
+    # One cache for every chunk, so its index is loaded once and its budget enforced across the whole run.
+    cache = image_cache_from_config(config)
+
+    def chunks(booster_iter: Iterator[Tuple[str, Dict[str, Any]]], index: BulkIndex) -> Iterator[Dict[str, Any]]:
+        while True:
+            with stage("load_data"):
+                boosters = dict(itertools.islice(booster_iter, chunk_size))
+            if not boosters:
+                return
+            with stage("build_boosters"):
+                boosters = build_boosters(boosters, index.lookup(get_booster_scryfall_ids(boosters)))
+            count("boosters", len(boosters))
+            with stage("fetch_images"):
+                attach_images(config, [boosters], cache)
+            yield boosters
 
-    # Generate PDF
     try:
-        generate_pdf(output_pdf, boosters, icon_map, card_width_mm, card_height_mm)
+        with open(csv_path, "r", encoding="utf-8-sig", newline="") as f, ensure_index(bulk_data_path(config)) as index:
+            # Includes the stages above, which run whenever the next chunk is needed.
+            with stage("stream_pdf"):
+                pdf_report = generate_pdf_streaming(
+                    output_pdf,
+                    chunks(iter_boosters_csv(f), index),
+                    icon_map,
+                    config["card_width_mm"],
+                    config["card_height_mm"],
+                    dpi=config.get("dpi"),
+                    jpeg_quality=config.get("jpeg_quality", JPEG_QUALITY),
+                    derived_image_dir=config["paths"].get("derived_image_dir"),
+                )
+        set_counter("pdf.pages", pdf_report.pages)
+        set_counter("pdf.bytes", os.path.getsize(output_pdf))
         logging.info(f"PDF successfully created: {output_pdf}")
     except Exception as e:
         logging.error(f"Error generating PDF: {e}")
         sys.exit(1)
 
 
+def render_pipelined(
+    config: Dict[str, Any], boosters: Dict[str, Any], output_pdf: str
+) -> Tuple["RenderReport", Dict[str, str]]:
+    """
+    Print like `run` with the network and the CPU busy at once. Mana symbols and backgrounds download in the
+    background, and each page is drawn as soon as the symbols and its backgrounds are in, with at most
+    `pipeline_prefetch` backgrounds downloaded ahead of the page being drawn. A cold build then takes about as
+    long as the slower of downloading and drawing. Pages aren't cached or rendered in parallel.
+
+    :return: The render report, and the path of each background image by Scryfall ID.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from cube_list_printer.image_cache import image_cache_from_config
+    from cube_list_printer.image_handler import JPEG_QUALITY, fetch_image_or_placeholder
+    from cube_list_printer.pdf_generator import generate_pdf_pipelined, paginate
+    from cube_list_printer.pipeline import Prefetcher
+    from cube_list_printer.rate_limit import TokenBucket
+
+    cache = image_cache_from_config(config)
+    limiter = TokenBucket.from_delay(config["fetch_delay"])
+    pages = paginate(list(boosters.keys()))
+
+    # Each image is fetched once, in the order the pages need them.
+    cards: Dict[str, "Card"] = {}
+    for page_ids in pages:
+        for booster_id in page_ids:
+            card = boosters[booster_id]["most_valuable"]
+            if card is None:
+                logging.warning(f"Booster '{booster_id}' has no cards.")
+            else:
+                cards.setdefault(card.scryfall_id, card)
+
+    def fetch(card: "Card") -> Tuple[str, str]:
+        return card.scryfall_id, fetch_image_or_placeholder(card.scryfall_id, card.image_uri, limiter, cache)
+
+    image_paths: Dict[str, str] = {}
+
+    def ready_pages(fetched: Iterator[Tuple[str, str]]) -> Iterator[List[str]]:
+        for page_ids in pages:
+            for booster_id in page_ids:
+                card = boosters[booster_id]["most_valuable"]
+                if card is None:
+                    continue
+                while card.scryfall_id not in image_paths:
+                    s_id, path = next(fetched)
+                    image_paths[s_id] = path
+                card.image_local_path = image_paths[card.scryfall_id]
+            yield page_ids
+
+    prefetch = config.get("pipeline_prefetch", 36)
+    try:
+        with ThreadPoolExecutor(max_workers=1) as symbols, Prefetcher(
+            fetch, cards.values(), config.get("fetch_workers", 4), prefetch
+        ) as fetched:
+            icons = symbols.submit(load_icons, config)
+            pdf_report = generate_pdf_pipelined(
+                output_pdf,
+                boosters,
+                ready_pages(fetched),
+                icons.result(),
+                config["card_width_mm"],
+                config["card_height_mm"],
+                dpi=config.get("dpi"),
+                jpeg_quality=config.get("jpeg_quality", JPEG_QUALITY),
+                derived_image_dir=config["paths"].get("derived_image_dir"),
+            )
+    finally:
+        cache.flush()
+    return pdf_report, image_paths
+
+
+def has_missing_images(config: Dict[str, Any], boosters: Dict[str, Any]) -> bool:
+    """Whether any booster's background has yet to be downloaded."""
+    cache_dir = config["paths"]["image_cache_dir"]
+    for data in boosters.values():
+        card = data["most_valuable"]
+        if card is None or not card.image_uri:
+            continue
+        if not os.path.exists(os.path.join(cache_dir, f"{card.scryfall_id}.jpg")):
+            return True
+    return False
+
+
+def load_boosters(config: Dict[str, Any], csv_path: str, refresh: bool = False) -> Dict[str, Any]:
+    """
+    Read, enrich and sort the boosters of `csv_path`, or reuse them from `paths.booster_cache_dir` when the CSV,
+    the bulk file, the CSV reader and the code haven't changed since they were cached. `refresh` rebuilds them
+    regardless.
+    """
+    from cube_list_printer.booster_cache import BoosterCache
+    from cube_list_printer.data_loader import get_booster_scryfall_ids, load_scryfall_map
+
+    json_path = bulk_data_path(config)
+    cache_dir = config["paths"].get("booster_cache_dir")
+    csv_reader = config.get("csv_reader", "pandas")
+    cache = BoosterCache(cache_dir, csv_path, json_path, csv_reader) if cache_dir else None
+    if cache is not None and not refresh:
+        with stage("load_cached_boosters"):
+            cached = cache.load()
+        if cached is not None:
+            count("boosters.cache_hits")
+            logging.info(f"Reusing boosters cached for unchanged inputs, {len(cached)} boosters.")
+            return cached
+        count("boosters.cache_misses")
+
+    with stage("load_data"):
+        logging.info("Loading CSV and JSON data...")
+        boosters = read_boosters(config, csv_path)
+        scryfall_map = load_scryfall_map(json_path, get_booster_scryfall_ids(boosters))
+    with stage("build_boosters"):
+        boosters = build_boosters(boosters, scryfall_map)
+
+    if cache is not None:
+        try:
+            cache.store(boosters)
+        except OSError as e:
+            logging.warning(f"Could not cache boosters: {e}")
+    return boosters
+
+
+def read_boosters(config: Dict[str, Any], source: Union[str, IO[bytes]]) -> Dict[str, Any]:
+    """
+    Group the booster CSV at `source`, a path or a binary file, by binder.
+
+    `csv_reader: csv` streams it with the stdlib csv module instead of loading it into a DataFrame.
+    """
+    from cube_list_printer.data_loader import CSV_OPTIONS, get_boosters_from_dataframe, read_boosters_csv
+
+    if config.get("csv_reader", "pandas") == "csv":
+        if isinstance(source, str):
+            with open(source, "r", encoding="utf-8-sig", newline="") as f:
+                return read_boosters_csv(f)
+        return read_boosters_csv(io.TextIOWrapper(source, encoding="utf-8-sig", newline=""))
+
+    import pandas as pd
+
+    return get_boosters_from_dataframe(pd.read_csv(source, **CSV_OPTIONS))
+
+
+def build_boosters(boosters: Dict[str, Any], scryfall_map: Dict[str, Any]) -> Dict[str, Any]:
+    from cube_list_printer.data_loader import enrich_boosters_with_scryfall_data
+
+    enrich_boosters_with_scryfall_data(boosters, scryfall_map)
+
+    # Sort each booster's cards alphabetically by name
+    for booster_id, data in boosters.items():
+        data["cards"].sort(key=lambda c: c.name.lower())
+    return boosters
+
+
+def attach_images(
+    config: Dict[str, Any],
+    cubes: List[Dict[str, Any]],
+    cache: "ImageCache",
+    known: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """
+    Fetch the image of each booster's most valuable card, as chosen by `build_boosters`, into `cache` and store
+    its path on the card.
+
+    Boosters of several cubes can be passed at once, so their downloads share one rate limit.
+    Paths in `known` are used as long as the image is still there, and newly fetched ones are added to it.
+    Placeholders for failed downloads aren't, so those cards are fetched again next time.
+    """
+    known = {} if known is None else known
+    most_valuable_cards = []
+    for boosters in cubes:
+        for booster_id, data in boosters.items():
+            if data["most_valuable"] is None:
+                logging.warning(f"Booster '{booster_id}' has no cards.")
+                continue
+            most_valuable_cards.append(data["most_valuable"])
+
+    image_urls_by_id = {
+        card.scryfall_id: card.image_uri
+        for card in most_valuable_cards
+        # The image cache may have evicted a known image since it was fetched.
+        if not os.path.exists(known.get(card.scryfall_id, ""))
+    }
+    if image_urls_by_id:
+        from cube_list_printer.image_handler import fetch_images, is_placeholder
+
+        fetched = fetch_images(image_urls_by_id, cache, config["fetch_delay"], config.get("fetch_workers", 4))
+        known.update((s_id, path) for s_id, path in fetched.items() if not is_placeholder(path))
+    else:
+        fetched = {}
+    image_paths = {}
+    for card in most_valuable_cards:
+        path = fetched.get(card.scryfall_id) or known[card.scryfall_id]
+        card.image_local_path = image_paths[card.scryfall_id] = path
+    return image_paths
+
+
+def load_icons(config: Dict[str, Any]) -> Dict[str, Any]:
+    from cube_list_printer.pdf_generator import load_mana_icons
+    from cube_list_printer.symbol_handler import fetch_symbols
+
+    # Fetch and cache mana symbols from Scryfall
+    symbol_cache_dir = config["paths"].get("symbol_cache_dir", "data/symbols")
+    symbol_ttl_days = config.get("symbol_revalidate_days")
+    symbol_ttl = symbol_ttl_days * 86400 if symbol_ttl_days is not None else None
+    with stage("fetch_symbols"):
+        symbol_map = fetch_symbols(
+            symbol_cache_dir,
+            fetch_delay=0.2,
+            ttl=symbol_ttl,
+            max_workers=config.get("fetch_workers", 4),
+            symbol_format=config.get("symbol_format", "png"),
+        )
+    # Load mana icons from the cached PNGs or vector paths
+    with stage("load_mana_icons"):
+        return load_mana_icons(symbol_map)
+
+
+def render_pdf(
+    config: Dict[str, Any], boosters: Dict[str, Any], icon_map: Dict[str, Any], output_pdf: str, **overrides: Any
+) -> "RenderReport":
+    from cube_list_printer.image_handler import JPEG_QUALITY
+    from cube_list_printer.pdf_generator import generate_pdf
+
+    options = {
+        "dpi": config.get("dpi"),
+        "jpeg_quality": config.get("jpeg_quality", JPEG_QUALITY),
+        "derived_image_dir": config["paths"].get("derived_image_dir"),
+        "workers": config.get("render_workers", 1),
+        "page_cache_dir": config["paths"].get("page_cache_dir"),
+    }
+    options.update(overrides)
+    return generate_pdf(output_pdf, boosters, icon_map, config["card_width_mm"], config["card_height_mm"], **options)
+
+
+def render_pdf_bytes(config: Dict[str, Any], boosters: Dict[str, Any], icon_map: Dict[str, Any]) -> bytes:
+    """Render the boosters to PDF bytes in memory, with no temporary or placeholder files."""
+    from cube_list_printer.pdf_generator import generate_pdf_bytes
+
+    backgrounds = load_backgrounds(config, boosters)
+    return generate_pdf_bytes(boosters, icon_map, config["card_width_mm"], config["card_height_mm"], backgrounds)
+
+
+def load_backgrounds(config: Dict[str, Any], boosters: Dict[str, Any]) -> Dict[str, bytes]:
+    """
+    Read the fetched image of each booster's most valuable card, resampled to `dpi` if it's set, keyed by
+    Scryfall ID. Cards whose image is missing are left out and get the placeholder.
+    """
+    from cube_list_printer.image_handler import JPEG_QUALITY
+    from cube_list_printer.pdf_generator import get_print_background
+
+    backgrounds: Dict[str, bytes] = {}
+    for data in boosters.values():
+        card = data["most_valuable"]
+        if card is None or card.scryfall_id in backgrounds or not card.image_local_path:
+            continue
+        path = card.image_local_path
+        if config.get("dpi") and os.path.exists(path):
+            path = get_print_background(
+                path,
+                card.scryfall_id,
+                config["card_width_mm"],
+                config["card_height_mm"],
+                config["dpi"],
+                config.get("jpeg_quality", JPEG_QUALITY),
+                config["paths"].get("derived_image_dir"),
+            )
+        try:
+            with open(path, "rb") as f:
+                backgrounds[card.scryfall_id] = f.read()
+        except OSError as e:
+            logging.warning(f"Could not read background {path}, using a placeholder: {e}")
+    return backgrounds
+
+
 if __name__ == "__main__":
     main()
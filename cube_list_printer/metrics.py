@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+
+class StageTiming:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_memory: Optional[int] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        timing: Dict[str, Any] = {"calls": self.calls, "wall_seconds": self.wall, "cpu_seconds": self.cpu}
+        if self.peak_memory is not None:
+            timing["peak_memory_bytes"] = self.peak_memory
+        return timing
+
+
+class _OpenStage:
+    __slots__ = ("peak",)
+
+    def __init__(self) -> None:
+        self.peak = 0
+
+
+class Metrics:
+    """
+    Wall-clock and CPU time per pipeline stage, plus named counters.
+
+    Timing a stage costs two clock reads and counting takes a lock, so both are cheap enough to leave on.
+    Tracing memory with tracemalloc slows allocation-heavy code down noticeably and is off unless
+    `trace_memory` is set. CPU time is this process's only: work done in pool processes shows up as wall time.
+
+    tracemalloc has a single peak per process, so before a stage resets it the peak so far is credited to every
+    stage still open. Nested stages thus keep their parent's peak, and stages open concurrently in other
+    threads count each other's allocations rather than lose their own.
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.stages: Dict[str, StageTiming] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._open: List[_OpenStage] = []
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        open_stage = _OpenStage()
+        if tracing:
+            with self._lock:
+                self._record_peak()
+                self._open.append(open_stage)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            with self._lock:
+                timing = self.stages.setdefault(name, StageTiming())
+                timing.calls += 1
+                timing.wall += wall
+                timing.cpu += cpu
+                if tracing:
+                    self._record_peak()
+                    self._open.remove(open_stage)
+                    timing.peak_memory = max(timing.peak_memory or 0, open_stage.peak)
+
+    def _record_peak(self) -> None:
+        """Credit the traced peak since the last reset to every open stage and reset it. Needs `_lock` held."""
+        peak = tracemalloc.get_traced_memory()[1]
+        for open_stage in self._open:
+            open_stage.peak = max(open_stage.peak, peak)
+        tracemalloc.reset_peak()
+
+    def count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, name: str, value: float) -> None:
+        with self._lock:
+            self.counters[name] = value
+
+    def as_dict(self) -> Dict[str, Any]:
+        metrics: Dict[str, Any] = {
+            "wall_seconds": time.perf_counter() - self._started,
+            "stages": {name: timing.as_dict() for name, timing in self.stages.items()},
+            "counters": dict(sorted(self.counters.items())),
+        }
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux.
+            metrics["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return metrics
+
+    def write_json(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def summary(self) -> str:
+        metrics = self.as_dict()
+        lines = [f"Total: {metrics['wall_seconds']:.2f}s"]
+        for name, timing in metrics["stages"].items():
+            line = f"  {name:<24} {timing['wall_seconds']:8.2f}s wall {timing['cpu_seconds']:8.2f}s cpu"
+            if "peak_memory_bytes" in timing:
+                line += f" {timing['peak_memory_bytes'] / 2**20:8.1f} MiB peak"
+            lines.append(line)
+        lines.extend(f"  {name:<24} {value:g}" for name, value in metrics["counters"].items())
+        return "\n".join(lines)
+
+
+_active = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _active
+
+
+@contextmanager
+def collect(trace_memory: bool = False) -> Iterator[Metrics]:
+    """Record `stage` and `count` calls made anywhere in this process into a fresh `Metrics`."""
+    global _active
+    previous = _active
+    _active = Metrics(trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        yield _active
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _active = previous
+
+
+def stage(name: str) -> Any:
+    return _active.stage(name)
+
+
+def count(name: str, n: float = 1) -> None:
+    _active.count(name, n)
+
+
+def set_counter(name: str, value: float) -> None:
+    _active.set(name, value)
+
+
+def report(metrics: Metrics, json_path: Optional[str] = None, summary: bool = False) -> None:
+    if json_path:
+        metrics.write_json(json_path)
+    if summary:
+        logging.info(f"Pipeline metrics:\n{metrics.summary()}")
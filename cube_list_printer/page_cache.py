@@ -0,0 +1,75 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Union
+
+from PIL import Image
+
+from cube_list_printer.vector_symbol import VectorSymbol
+
+
+class PageCache:
+    """
+    Single-page PDFs from earlier builds of one output file, keyed by a hash of everything that went into them.
+
+    Each output gets its own directory under `cache_dir`, and pages no longer used by the latest build of that
+    output are pruned after it.
+    """
+
+    def __init__(self, cache_dir: str, output_path: str):
+        output_key = hashlib.sha1(os.path.abspath(output_path).encode("utf-8")).hexdigest()[:16]
+        self.dir = os.path.join(cache_dir, output_key)
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.dir, f"{key}.pdf")
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+    def tmp_path(self, key: str) -> str:
+        """Where to render page `key` before `commit` moves it into place, so a killed build leaves no partial page."""
+        return f"{self.path(key)}.{os.getpid()}.tmp"
+
+    def commit(self, key: str) -> None:
+        os.replace(self.tmp_path(key), self.path(key))
+
+    def discard(self, key: str) -> None:
+        try:
+            os.remove(self.tmp_path(key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, keep: Iterable[str]) -> None:
+        keep_files = {f"{key}.pdf" for key in keep}
+        for filename in os.listdir(self.dir):
+            if filename not in keep_files:
+                try:
+                    os.remove(os.path.join(self.dir, filename))
+                except OSError as e:
+                    logging.warning(f"Could not prune cached page {filename}: {e}")
+
+
+def hash_inputs(inputs: Any) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def fingerprint_icons(icon_map: Dict[str, Union[Image.Image, VectorSymbol]]) -> str:
+    digest = hashlib.sha256()
+    for sym in sorted(icon_map):
+        img = icon_map[sym]
+        if isinstance(img, VectorSymbol):
+            digest.update(f"{sym}:vector:{img.digest}".encode("utf-8"))
+            continue
+        digest.update(f"{sym}:{img.mode}:{img.size}:".encode("utf-8"))
+        digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def fingerprint_file(path: str) -> Dict[str, Any]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {"path": path}
+    return {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
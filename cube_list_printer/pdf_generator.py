@@ -1,5 +1,11 @@
+import hashlib
+import logging
 import os
-from typing import Any, Dict, List
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from io import BytesIO
+from typing import Any, BinaryIO, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple, TypeVar, Union
 
 from PIL import Image
 from reportlab.lib import colors
@@ -7,6 +13,13 @@ from reportlab.lib.pagesizes import A4
 from reportlab.lib.utils import ImageReader
 from reportlab.pdfgen import canvas
 
+from cube_list_printer.base import VERSION, source_fingerprint
+from cube_list_printer.card import Card
+from cube_list_printer.image_handler import JPEG_QUALITY, get_resampled_image, placeholder_image_bytes
+from cube_list_printer.layout import LayoutEngine, ManaRun
+from cube_list_printer.page_cache import PageCache, fingerprint_file, fingerprint_icons, hash_inputs
+from cube_list_printer.vector_symbol import VectorSymbol, load_vector_symbol
+
 TITLE_FONT_SIZE = 14
 FONT_SIZE = 10
 FONT_NAME = "Times-Roman"
@@ -26,21 +39,50 @@ ROWS = 3
 MARGIN_X = 25
 MARGIN_Y = 25
 
+PDF_TITLE = "Booster Cards"
+
+# Everything above that changes how a page looks, so cached pages are invalidated when it changes.
+LAYOUT = {
+    "title_font": (TITLE_FONT_NAME, TITLE_FONT_SIZE),
+    "font": (FONT_NAME, FONT_SIZE),
+    "separator": (SEPARATOR, SEPARATOR_PADDING),
+    "overlay_opacity": BACKGROUND_OVERLAY_OPACITY,
+    "text_margins": (INTERNAL_MARGIN, TEXT_MARGIN_LEFT, TEXT_MARGIN_TOP, LINE_SPACING),
+    "grid": (COLS, ROWS, MARGIN_X, MARGIN_Y),
+}
+# The code that draws pages. Cached pages are also keyed on its source, so changing how anything is drawn
+# invalidates them without a version bump.
+RENDER_MODULES = ("pdf_generator.py", "layout.py", "vector_symbol.py", "image_handler.py")
+
+T = TypeVar("T")
+Output = TypeVar("Output", str, BinaryIO)
+Icon = Union[Image.Image, VectorSymbol]
+# A background is either the path of an image file or the image's encoded bytes.
+Background = Union[str, bytes]
+
 
 def mm_to_points(mm_value: float) -> float:
     return mm_value * (72.0 / 25.4)
 
 
-def load_mana_icons(symbol_map: Dict[str, str]) -> Dict[str, Image.Image]:
+def load_mana_icons(symbol_map: Dict[str, str]) -> Dict[str, Icon]:
     """
-    Load mana icons from the cached PNG files obtained from Scryfall symbology.
-    symbol_map: { 'W': 'path/to/W.png', ... }
+    Load mana icons from the cached files obtained from Scryfall symbology.
+    symbol_map: { 'W': 'path/to/W.png', 'U': 'path/to/U.svg', ... }
 
-    Return a dict { 'W': PIL.Image, 'U': PIL.Image, ... }
+    Return a dict { 'W': PIL.Image, 'U': VectorSymbol, ... }. A symbol whose SVG can't be converted is left
+    out, so its cost falls back to text.
     """
-    icon_map = {}
+    icon_map: Dict[str, Icon] = {}
     for sym, path in symbol_map.items():
-        if os.path.exists(path):
+        if not os.path.exists(path):
+            continue
+        if path.endswith(".svg"):
+            try:
+                icon_map[sym] = load_vector_symbol(path)
+            except ValueError as e:
+                logging.warning(f"Could not convert symbol {{{sym}}} from {path}: {e}")
+        else:
             img = Image.open(path).convert("RGBA")
             bg = Image.new("RGBA", img.size, (255, 255, 255, 255))
             bg.alpha_composite(img)
@@ -48,8 +90,112 @@ def load_mana_icons(symbol_map: Dict[str, str]) -> Dict[str, Image.Image]:
     return icon_map
 
 
+class ResourceRegistry:
+    """
+    Per-document registry of named form XObjects.
+
+    Mana icons and card backgrounds are each defined once, the first time they are used, and every later use
+    only references them by name. The overlay's transparency state is already a single shared ExtGState in
+    ReportLab, and form XObjects can't carry one, so the overlay is drawn directly.
+    """
+
+    def __init__(self, c: canvas.Canvas, icon_map: Dict[str, Icon], card_width: float, card_height: float):
+        self.c = c
+        self.icon_map = icon_map
+        self.card_width = card_width
+        self.card_height = card_height
+        self._forms: Dict[str, str] = {}
+        self._digests: Dict[bytes, str] = {}
+
+    def _define(self, name: str, width: float, height: float, draw: Any) -> str:
+        if name not in self._forms:
+            self.c.beginForm(name, 0, 0, width, height)
+            draw()
+            self.c.endForm()
+            self._forms[name] = name
+        return name
+
+    def icon(self, sym: str) -> str:
+        def draw() -> None:
+            draw_icon(self.c, self.icon_map[sym], 0, 0)
+
+        # Symbols like "W/U" or "½" aren't valid in PDF names, so name the form by the symbol's bytes.
+        return self._define(f"Icon_{sym.encode('utf-8').hex()}", FONT_SIZE, FONT_SIZE, draw)
+
+    def background(self, bg_image: Background) -> str:
+        def draw() -> None:
+            self.c.drawImage(image_source(bg_image), 0, 0, width=self.card_width, height=self.card_height, mask="auto")
+
+        if isinstance(bg_image, bytes):
+            # Bytes cache their hash, so looking the same background up again doesn't rehash the image.
+            digest = self._digests.get(bg_image)
+            if digest is None:
+                digest = self._digests[bg_image] = hashlib.sha1(bg_image).hexdigest()[:16]
+        else:
+            digest = hashlib.sha1(bg_image.encode("utf-8")).hexdigest()[:16]
+        return self._define(f"Background_{digest}", self.card_width, self.card_height, draw)
+
+    def draw(self, name: str, x: float, y: float) -> None:
+        self.c.saveState()
+        self.c.translate(x, y)
+        self.c.doForm(name)
+        self.c.restoreState()
+
+    @property
+    def form_count(self) -> int:
+        return len(self._forms)
+
+
+def draw_icon(c: canvas.Canvas, icon: Icon, x: float, y: float) -> None:
+    """Draw a mana icon FONT_SIZE points square, as vector paths if it has them or else as an image."""
+    if isinstance(icon, VectorSymbol):
+        c.saveState()
+        c.translate(x, y)
+        icon.draw(c, FONT_SIZE)
+        c.restoreState()
+    else:
+        c.drawImage(ImageReader(icon), x, y, width=FONT_SIZE, height=FONT_SIZE, mask="auto")
+
+
+def image_source(bg_image: Background) -> Any:
+    """What `drawImage` takes for a background: its path, or a reader over its bytes."""
+    return ImageReader(BytesIO(bg_image)) if isinstance(bg_image, bytes) else bg_image
+
+
+_layout_engines: Dict[FrozenSet[str], LayoutEngine] = {}
+
+
+def get_layout_engine(icon_map: Dict[str, Any]) -> LayoutEngine:
+    """Shared layout engine for this icon set, so its caches carry over between boosters and builds."""
+    icon_names = frozenset(icon_map)
+    engine = _layout_engines.get(icon_names)
+    if engine is None:
+        engine = LayoutEngine(icon_names, FONT_NAME, FONT_SIZE, FONT_SIZE, SEPARATOR, SEPARATOR_PADDING)
+        engine = _layout_engines.setdefault(icon_names, engine)
+    return engine
+
+
+def layout_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hits, misses and hit rate of the layout caches of this process, summed over icon sets."""
+    totals: Dict[str, Dict[str, Any]] = {}
+    for engine in _layout_engines.values():
+        for cache, stats in engine.stats().items():
+            total = totals.setdefault(cache, {"hits": 0, "misses": 0})
+            total["hits"] += stats["hits"]
+            total["misses"] += stats["misses"]
+    for total in totals.values():
+        lookups = total["hits"] + total["misses"]
+        total["hit_rate"] = total["hits"] / lookups if lookups else 0.0
+    return totals
+
+
 def draw_mana_cost_segment(
-    c: canvas.Canvas, mana_cost: str, x: float, y: float, icon_map: Dict[str, Image.Image]
+    c: canvas.Canvas,
+    mana_cost: str,
+    x: float,
+    y: float,
+    icon_map: Dict[str, Icon],
+    registry: Optional[ResourceRegistry] = None,
 ) -> float:
     if "{" in mana_cost:
         symbols = mana_cost.strip("{}").split("}{")
@@ -64,10 +210,12 @@ def draw_mana_cost_segment(
         # Some costs might be numeric like {2}, {3}, handle text fallback if no icon
         # Also consider hybrid/complex symbols might not be in icon_map, handle gracefully
         if sym in icon_map:
-            img_reader = ImageReader(icon_map[sym])
             # Bottom align icon with text baseline. drawImage top aligns, so top = y - (icon_size - small_offset)
             # We'll use y - (icon_size - 1) to shift slightly
-            c.drawImage(img_reader, x + offset_x, y - 1, width=icon_size, height=icon_size, mask="auto")
+            if registry is not None:
+                registry.draw(registry.icon(sym), x + offset_x, y - 1)
+            else:
+                draw_icon(c, icon_map[sym], x + offset_x, y - 1)
             offset_x += icon_size + SEPARATOR_PADDING
         else:
             # Draw text symbol if icon not found
@@ -80,27 +228,54 @@ def draw_mana_cost_segment(
 
 
 def draw_mana_cost_full(
-    c: canvas.Canvas, mana_cost: str, x: float, y: float, icon_map: Dict[str, Image.Image]
+    c: canvas.Canvas,
+    mana_cost: str,
+    x: float,
+    y: float,
+    icon_map: Dict[str, Icon],
+    registry: Optional[ResourceRegistry] = None,
 ) -> float:
-    parts = mana_cost.split(SEPARATOR)
-    offset_x = 0.0
+    run = get_layout_engine(icon_map).mana_run(mana_cost)
     c.setFont(FONT_NAME, FONT_SIZE)
+    draw_mana_run(c, run, x, y, icon_map, registry)
+    return run.width
 
-    for i, part in enumerate(parts):
-        offset_x += draw_mana_cost_segment(c, part, x + offset_x, y, icon_map)
-        if i < len(parts) - 1:
-            sep_width = c.stringWidth(SEPARATOR, FONT_NAME, FONT_SIZE)
-            c.drawString(x + offset_x, y, SEPARATOR)
-            offset_x += sep_width + SEPARATOR_PADDING
 
-    return offset_x + 4
+def draw_mana_run(
+    c: canvas.Canvas,
+    run: ManaRun,
+    x: float,
+    y: float,
+    icon_map: Dict[str, Icon],
+    registry: Optional[ResourceRegistry] = None,
+) -> None:
+    for glyph in run.glyphs:
+        if not glyph.is_icon:
+            c.drawString(x + glyph.x, y, glyph.text)
+        elif registry is not None:
+            # Bottom align icon with text baseline, shifted down slightly
+            registry.draw(registry.icon(glyph.text), x + glyph.x, y - 1)
+        else:
+            draw_icon(c, icon_map[glyph.text], x + glyph.x, y - 1)
 
 
 def draw_card_background(
-    c: canvas.Canvas, bg_image_path: str, x: float, y: float, width: float, height: float
+    c: canvas.Canvas,
+    bg_image: Background,
+    x: float,
+    y: float,
+    width: float,
+    height: float,
+    registry: Optional[ResourceRegistry] = None,
 ) -> None:
-    c.drawImage(bg_image_path, x, y, width=width, height=height, mask="auto")
+    if registry is not None:
+        registry.draw(registry.background(bg_image), x, y)
+    else:
+        c.drawImage(image_source(bg_image), x, y, width=width, height=height, mask="auto")
+    draw_overlay(c, x, y, width, height)
 
+
+def draw_overlay(c: canvas.Canvas, x: float, y: float, width: float, height: float) -> None:
     c.saveState()
     c.setFillColor(colors.whitesmoke)
     c.setStrokeColor(colors.whitesmoke)
@@ -125,27 +300,23 @@ def draw_card_title(c: canvas.Canvas, booster_id: str, x: float, y: float, width
 
 def draw_card_list(
     c: canvas.Canvas,
-    cards: List[Dict[str, Any]],
-    icon_map: Dict[str, Image.Image],
+    cards: List[Card],
+    icon_map: Dict[str, Icon],
     x: float,
     y: float,
     width: float,
     height: float,
+    registry: Optional[ResourceRegistry] = None,
 ) -> None:
     c.setFont(FONT_NAME, FONT_SIZE)
     start_y = y + height - TEXT_MARGIN_TOP - 20
     current_y = start_y
+    text_x = x + TEXT_MARGIN_LEFT
 
-    for card in cards:
-        card_name = card.get("name", "Unknown Card")
-        mana_cost = card.get("mana_cost", "")
-
-        offset = 0.0
-        c.drawString(x + TEXT_MARGIN_LEFT + offset, current_y, card_name)
+    for line in get_layout_engine(icon_map).layout_lines(cards):
+        c.drawString(text_x, current_y, line.name)
 
-        offset = c.stringWidth(card_name, FONT_NAME, FONT_SIZE) + 4
-        if mana_cost:
-            offset = draw_mana_cost_full(c, mana_cost, x + TEXT_MARGIN_LEFT + offset, current_y, icon_map)
+        draw_mana_run(c, line.mana, text_x + line.mana_x, current_y, icon_map, registry)
 
         current_y -= LINE_SPACING
 
@@ -153,63 +324,369 @@ def draw_card_list(
 def create_card(
     c: canvas.Canvas,
     booster_id: str,
-    cards: List[Dict[str, Any]],
-    bg_image_path: str,
+    cards: List[Card],
+    bg_image: Background,
     x: float,
     y: float,
     width: float,
     height: float,
-    icon_map: Dict[str, Image.Image],
+    icon_map: Dict[str, Icon],
+    registry: Optional[ResourceRegistry] = None,
 ) -> None:
-    draw_card_background(c, bg_image_path, x, y, width, height)
+    draw_card_background(c, bg_image, x, y, width, height, registry)
     draw_card_title(c, booster_id, x, y, width, height)
-    draw_card_list(c, cards, icon_map, x, y, width, height)
+    draw_card_list(c, cards, icon_map, x, y, width, height, registry)
 
 
-def get_background_image_path(most_valuable_card: Dict[str, Any]) -> str:
-    bg_image_path = most_valuable_card.get("image_local_path", "")
+def get_background_image(most_valuable_card: Card) -> Background:
+    """The card's fetched image, or the shared in-memory placeholder if it has none on disk."""
+    bg_image_path = most_valuable_card.image_local_path
     if not bg_image_path or not os.path.exists(bg_image_path):
-        from cube_list_printer.image_handler import generate_placeholder_image
-
-        s_id = most_valuable_card.get("scryfall_id", "unknown")
-        bg_image_path = generate_placeholder_image("data/images", s_id)
+        return placeholder_image_bytes()
     return bg_image_path
 
 
-def generate_pdf(
-    output_path: str,
-    boosters: Dict[str, Any],
-    icon_map: Dict[str, Image.Image],
+def get_print_background(
+    bg_image_path: str,
+    scryfall_id: str,
     card_width_mm: float,
     card_height_mm: float,
+    dpi: int,
+    jpeg_quality: int,
+    derived_image_dir: Optional[str],
+) -> str:
+    try:
+        return get_resampled_image(
+            bg_image_path, scryfall_id, card_width_mm, card_height_mm, dpi, jpeg_quality, derived_image_dir
+        )
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not resample background {bg_image_path}, embedding it as is: {e}")
+        return bg_image_path
+
+
+@dataclass(frozen=True)
+class RenderReport:
+    pages: int
+    reused: int
+    rendered: int
+
+
+@dataclass(frozen=True)
+class RenderSettings:
+    card_width_mm: float
+    card_height_mm: float
+    dpi: Optional[int] = None
+    jpeg_quality: int = JPEG_QUALITY
+    derived_image_dir: Optional[str] = None
+
+
+def chunked(items: List[T], size: int) -> List[List[T]]:
+    return [items[start:end] for start, end in ((i, i + size) for i in range(0, len(items), size))]
+
+
+def paginate(booster_ids: List[str]) -> List[List[str]]:
+    return chunked(booster_ids, ROWS * COLS)
+
+
+def draw_page(
+    c: canvas.Canvas,
+    registry: ResourceRegistry,
+    boosters: Dict[str, Any],
+    page_ids: List[str],
+    icon_map: Dict[str, Icon],
+    settings: RenderSettings,
+    backgrounds: Optional[Mapping[str, bytes]] = None,
 ) -> None:
-    cw = mm_to_points(card_width_mm)
-    ch = mm_to_points(card_height_mm)
+    cw = registry.card_width
+    ch = registry.card_height
     page_width, page_height = A4
 
-    booster_ids = list(boosters.keys())
+    for slot, booster_id in enumerate(page_ids):
+        row, col = divmod(slot, COLS)
+        booster_cards = boosters[booster_id]["cards"]
+        most_valuable_card = boosters[booster_id]["most_valuable"]
+        if most_valuable_card is None:
+            continue
+
+        bg_image: Background
+        if backgrounds is not None:
+            bg_image = backgrounds.get(most_valuable_card.scryfall_id) or placeholder_image_bytes()
+        else:
+            bg_image = get_background_image(most_valuable_card)
+            if settings.dpi and isinstance(bg_image, str):
+                bg_image = get_print_background(
+                    bg_image,
+                    most_valuable_card.scryfall_id,
+                    settings.card_width_mm,
+                    settings.card_height_mm,
+                    settings.dpi,
+                    settings.jpeg_quality,
+                    settings.derived_image_dir,
+                )
+
+        card_x = MARGIN_X + col * cw
+        card_y = page_height - MARGIN_Y - ch - row * ch
+
+        create_card(c, booster_id, booster_cards, bg_image, card_x, card_y, cw, ch, icon_map, registry)
+    c.showPage()
+
+
+def render_pages(
+    output_path: Output,
+    boosters: Dict[str, Any],
+    pages: Iterable[List[str]],
+    icon_map: Dict[str, Icon],
+    settings: RenderSettings,
+    backgrounds: Optional[Mapping[str, bytes]] = None,
+) -> Output:
+    """
+    Draw `pages` of booster IDs to `output_path`, a file path or a writable binary stream.
+
+    With `backgrounds`, each card's background is looked up there by Scryfall ID, falling back to the shared
+    placeholder, instead of being read from the card's `image_local_path`.
+    """
     c = canvas.Canvas(output_path, pagesize=A4)
-    c.setTitle("Booster Cards")
+    c.setTitle(PDF_TITLE)
+    registry = ResourceRegistry(
+        c, icon_map, mm_to_points(settings.card_width_mm), mm_to_points(settings.card_height_mm)
+    )
+    for page_ids in pages:
+        draw_page(c, registry, boosters, page_ids, icon_map, settings, backgrounds)
+    c.save()
+    logging.debug(f"Layout cache stats: {layout_cache_stats()}")
+    return output_path
 
-    idx = 0
-    while idx < len(booster_ids):
-        for row in range(ROWS):
-            for col in range(COLS):
-                if idx >= len(booster_ids):
-                    break
-                booster_id = booster_ids[idx]
-                booster_cards = boosters[booster_id]["cards"]
 
-                if booster_cards:
-                    most_valuable_card = max(booster_cards, key=lambda x: x.get("value", 0))
-                    bg_image_path = get_background_image_path(most_valuable_card)
+_worker_icon_map: Dict[str, Icon] = {}
 
-                    card_x = MARGIN_X + col * cw
-                    card_y = page_height - MARGIN_Y - ch - row * ch
 
-                    create_card(c, booster_id, booster_cards, bg_image_path, card_x, card_y, cw, ch, icon_map)
+def _init_render_worker(icon_map: Dict[str, Icon]) -> None:
+    global _worker_icon_map
+    _worker_icon_map = icon_map
 
-                idx += 1
-        c.showPage()
 
-    c.save()
+def _render_part(args: Tuple[str, Dict[str, Any], List[List[str]], RenderSettings]) -> str:
+    output_path, boosters, pages, settings = args
+    return render_pages(output_path, boosters, pages, _worker_icon_map, settings)
+
+
+def split_pages(pages: List[List[str]], parts: int) -> List[List[List[str]]]:
+    """Split pages into at most `parts` contiguous, evenly sized runs."""
+    return chunked(pages, -(-len(pages) // max(1, parts)))
+
+
+def render_parts(
+    tasks: List[Tuple[str, Dict[str, Any], List[List[str]], RenderSettings]],
+    icon_map: Dict[str, Icon],
+    workers: int,
+) -> List[str]:
+    """Render each (output_path, boosters, pages, settings) task, in a process pool when `workers` > 1."""
+    if workers <= 1 or len(tasks) <= 1:
+        return [
+            render_pages(output_path, boosters, pages, icon_map, settings)
+            for output_path, boosters, pages, settings in tasks
+        ]
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(tasks)), initializer=_init_render_worker, initargs=(icon_map,)
+    ) as pool:
+        return list(pool.map(_render_part, tasks))
+
+
+def describe_page(boosters: Dict[str, Any], page_ids: List[str], icons: str, settings: RenderSettings) -> Any:
+    """Everything that determines how a page is drawn, for the page cache key."""
+    page = []
+    for booster_id in page_ids:
+        cards = boosters[booster_id]["cards"]
+        most_valuable_card = boosters[booster_id]["most_valuable"]
+        background = None
+        if most_valuable_card is not None:
+            bg_image = get_background_image(most_valuable_card)
+            background = fingerprint_file(bg_image) if isinstance(bg_image, str) else {"placeholder": True}
+            background["scryfall_id"] = most_valuable_card.scryfall_id
+        page.append([booster_id, [[card.name, card.mana_cost] for card in cards], background])
+    return {
+        "version": VERSION,
+        "code": source_fingerprint(RENDER_MODULES),
+        "layout": LAYOUT,
+        "settings": asdict(settings),
+        "icons": icons,
+        "boosters": page,
+    }
+
+
+def generate_pdf_incremental(
+    output_path: str,
+    boosters: Dict[str, Any],
+    pages: List[List[str]],
+    icon_map: Dict[str, Icon],
+    settings: RenderSettings,
+    page_cache_dir: str,
+    workers: int = 1,
+) -> RenderReport:
+    """Reuse pages whose inputs are unchanged since the previous build of `output_path`, render the rest."""
+    from cube_list_printer.pdf_merge import merge_pdfs
+
+    cache = PageCache(page_cache_dir, output_path)
+    icons = fingerprint_icons(icon_map)
+    keys = [hash_inputs(describe_page(boosters, page_ids, icons, settings)) for page_ids in pages]
+
+    tasks = []
+    queued = set()
+    for key, page_ids in zip(keys, pages):
+        if key in cache or key in queued:
+            continue
+        queued.add(key)
+        page_boosters = {booster_id: boosters[booster_id] for booster_id in page_ids}
+        tasks.append((cache.tmp_path(key), page_boosters, [page_ids], settings))
+    try:
+        render_parts(tasks, icon_map, workers)
+        for key in queued:
+            cache.commit(key)
+    finally:
+        for key in queued:
+            cache.discard(key)
+
+    merge_pdfs([cache.path(key) for key in keys], output_path, PDF_TITLE)
+    cache.prune(keys)
+
+    report = RenderReport(pages=len(pages), reused=len(pages) - len(tasks), rendered=len(tasks))
+    logging.info(f"Reused {report.reused} cached pages, rendered {report.rendered} of {report.pages}.")
+    return report
+
+
+def generate_pdf(
+    output_path: str,
+    boosters: Dict[str, Any],
+    icon_map: Dict[str, Icon],
+    card_width_mm: float,
+    card_height_mm: float,
+    dpi: Optional[int] = None,
+    jpeg_quality: int = JPEG_QUALITY,
+    derived_image_dir: Optional[str] = None,
+    workers: int = 1,
+    page_cache_dir: Optional[str] = None,
+) -> RenderReport:
+    """
+    Lay the boosters out 3x3 per A4 page and write the PDF to `output_path`. Each booster holds its `cards` and
+    its `most_valuable` card, whose image is the background, as set by `enrich_boosters_with_scryfall_data`.
+
+    When `dpi` is given, backgrounds are resampled to the card size at that resolution before being embedded.
+    With `workers` > 1, runs of pages are rendered to partial PDFs in a process pool and merged in order.
+    With `page_cache_dir`, pages whose inputs haven't changed since the last build are reused.
+    """
+    settings = RenderSettings(card_width_mm, card_height_mm, dpi, jpeg_quality, derived_image_dir)
+    pages = paginate(list(boosters.keys()))
+
+    if page_cache_dir:
+        return generate_pdf_incremental(output_path, boosters, pages, icon_map, settings, page_cache_dir, workers)
+
+    report = RenderReport(pages=len(pages), reused=0, rendered=len(pages))
+    if workers <= 1 or len(pages) <= 1:
+        render_pages(output_path, boosters, pages, icon_map, settings)
+        return report
+
+    from cube_list_printer.pdf_merge import merge_pdfs
+
+    runs = split_pages(pages, workers)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tasks = []
+        for n, run in enumerate(runs):
+            run_boosters = {booster_id: boosters[booster_id] for page_ids in run for booster_id in page_ids}
+            tasks.append((os.path.join(tmp_dir, f"part{n:04d}.pdf"), run_boosters, run, settings))
+        merge_pdfs(render_parts(tasks, icon_map, workers), output_path, PDF_TITLE)
+    return report
+
+
+def generate_pdf_streaming(
+    output_path: str,
+    booster_chunks: Iterable[Dict[str, Any]],
+    icon_map: Dict[str, Icon],
+    card_width_mm: float,
+    card_height_mm: float,
+    dpi: Optional[int] = None,
+    jpeg_quality: int = JPEG_QUALITY,
+    derived_image_dir: Optional[str] = None,
+) -> RenderReport:
+    """
+    Lay boosters out like `generate_pdf`, taking them a chunk at a time and writing each chunk's pages to
+    `output_path` before asking for the next, so memory depends on the chunk size and not on the whole cube.
+
+    Every chunk but the last should fill whole pages, or the pages where chunks meet are left partly empty.
+    """
+    from cube_list_printer.pdf_merge import StreamingPdfWriter
+
+    settings = RenderSettings(card_width_mm, card_height_mm, dpi, jpeg_quality, derived_image_dir)
+    with tempfile.TemporaryDirectory() as tmp_dir, open(output_path, "wb") as f:
+        writer = StreamingPdfWriter(f, PDF_TITLE)
+        part_path = os.path.join(tmp_dir, "part.pdf")
+        for boosters in booster_chunks:
+            render_pages(part_path, boosters, paginate(list(boosters.keys())), icon_map, settings)
+            writer.append(part_path)
+        writer.close()
+    return RenderReport(pages=writer.page_count, reused=0, rendered=writer.page_count)
+
+
+def generate_pdf_pipelined(
+    output_path: str,
+    boosters: Dict[str, Any],
+    ready_pages: Iterable[List[str]],
+    icon_map: Dict[str, Icon],
+    card_width_mm: float,
+    card_height_mm: float,
+    dpi: Optional[int] = None,
+    jpeg_quality: int = JPEG_QUALITY,
+    derived_image_dir: Optional[str] = None,
+) -> RenderReport:
+    """
+    Lay boosters out like `generate_pdf`, drawing each page of booster IDs as soon as `ready_pages` yields it,
+    so pages are drawn while the backgrounds of later ones are still downloading.
+    """
+    settings = RenderSettings(card_width_mm, card_height_mm, dpi, jpeg_quality, derived_image_dir)
+    drawn = 0
+
+    def counted() -> Iterable[List[str]]:
+        nonlocal drawn
+        for page_ids in ready_pages:
+            drawn += 1
+            yield page_ids
+
+    render_pages(output_path, boosters, counted(), icon_map, settings)
+    return RenderReport(pages=drawn, reused=0, rendered=drawn)
+
+
+def generate_pdf_to_stream(
+    out: BinaryIO,
+    boosters: Dict[str, Any],
+    icon_map: Dict[str, Icon],
+    card_width_mm: float,
+    card_height_mm: float,
+    backgrounds: Mapping[str, bytes],
+) -> RenderReport:
+    """
+    Lay boosters out like `generate_pdf` and write the PDF to `out`, a `BytesIO` or any writable binary stream,
+    without touching the filesystem.
+
+    Backgrounds come from `backgrounds`, the encoded image of each most valuable card by Scryfall ID, and are
+    embedded as given; cards without one get the placeholder, which is built in memory once per process.
+    Calls can run concurrently in threads. Besides the placeholder they share the engines of `get_layout_engine`,
+    one per icon set, whose memo tables are written as new card names and mana costs are laid out. They aren't
+    evicted, so in a long-running process they grow up to the distinct names and costs printed.
+    """
+    settings = RenderSettings(card_width_mm, card_height_mm)
+    pages = paginate(list(boosters.keys()))
+    render_pages(out, boosters, pages, icon_map, settings, backgrounds)
+    return RenderReport(pages=len(pages), reused=0, rendered=len(pages))
+
+
+def generate_pdf_bytes(
+    boosters: Dict[str, Any],
+    icon_map: Dict[str, Icon],
+    card_width_mm: float,
+    card_height_mm: float,
+    backgrounds: Mapping[str, bytes],
+) -> bytes:
+    """Render the boosters like `generate_pdf_to_stream` and return the PDF."""
+    out = BytesIO()
+    generate_pdf_to_stream(out, boosters, icon_map, card_width_mm, card_height_mm, backgrounds)
+    return out.getvalue()
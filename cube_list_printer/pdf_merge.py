@@ -0,0 +1,177 @@
+from typing import Any, BinaryIO, Dict, List
+
+IMAGE_XOBJECT = b"/Subtype /Image"
+SCAN_CHUNK_SIZE = 1 << 20
+
+
+def count_embedded_images(pdf_path: str, chunk_size: int = SCAN_CHUNK_SIZE) -> int:
+    """
+    Count the image XObjects in a PDF written by this package, backgrounds and raster icons alike, by scanning
+    its bytes a chunk at a time. Neither ReportLab nor pypdf packs objects into compressed streams, so each
+    image's dictionary is in plain sight.
+    """
+    count = 0
+    overlap = len(IMAGE_XOBJECT) - 1
+    tail = b""
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            data = tail + chunk
+            count += data.count(IMAGE_XOBJECT)
+            # Keep a partial match at the end for the next chunk, but never a whole one.
+            tail = data[-overlap:]
+    return count
+
+
+def merge_pdfs(part_paths: List[str], output_path: str, title: str) -> None:
+    """
+    Concatenate partial PDFs rendered by `pdf_generator.render_pages` in order into `output_path`.
+
+    Every part embeds its own copy of the icons and backgrounds it uses. Their XObject names are derived from
+    what they draw (see `ResourceRegistry`), so pages are pointed at the first object with each name. The pages
+    are then copied into a fresh writer, which only carries over objects they still reference, leaving each
+    resource in the output once.
+    """
+    from pypdf import PdfWriter
+
+    merged = PdfWriter()
+    for part_path in part_paths:
+        merged.append(part_path)
+
+    shared: Dict[str, Any] = {}
+    for page in merged.pages:
+        xobjects = page.get("/Resources", {}).get("/XObject")
+        if xobjects is None:
+            continue
+        xobjects = xobjects.get_object()
+        for name in list(xobjects.keys()):
+            xobjects[name] = shared.setdefault(name, xobjects.raw_get(name))
+
+    writer = PdfWriter()
+    for page in merged.pages:
+        writer.add_page(page)
+    writer.add_metadata({"/Title": title})
+    with open(output_path, "wb") as f:
+        writer.write(f)
+
+
+class StreamingPdfWriter:
+    """
+    Concatenate partial PDFs rendered by `pdf_generator.render_pages` into `f` as they arrive.
+
+    Each part's objects are written out, renumbered, as soon as it's appended, so only one part is held in
+    memory however long the document gets; what's kept is an offset per object and a reference per page.
+    Like `merge_pdfs`, XObjects are shared by name, so a resource already written by an earlier part is
+    referenced instead of written again.
+    """
+
+    # Object numbers reserved for the page tree, catalog and document info, which are written last.
+    PAGES, CATALOG, INFO = 1, 2, 3
+
+    def __init__(self, f: BinaryIO, title: str):
+        self.f = f
+        self.title = title
+        self.page_count = 0
+        self._offsets: Dict[int, int] = {}
+        self._page_numbers: List[int] = []
+        self._shared: Dict[str, int] = {}
+        self._next_number = self.INFO + 1
+        self.f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _allocate(self) -> int:
+        number = self._next_number
+        self._next_number += 1
+        return number
+
+    def _write_object(self, number: int, obj: Any) -> None:
+        self._offsets[number] = self.f.tell()
+        self.f.write(f"{number} 0 obj\n".encode("ascii"))
+        obj.write_to_stream(self.f)
+        self.f.write(b"\nendobj\n")
+
+    def append(self, part_path: str) -> None:
+        from pypdf import PdfReader
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, StreamObject
+
+        reader = PdfReader(part_path)
+        numbers: Dict[int, int] = {}
+        # Objects of this part standing in for resources written by an earlier part.
+        reused = set()
+        pending: List[int] = []
+
+        def number(idnum: int) -> int:
+            if idnum not in numbers:
+                numbers[idnum] = self._allocate()
+                pending.append(idnum)
+            return numbers[idnum]
+
+        def remap(obj: Any) -> Any:
+            if isinstance(obj, IndirectObject):
+                return IndirectObject(number(obj.idnum), 0, None)
+            if isinstance(obj, StreamObject):
+                stream = StreamObject()
+                # The length is written from the data.
+                stream.update({key: remap(value) for key, value in obj.items() if key != "/Length"})
+                stream._data = obj._data
+                return stream
+            if isinstance(obj, DictionaryObject):
+                return DictionaryObject({key: remap(value) for key, value in obj.items()})
+            if isinstance(obj, ArrayObject):
+                return ArrayObject(remap(value) for value in obj)
+            return obj
+
+        page_idnums = set()
+        for page in reader.pages:
+            xobjects = page.get("/Resources", {}).get("/XObject")
+            for name in xobjects.get_object().keys() if xobjects is not None else ():
+                ref = xobjects.get_object().raw_get(name)
+                if not isinstance(ref, IndirectObject) or ref.idnum in numbers:
+                    continue
+                if name in self._shared:
+                    numbers[ref.idnum] = self._shared[name]
+                    reused.add(ref.idnum)
+                else:
+                    self._shared[name] = number(ref.idnum)
+            assert page.indirect_reference is not None
+            page_idnums.add(page.indirect_reference.idnum)
+            self._page_numbers.append(number(page.indirect_reference.idnum))
+
+        while pending:
+            idnum = pending.pop()
+            if idnum in reused:
+                continue
+            obj: Any = reader.get_object(idnum)
+            if idnum in page_idnums:
+                # Pages hang off this document's page tree instead of the part's.
+                obj = remap(DictionaryObject({key: value for key, value in obj.items() if key != "/Parent"}))
+                obj[NameObject("/Parent")] = IndirectObject(self.PAGES, 0, None)
+            else:
+                obj = remap(obj)
+            self._write_object(numbers[idnum], obj)
+        self.page_count += len(page_idnums)
+
+    def close(self) -> None:
+        """Write the page tree, catalog, document info and cross-reference table."""
+        from pypdf.generic import (
+            ArrayObject,
+            DictionaryObject,
+            IndirectObject,
+            NameObject,
+            NumberObject,
+            TextStringObject,
+        )
+
+        kids = ArrayObject(IndirectObject(number, 0, None) for number in self._page_numbers)
+        pages = {"/Type": NameObject("/Pages"), "/Kids": kids, "/Count": NumberObject(len(self._page_numbers))}
+        catalog = {"/Type": NameObject("/Catalog"), "/Pages": IndirectObject(self.PAGES, 0, None)}
+        info = {"/Title": TextStringObject(self.title)}
+        for number, entries in ((self.PAGES, pages), (self.CATALOG, catalog), (self.INFO, info)):
+            self._write_object(number, DictionaryObject({NameObject(key): value for key, value in entries.items()}))
+
+        xref_offset = self.f.tell()
+        self.f.write(f"xref\n0 {self._next_number}\n0000000000 65535 f \n".encode("ascii"))
+        for number in range(1, self._next_number):
+            self.f.write(f"{self._offsets[number]:010d} 00000 n \n".encode("ascii"))
+        self.f.write(
+            f"trailer\n<< /Size {self._next_number} /Root {self.CATALOG} 0 R /Info {self.INFO} 0 R >>\n"
+            f"startxref\n{xref_offset}\n%%EOF\n".encode("ascii")
+        )
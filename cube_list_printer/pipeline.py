@@ -0,0 +1,56 @@
+import itertools
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Generic, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class Prefetcher(Generic[T, R]):
+    """
+    Iterate over `func(item)` for each of `items`, in order, computing up to `ahead` results in advance on
+    `workers` threads.
+
+    This is a producer stage with a bounded queue: work starts as soon as the prefetcher is created, and
+    producers stall once `ahead` results are waiting, so a slow consumer doesn't let results pile up.
+    An exception raised by `func` is raised from the iteration when its item's turn comes.
+    """
+
+    def __init__(self, func: Callable[[T], R], items: Iterable[T], workers: int = 4, ahead: int = 16):
+        self._func = func
+        self._items = iter(items)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self._pending: Deque["Future[R]"] = deque()
+        for _ in range(max(1, ahead)):
+            if not self._submit_next():
+                break
+
+    def _submit_next(self) -> bool:
+        for item in itertools.islice(self._items, 1):
+            self._pending.append(self._pool.submit(self._func, item))
+            return True
+        return False
+
+    def __iter__(self) -> Iterator[R]:
+        return self
+
+    def __next__(self) -> R:
+        if not self._pending:
+            raise StopIteration
+        future = self._pending.popleft()
+        self._submit_next()
+        return future.result()
+
+    def close(self) -> None:
+        """Cancel the work not started yet and wait for the rest."""
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "Prefetcher[T, R]":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
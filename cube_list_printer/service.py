@@ -0,0 +1,240 @@
+"""
+Resident render service: keeps the Scryfall index, mana icons and image paths warm between requests.
+
+    cube_list_printer serve --port 8731
+    cube_list_printer serve --socket /tmp/cube_list_printer.sock
+
+POST a booster CSV to /render and get the PDF back. GET /health reports the service's state.
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from cube_list_printer.bulk_index import BulkIndex, ensure_index
+from cube_list_printer.data_loader import get_booster_scryfall_ids
+from cube_list_printer.image_cache import image_cache_from_config
+from cube_list_printer.main import (
+    CONFIG_PATH,
+    attach_images,
+    build_boosters,
+    bulk_data_path,
+    load_config,
+    load_icons,
+    read_boosters,
+    render_pdf_bytes,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8731
+MAX_CSV_BYTES = 16 << 20
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+class RenderService:
+    """
+    Renders booster CSVs to PDFs with everything loaded once.
+
+    At most `max_concurrency` renders run at a time and up to `max_queue` more wait for a slot; requests
+    beyond that are turned away with `ServiceBusy`. The Scryfall index is reopened, and rebuilt if needed,
+    when the bulk file changes on disk.
+    """
+
+    def __init__(self, config: Dict[str, Any], max_concurrency: int = 1, max_queue: int = 8):
+        self.config = config
+        self.bulk_path = bulk_data_path(config)
+        self._running = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._admitted = threading.BoundedSemaphore(max(1, max_concurrency) + max(0, max_queue))
+        self._index_lock = threading.Lock()
+        self._index: Optional[BulkIndex] = None
+        self._bulk_stat: Optional[Tuple[int, int]] = None
+        self.image_cache = image_cache_from_config(config)
+        self.image_paths: Dict[str, str] = {}
+        self.rendered = 0
+        self.reloads = 0
+
+        self.reload_if_changed()
+        self.icon_map = load_icons(config)
+
+    def _stat_bulk(self) -> Tuple[int, int]:
+        stat = os.stat(self.bulk_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def reload_if_changed(self) -> bool:
+        with self._index_lock:
+            # Switch to the gzipped bulk file once `sync` writes it, if the uncompressed one was read until then.
+            configured = self.config["paths"]["scryfall_bulk"]
+            if self.bulk_path != configured and os.path.exists(configured):
+                self.bulk_path = configured
+            bulk_stat = self._stat_bulk()
+            if bulk_stat == self._bulk_stat:
+                return False
+            logging.info(f"Loading Scryfall index for {self.bulk_path}...")
+            index = ensure_index(self.bulk_path)
+            if self._index is not None:
+                self._index.close()
+                self.reloads += 1
+            self._index, self._bulk_stat = index, bulk_stat
+            return True
+
+    def lookup(self, scryfall_ids: Any) -> Dict[str, Any]:
+        self.reload_if_changed()
+        with self._index_lock:
+            assert self._index is not None
+            return self._index.lookup(scryfall_ids)
+
+    def render(self, csv_data: bytes) -> bytes:
+        """Render a booster CSV to PDF bytes. Raises `ServiceBusy` when the queue is full."""
+        if not self._admitted.acquire(blocking=False):
+            raise ServiceBusy("Too many requests queued.")
+        try:
+            with self._running:
+                return self._render(csv_data)
+        finally:
+            self._admitted.release()
+
+    def _render(self, csv_data: bytes) -> bytes:
+        boosters = read_boosters(self.config, BytesIO(csv_data))
+        boosters = build_boosters(boosters, self.lookup(get_booster_scryfall_ids(boosters)))
+        attach_images(self.config, [boosters], self.image_cache, self.image_paths)
+        pdf = render_pdf_bytes(self.config, boosters, self.icon_map)
+        self.rendered += 1
+        return pdf
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "bulk": self.bulk_path,
+            "cards": len(self._index) if self._index is not None else 0,
+            "icons": len(self.icon_map),
+            "images": len(self.image_paths),
+            "rendered": self.rendered,
+            "reloads": self.reloads,
+        }
+
+    def close(self) -> None:
+        with self._index_lock:
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    server: Any
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address.
+        return str(self.client_address[0]) if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logging.info(f"{self.address_string()} {format % args}")
+
+    def send_body(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_body(status, json.dumps({"error": message}).encode("utf-8"), "application/json", headers)
+
+    def do_GET(self) -> None:
+        if self.path != "/health":
+            self.send_error_json(404, f"Unknown path {self.path}")
+            return
+        self.send_body(200, json.dumps(self.server.service.health()).encode("utf-8"), "application/json")
+
+    def do_POST(self) -> None:
+        if self.path != "/render":
+            self.send_error_json(404, f"Unknown path {self.path}")
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = 0
+        if length <= 0:
+            self.send_error_json(400, "Expected a booster CSV in the request body.")
+            return
+        if length > MAX_CSV_BYTES:
+            self.send_error_json(413, f"Booster CSVs are limited to {MAX_CSV_BYTES >> 20} MiB.")
+            return
+        csv_data = self.rfile.read(length)
+
+        try:
+            pdf = self.server.service.render(csv_data)
+        except ServiceBusy as e:
+            self.send_error_json(503, str(e), {"Retry-After": "1"})
+        except (ValueError, KeyError, csv.Error) as e:
+            self.send_error_json(400, f"Could not read booster CSV: {e}")
+        except Exception as e:
+            logging.exception("Render failed")
+            self.send_error_json(500, f"Render failed: {e}")
+        else:
+            self.send_body(200, pdf, "application/pdf")
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self) -> None:
+        # A socket left behind by a previous run would make bind fail.
+        if os.path.exists(str(self.server_address)):
+            os.remove(str(self.server_address))
+        super().server_bind()
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(str(self.server_address)):
+            os.remove(str(self.server_address))
+
+
+def create_server(
+    service: RenderService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: Optional[str] = None
+) -> socketserver.BaseServer:
+    server: Any
+    if socket_path:
+        server = UnixHTTPServer(socket_path, RenderRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), RenderRequestHandler)
+    server.service = service
+    return server
+
+
+def main(argv: Sequence[str]) -> int:
+    parser = argparse.ArgumentParser(prog="cube_list_printer serve", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--config", default=CONFIG_PATH)
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    settings = config.get("service") or {}
+    service = RenderService(config, settings.get("max_concurrency", 1), settings.get("max_queue", 8))
+    server = create_server(
+        service,
+        args.host or settings.get("host", DEFAULT_HOST),
+        args.port or settings.get("port", DEFAULT_PORT),
+        args.socket or settings.get("socket"),
+    )
+    logging.info(f"Serving on {server.server_address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
@@ -1,32 +1,107 @@
+import json
 import logging
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from io import BytesIO
-from typing import Dict
+from typing import Any, Dict, Optional
 
-import cairosvg
-import requests
-from PIL import Image
+from cube_list_printer import http_client, metrics
+from cube_list_printer.rate_limit import TokenBucket
 
 SYMBOL_API = "https://api.scryfall.com/symbology"
+MANIFEST_NAME = "manifest.json"
+# How symbols are cached: rasterized to PNG, or kept as SVG and drawn straight into the PDF as vector paths.
+SYMBOL_FORMATS = {"png": ".png", "vector": ".svg"}
 
 
-def fetch_symbols(symbol_cache_dir: str, fetch_delay: float = 0.2) -> Dict[str, str]:
+def fetch_symbols(
+    symbol_cache_dir: str,
+    fetch_delay: float = 0.2,
+    revalidate: bool = False,
+    ttl: Optional[float] = None,
+    max_workers: int = 4,
+    symbology_url: str = SYMBOL_API,
+    symbol_format: str = "png",
+) -> Dict[str, str]:
     """
-    Fetch all card symbols from Scryfall, cache their SVGs as PNGs, and return a mapping from symbol to PNG path.
+    Fetch all card symbols from Scryfall, cache them as PNGs or as their SVGs, and return a mapping from symbol
+    to cached file.
+
+    The symbology list is persisted in a manifest next to the PNGs. When the manifest is present, younger than
+    `ttl` and every PNG it lists exists, no network request is made at all. Otherwise the list is revalidated
+    with a conditional request, and if Scryfall can't be reached the cached symbols are used as they are.
 
     :param symbol_cache_dir: Directory to store cached symbol images.
-    :param fetch_delay: Delay between fetches to be polite to the API.
-    :return: A dictionary mapping mana symbol strings (e.g., 'W', 'U', 'B', 'W/U') to paths of the cached PNG files.
+    :param fetch_delay: Minimum interval between SVG downloads, to be polite to the API.
+    :param revalidate: Revalidate the symbology list even if the cache is complete and fresh.
+    :param ttl: Seconds after which the symbology list is revalidated. None never expires it.
+    :param max_workers: Concurrent SVG downloads and rasterization processes.
+    :param symbology_url: Scryfall symbology endpoint.
+    :param symbol_format: "png" to rasterize symbols with cairosvg, or "vector" to keep their SVGs, which
+        `load_mana_icons` converts with svglib to `VectorSymbol`s.
+    :return: A dictionary mapping mana symbol strings (e.g., 'W', 'U', 'B', 'W/U') to paths of the cached files.
     """
+    if symbol_format not in SYMBOL_FORMATS:
+        raise ValueError(f"Unknown symbol format {symbol_format!r}, expected one of {sorted(SYMBOL_FORMATS)}.")
     os.makedirs(symbol_cache_dir, exist_ok=True)
-    logging.info("Fetching Scryfall symbology...")
+    manifest = load_manifest(symbol_cache_dir)
+
+    if manifest is not None and not revalidate and not is_expired(manifest, ttl):
+        symbol_map = get_symbol_map(symbol_cache_dir, manifest, symbol_format)
+        if all(os.path.exists(path) for path in symbol_map.values()):
+            metrics.count("symbols.cache_hits", len(symbol_map))
+            return symbol_map
+
+    import requests
+
+    try:
+        manifest = revalidate_manifest(manifest, symbology_url)
+    except requests.RequestException as e:
+        if manifest is None:
+            symbol_map = scan_symbol_cache(symbol_cache_dir, symbol_format)
+            if not symbol_map:
+                raise
+        else:
+            symbol_map = get_symbol_map(symbol_cache_dir, manifest, symbol_format)
+        logging.warning(f"Could not revalidate Scryfall symbology, using cached symbols: {e}")
+        return {sym: path for sym, path in symbol_map.items() if os.path.exists(path)}
+
+    symbol_map = get_symbol_map(symbol_cache_dir, manifest, symbol_format)
+    missing = {sym: path for sym, path in symbol_map.items() if not os.path.exists(path)}
+    metrics.count("symbols.cache_hits", len(symbol_map) - len(missing))
+    metrics.count("symbols.cache_misses", len(missing))
+    if missing:
+        svg_uris = {sym: manifest["symbols"][sym]["svg_uri"] for sym in missing}
+        fetch_missing_symbols(svg_uris, missing, fetch_delay, max_workers, symbol_format)
+
+    save_manifest(symbol_cache_dir, manifest)
+    return {sym: path for sym, path in symbol_map.items() if os.path.exists(path)}
+
+
+def revalidate_manifest(manifest: Optional[Dict[str, Any]], symbology_url: str) -> Dict[str, Any]:
+    """
+    Revalidate the symbology list with a conditional request, returning the up to date manifest.
+    """
+    headers = {}
+    if manifest is not None and manifest.get("source") == symbology_url:
+        if manifest.get("etag"):
+            headers["If-None-Match"] = manifest["etag"]
+        if manifest.get("last_modified"):
+            headers["If-Modified-Since"] = manifest["last_modified"]
 
-    resp = requests.get(SYMBOL_API, timeout=10)
+    logging.info("Fetching Scryfall symbology...")
+    # The cached symbols still work if Scryfall is down, so don't hold the run up retrying.
+    resp = http_client.get(symbology_url, headers=headers, retries=1)
+    if resp.status_code == 304 and manifest is not None:
+        logging.info("Scryfall symbology not modified.")
+        manifest["checked_at"] = time.time()
+        return manifest
     resp.raise_for_status()
+    metrics.count("symbols.bytes_downloaded", len(resp.content))
     data = resp.json()
 
-    symbol_map = {}
+    symbols = {}
     for item in data.get("data", []):
         symbol = item.get("symbol", "")
         represents_mana = item.get("represents_mana", False)
@@ -37,25 +112,135 @@ def fetch_symbols(symbol_cache_dir: str, fetch_delay: float = 0.2) -> Dict[str,
         if represents_mana and appears_in_cost and svg_uri:
             # Example symbol: "{W/U}" -> strip braces -> "W/U"
             original_symbol_key = symbol.strip("{}").upper()
-            # Replace slashes with underscores for safe filenames
-            sym_key = original_symbol_key.replace("/", "_")
+            symbols[original_symbol_key] = {"file": get_symbol_filename(original_symbol_key), "svg_uri": svg_uri}
+
+    return {
+        "source": symbology_url,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "checked_at": time.time(),
+        "symbols": symbols,
+    }
+
+
+def fetch_missing_symbols(
+    svg_uris: Dict[str, str],
+    paths: Dict[str, str],
+    fetch_delay: float,
+    max_workers: int,
+    symbol_format: str = "png",
+) -> None:
+    """
+    Download SVGs on a thread pool and convert them on a process pool as they arrive.
+    A symbol that fails is logged and skipped, so the PDF falls back to text for it.
+    """
+    convert, converted = CONVERTERS[symbol_format]
+    import requests
+
+    limiter = TokenBucket.from_delay(fetch_delay)
+    workers = max(1, max_workers)
+
+    def download(sym: str) -> bytes:
+        limiter.acquire()
+        logging.info(f"Fetching symbol {{{sym}}} from {svg_uris[sym]}")
+        svg_resp = http_client.get(svg_uris[sym])
+        svg_resp.raise_for_status()
+        metrics.count("symbols.bytes_downloaded", len(svg_resp.content))
+        return svg_resp.content
 
-            png_path = os.path.join(symbol_cache_dir, f"{sym_key}.png")
-            if not os.path.exists(png_path):
-                logging.info(f"Fetching symbol {symbol} from {svg_uri}")
-                svg_resp = requests.get(svg_uri, timeout=10)
-                svg_resp.raise_for_status()
+    with ThreadPoolExecutor(max_workers=workers) as downloads, ProcessPoolExecutor(max_workers=workers) as raster:
+        download_futures = {downloads.submit(download, sym): sym for sym in svg_uris}
+        raster_futures = {}
+        for future in as_completed(download_futures):
+            sym = download_futures[future]
+            try:
+                raster_futures[raster.submit(convert, future.result())] = sym
+            except requests.RequestException as e:
+                logging.warning(f"Failed to fetch symbol {{{sym}}}: {e}")
 
-                # Convert SVG to PNG
-                png_data = cairosvg.svg2png(bytestring=svg_resp.content)
-                pil_img = Image.open(BytesIO(png_data)).convert("RGBA")
-                white_bg = Image.new("RGBA", pil_img.size, (255, 255, 255, 255))
-                white_bg.alpha_composite(pil_img)
-                white_bg = white_bg.convert("RGB")
-                white_bg.save(png_path, "PNG")
+        for future in as_completed(raster_futures):
+            sym = raster_futures[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                logging.warning(f"Failed to convert symbol {{{sym}}}: {e}")
+                continue
+            tmp_path = paths[sym] + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, paths[sym])
+            metrics.count(converted)
 
-                time.sleep(fetch_delay)  # Polite delay
 
-            symbol_map[original_symbol_key] = png_path
+def rasterize_svg(svg_data: bytes) -> bytes:
+    """Convert a symbol SVG to a PNG flattened onto white. Runs in a worker process."""
+    import cairosvg
+    from PIL import Image
 
+    png_data = cairosvg.svg2png(bytestring=svg_data)
+    pil_img = Image.open(BytesIO(png_data)).convert("RGBA")
+    white_bg = Image.new("RGBA", pil_img.size, (255, 255, 255, 255))
+    white_bg.alpha_composite(pil_img)
+    out = BytesIO()
+    white_bg.convert("RGB").save(out, "PNG")
+    return out.getvalue()
+
+
+def keep_svg(svg_data: bytes) -> bytes:
+    """
+    Cache a symbol SVG as downloaded. It's converted when loaded, so an SVG svglib can't convert is still cached
+    and falls back to text without being downloaded again on every run.
+    """
+    return svg_data
+
+
+# Converter from SVG to the cached file, and the counter of symbols it converted, per symbol format.
+CONVERTERS = {"png": (rasterize_svg, "symbols.rasterized"), "vector": (keep_svg, "symbols.svgs_cached")}
+
+
+def get_symbol_filename(symbol_key: str) -> str:
+    # Replace slashes with underscores for safe filenames
+    return f"{symbol_key.replace('/', '_')}.png"
+
+
+def get_symbol_map(symbol_cache_dir: str, manifest: Dict[str, Any], symbol_format: str = "png") -> Dict[str, str]:
+    ext = SYMBOL_FORMATS[symbol_format]
+    return {
+        sym: os.path.join(symbol_cache_dir, os.path.splitext(entry["file"])[0] + ext)
+        for sym, entry in manifest["symbols"].items()
+    }
+
+
+def scan_symbol_cache(symbol_cache_dir: str, symbol_format: str = "png") -> Dict[str, str]:
+    """Rebuild the symbol map from the cached files alone, for caches created before the manifest existed."""
+    symbol_map = {}
+    for filename in sorted(os.listdir(symbol_cache_dir)):
+        stem, ext = os.path.splitext(filename)
+        if ext == SYMBOL_FORMATS[symbol_format] and filename != MANIFEST_NAME:
+            symbol_map[stem.replace("_", "/")] = os.path.join(symbol_cache_dir, filename)
     return symbol_map
+
+
+def is_expired(manifest: Dict[str, Any], ttl: Optional[float]) -> bool:
+    return ttl is not None and time.time() - manifest.get("checked_at", 0) > ttl
+
+
+def load_manifest(symbol_cache_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(symbol_cache_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        logging.warning("Ignoring corrupt symbology manifest.")
+        return None
+    if not isinstance(manifest.get("symbols"), dict):
+        return None
+    return manifest
+
+
+def save_manifest(symbol_cache_dir: str, manifest: Dict[str, Any]) -> None:
+    path = os.path.join(symbol_cache_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,126 @@
+"""
+Synthetic cubes for benchmarks and tests: a booster CSV, a matching Scryfall bulk file, mana symbol PNGs and
+background images, all generated locally so nothing touches the network.
+"""
+
+import csv
+import itertools
+import json
+import os
+import random
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List
+
+from PIL import Image, ImageDraw
+
+COLORS = ["W", "U", "B", "R", "G"]
+HYBRID = [f"{a}/{b}" for a, b in itertools.combinations(COLORS, 2)]
+SYMBOLS = (
+    COLORS
+    + ["C", "X"]
+    + [str(n) for n in range(10)]
+    + HYBRID
+    + [f"2/{c}" for c in COLORS]
+    + [f"{c}/P" for c in COLORS]
+)
+
+
+@dataclass
+class SyntheticCube:
+    csv_path: str
+    bulk_path: str
+    symbol_map: Dict[str, str]
+    image_paths: List[str]
+    boosters: int
+    cards_per_booster: int
+
+
+def random_mana_cost(rng: random.Random) -> str:
+    def face() -> str:
+        cost = "{%d}" % rng.randint(1, 6) if rng.random() < 0.6 else ""
+        for _ in range(rng.randint(0, 3)):
+            roll = rng.random()
+            if roll < 0.7:
+                cost += "{%s}" % rng.choice(COLORS)
+            elif roll < 0.9:
+                cost += "{%s}" % rng.choice(HYBRID)
+            else:
+                cost += "{%s}" % rng.choice(SYMBOLS)
+        return cost
+
+    roll = rng.random()
+    if roll < 0.05:
+        return ""
+    if roll < 0.15:
+        return f"{face()} // {face()}"
+    return face()
+
+
+def random_card(rng: random.Random, index: int) -> Dict[str, object]:
+    s_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    price = rng.choice([None, "%.2f" % (rng.random() * 20)])
+    return {
+        "object": "card",
+        "id": s_id,
+        "name": f"Synthetic Card {index}",
+        "mana_cost": random_mana_cost(rng),
+        "type_line": "Creature - Construct",
+        "oracle_text": "Lorem ipsum dolor sit amet. " * rng.randint(1, 6),
+        "image_uris": {size: f"https://example.invalid/{size}/{s_id}.jpg" for size in ("small", "normal", "large")},
+        "prices": {"usd": price, "usd_foil": "%.2f" % (rng.random() * 40), "usd_etched": None},
+    }
+
+
+def generate_cube(
+    directory: str,
+    boosters: int = 45,
+    cards_per_booster: int = 15,
+    extra_cards: int = 1000,
+    background_images: int = 4,
+    seed: int = 0,
+) -> SyntheticCube:
+    """
+    Write a synthetic cube of `boosters` x `cards_per_booster` cards into `directory`.
+
+    The bulk file also holds `extra_cards` cards that aren't in the cube, like the real dump does.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    card_pool = [random_card(rng, i) for i in range(boosters * cards_per_booster)]
+    bulk = card_pool + [random_card(rng, len(card_pool) + i) for i in range(extra_cards)]
+    rng.shuffle(bulk)
+
+    bulk_path = os.path.join(directory, "scryfall_bulk.json")
+    with open(bulk_path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        f.write(",\n".join(json.dumps(card) for card in bulk))
+        f.write("\n]\n")
+
+    csv_path = os.path.join(directory, "boosters.csv")
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Binder Name", "Name", "Scryfall ID"])
+        for n, card in enumerate(card_pool):
+            writer.writerow([f"Booster {n // cards_per_booster + 1:04d}", card["name"], card["id"]])
+
+    symbol_dir = os.path.join(directory, "symbols")
+    os.makedirs(symbol_dir, exist_ok=True)
+    symbol_map = {}
+    for n, sym in enumerate(SYMBOLS):
+        path = os.path.join(symbol_dir, f"{sym.replace('/', '_')}.png")
+        img = Image.new("RGBA", (64, 64), (0, 0, 0, 0))
+        ImageDraw.Draw(img).ellipse((2, 2, 62, 62), fill=(37 * n % 256, 91 * n % 256, 53 * n % 256, 255))
+        img.save(path, "PNG")
+        symbol_map[sym] = path
+
+    image_dir = os.path.join(directory, "images")
+    os.makedirs(image_dir, exist_ok=True)
+    image_paths = []
+    for n in range(background_images):
+        path = os.path.join(image_dir, f"background{n}.jpg")
+        Image.new("RGB", (672, 936), (60 * n % 256, 120, 180)).save(path, "JPEG")
+        image_paths.append(path)
+
+    return SyntheticCube(csv_path, bulk_path, symbol_map, image_paths, boosters, cards_per_booster)
@@ -0,0 +1,107 @@
+import hashlib
+import os
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.pdfgen.canvas import Canvas
+
+# Properties whose values `opacity` is folded into, since svglib only applies these two.
+OPACITY_PROPERTIES = ("fill-opacity", "stroke-opacity")
+
+
+class VectorSymbol:
+    """
+    A mana symbol's SVG, converted by svglib to a ReportLab drawing and drawn at any size without being
+    rasterized. Pickles as its SVG, so it can be sent to the rendering workers.
+    """
+
+    def __init__(self, svg_data: bytes, source_path: str = ""):
+        self.svg_data = svg_data
+        self.source_path = source_path
+        self.digest = hashlib.sha256(svg_data).hexdigest()
+        self.drawing = svg_to_drawing(svg_data, source_path)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return VectorSymbol, (self.svg_data, self.source_path)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, VectorSymbol) and other.svg_data == self.svg_data
+
+    def __hash__(self) -> int:
+        return hash(self.digest)
+
+    def draw(self, c: "Canvas", size: float) -> None:
+        """Draw the symbol `size` points square with its lower left corner at the origin, centred like in SVG."""
+        from reportlab.graphics import renderPDF
+
+        width, height = self.drawing.width, self.drawing.height
+        scale = size / max(width, height)
+        c.saveState()
+        c.translate((size - width * scale) / 2, (size - height * scale) / 2)
+        c.scale(scale, scale)
+        renderPDF.draw(self.drawing, c, 0, 0)
+        c.restoreState()
+
+
+def load_vector_symbol(path: str) -> VectorSymbol:
+    with open(path, "rb") as f:
+        return VectorSymbol(f.read(), path)
+
+
+def svg_to_drawing(svg_data: bytes, source_path: str = "") -> "Drawing":
+    """
+    Convert an SVG to a ReportLab drawing with svglib, raising a ValueError if it isn't a valid SVG document.
+
+    External references are only followed inside the directory of `source_path`.
+    """
+    from lxml import etree
+    from svglib.svglib import SvgRenderer
+
+    try:
+        root = etree.fromstring(svg_data, parser=etree.XMLParser(remove_comments=True, resolve_entities=False))
+    except etree.XMLSyntaxError as e:
+        raise ValueError(f"Not an SVG document: {e}") from e
+    if etree.QName(root).localname != "svg":
+        raise ValueError("Not an SVG document.")
+    fold_opacity(root)
+    drawing = SvgRenderer(source_path, external_reference_root=os.path.dirname(source_path)).render(root)
+    if not drawing.width or not drawing.height:
+        raise ValueError("SVG document has no size.")
+    return drawing
+
+
+def fold_opacity(element: Any, factor: float = 1.0, inherited: Optional[Dict[str, float]] = None) -> None:
+    """
+    Multiply each element's `opacity` into its fill and stroke opacities, which svglib does support.
+
+    This is exact for single shapes, and for groups whose children don't overlap, as in Scryfall's symbols.
+    """
+    style = _parse_style(element.get("style", ""))
+    values = dict(inherited or {})
+    for prop in OPACITY_PROPERTIES:
+        value = style.pop(prop, element.get(prop))
+        if value is not None:
+            values[prop] = _opacity(value)
+    opacity = style.pop("opacity", element.attrib.pop("opacity", None))
+    if opacity is not None:
+        factor *= _opacity(opacity)
+    if factor != 1.0:
+        for prop in OPACITY_PROPERTIES:
+            element.set(prop, f"{values.get(prop, 1.0) * factor:g}")
+        if style or "style" in element.attrib:
+            element.set("style", ";".join(f"{key}:{value}" for key, value in style.items()))
+    for child in element:
+        if isinstance(child.tag, str):
+            fold_opacity(child, factor, values)
+
+
+def _parse_style(style: str) -> Dict[str, str]:
+    declarations = (item.split(":", 1) for item in style.split(";") if ":" in item)
+    return {key.strip(): value.strip() for key, value in declarations}
+
+
+def _opacity(value: str) -> float:
+    value = value.strip()
+    number = float(value[:-1]) / 100 if value.endswith("%") else float(value)
+    return min(1.0, max(0.0, number))
@@ -38,6 +38,7 @@ setup(
     long_description_content_type="text/markdown",
     author="brahle",
     packages=find_packages(exclude=["tests", ".github"]),
+    package_data={"cube_list_printer": ["VERSION"]},
     install_requires=read_requirements("requirements.txt"),
     entry_points={
         "console_scripts": ["cube_list_printer = cube_list_printer.__main__:main"]
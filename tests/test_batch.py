@@ -0,0 +1,80 @@
+import os
+import shutil
+import unittest
+from unittest import mock
+
+import pandas as pd
+import yaml
+
+from cube_list_printer.batch import BatchJob, expand_inputs, run_batch
+from cube_list_printer.pdf_generator import load_mana_icons
+from cube_list_printer.synthetic import generate_cube
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.cube = generate_cube("cube", boosters=2, cards_per_booster=3, extra_cards=5)
+        os.makedirs("images")
+        for s_id in pd.read_csv(self.cube.csv_path)["Scryfall ID"]:
+            shutil.copy(self.cube.image_paths[0], os.path.join("images", f"{s_id}.jpg"))
+        # A second cube made of the first booster only.
+        pd.read_csv(self.cube.csv_path).head(3).to_csv("small.csv", index=False)
+        self.config = {
+            "paths": {"scryfall_bulk": self.cube.bulk_path, "image_cache_dir": "images"},
+            "fetch_delay": 0,
+            "card_width_mm": 63,
+            "card_height_mm": 88,
+        }
+
+    def test_expand_inputs(self):
+        with open("cubes.yaml", "w") as f:
+            yaml.safe_dump(["small.csv", {"csv": "other.csv", "output": "custom.pdf"}], f)
+
+        jobs = expand_inputs(["cube/*.csv", "cubes.yaml"], "out")
+
+        self.assertEqual(
+            jobs,
+            [
+                BatchJob(os.path.join("cube", "boosters.csv"), os.path.join("out", "boosters.pdf")),
+                BatchJob("small.csv", os.path.join("out", "small.pdf")),
+                BatchJob("other.csv", "custom.pdf"),
+            ],
+        )
+
+    def test_cubes_sharing_a_csv_name_get_distinct_outputs(self):
+        for name in ("a", "b"):
+            os.makedirs(os.path.join("cubes", name))
+            shutil.copy("small.csv", os.path.join("cubes", name, "boosters.csv"))
+
+        jobs = expand_inputs(["cubes/*/boosters.csv", "small.csv"], "out")
+
+        self.assertEqual(
+            [job.output_path for job in jobs],
+            [
+                os.path.join("out", "a_boosters.pdf"),
+                os.path.join("out", "b_boosters.pdf"),
+                os.path.join("out", "small.pdf"),
+            ],
+        )
+        with self.assertRaises(ValueError):
+            expand_inputs(["small.csv", "small.csv"], "out")
+
+    def test_failed_cube_does_not_stop_batch(self):
+        jobs = expand_inputs([self.cube.csv_path, "missing.csv", "small.csv"], "out")
+        icon_map = load_mana_icons(self.cube.symbol_map)
+
+        for workers, csv_reader in ((1, "pandas"), (2, "csv")):
+            with self.subTest(workers=workers, csv_reader=csv_reader), mock.patch(
+                "cube_list_printer.batch.load_icons", return_value=icon_map
+            ):
+                results = run_batch(dict(self.config, csv_reader=csv_reader), jobs, workers)
+
+                self.assertEqual([result.ok for result in results], [True, False, True])
+                self.assertIn("missing.csv", results[1].error)
+                self.assertTrue(os.path.exists(os.path.join("out", "boosters.pdf")))
+                self.assertTrue(os.path.exists(os.path.join("out", "small.pdf")))
+                shutil.rmtree("out")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+from cube_list_printer.benchmark import (
+    HEAVY_MODULES,
+    STAGES,
+    STARTUP_BUDGET_SECONDS,
+    benchmark_cube,
+    compare_results,
+    measure_card_memory,
+    measure_startup,
+)
+from cube_list_printer.data_loader import get_boosters_from_dataframe, load_data
+from cube_list_printer.synthetic import generate_cube
+
+
+class TestSyntheticCube(unittest.TestCase):
+    def test_cube_matches_bulk_file(self):
+        cube = generate_cube("cube", boosters=3, cards_per_booster=5, extra_cards=10)
+        df, scryfall_map = load_data(cube.csv_path, cube.bulk_path)
+
+        self.assertEqual(len(df), 15)
+        self.assertEqual(len(scryfall_map), 15)
+        self.assertEqual(len(get_boosters_from_dataframe(df)), 3)
+
+    def test_generation_is_deterministic(self):
+        first = generate_cube("a", boosters=2, cards_per_booster=3, extra_cards=0)
+        second = generate_cube("b", boosters=2, cards_per_booster=3, extra_cards=0)
+        with open(first.bulk_path) as f, open(second.bulk_path) as g:
+            self.assertEqual(f.read(), g.read())
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_times_every_stage(self):
+        timings = benchmark_cube(2, 4, repeat=1)
+        self.assertEqual(set(timings), set(STAGES))
+
+    def test_card_records_are_smaller(self):
+        sizes = measure_card_memory(1000)
+        self.assertLess(sizes["card_record_bytes"] * 2, sizes["card_dict_bytes"])
+
+    def test_startup_within_budget(self):
+        seconds, packages = measure_startup()
+        self.assertFalse(packages.intersection(HEAVY_MODULES))
+        self.assertLess(seconds, STARTUP_BUDGET_SECONDS)
+
+    def test_compare_flags_regressions(self):
+        baseline = {"results": {"45x15": {"load_data": 0.1, "generate_pdf": 1.0}}}
+        current = {"results": {"45x15": {"load_data": 0.2, "generate_pdf": 1.1, "new_stage": 5.0}}}
+
+        regressions = compare_results(current, baseline, tolerance=0.25)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("45x15 load_data"))
+
+
+if __name__ == "__main__":
+    unittest.main()
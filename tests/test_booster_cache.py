@@ -0,0 +1,70 @@
+import os
+import unittest
+from unittest import mock
+
+from cube_list_printer.booster_cache import BoosterCache
+from cube_list_printer.main import load_boosters
+from cube_list_printer.synthetic import generate_cube
+
+
+class TestBoosterCache(unittest.TestCase):
+    def setUp(self):
+        self.cube = generate_cube("cube", boosters=3, cards_per_booster=4, extra_cards=5)
+        self.config = {
+            "paths": {"scryfall_bulk": self.cube.bulk_path, "booster_cache_dir": "boosters"},
+            "csv_reader": "csv",
+        }
+
+    def test_unchanged_inputs_skip_enrichment(self):
+        built = load_boosters(self.config, self.cube.csv_path)
+        with mock.patch("cube_list_printer.main.build_boosters") as build:
+            cached = load_boosters(self.config, self.cube.csv_path)
+            build.assert_not_called()
+
+        self.assertEqual(list(cached), list(built))
+        for booster_id, data in cached.items():
+            self.assertEqual(data["cards"], built[booster_id]["cards"])
+            # The most valuable card is still one of the booster's cards, not a copy.
+            self.assertTrue(any(card is data["most_valuable"] for card in data["cards"]))
+
+        with mock.patch("cube_list_printer.main.build_boosters", side_effect=lambda b, m: b) as build:
+            load_boosters(self.config, self.cube.csv_path, refresh=True)
+            build.assert_called_once()
+
+    def test_uncompressed_bulk_file_is_read_until_synced(self):
+        self.config["paths"]["scryfall_bulk"] = self.cube.bulk_path + ".gz"
+        with self.assertLogs(level="WARNING"):
+            boosters = load_boosters(self.config, self.cube.csv_path)
+        self.assertEqual(len(boosters), 3)
+
+    def test_key_follows_inputs(self):
+        cache = BoosterCache("boosters", self.cube.csv_path, self.cube.bulk_path)
+        cache.store({"Booster": {"cards": [], "most_valuable": None}})
+        self.assertEqual(BoosterCache("boosters", self.cube.csv_path, self.cube.bulk_path).key, cache.key)
+
+        with open(self.cube.csv_path, "a") as f:
+            f.write("Extra,Card,id\n")
+        edited = BoosterCache("boosters", self.cube.csv_path, self.cube.bulk_path)
+        self.assertNotEqual(edited.key, cache.key)
+        self.assertIsNone(edited.load())
+
+        stat = os.stat(self.cube.bulk_path)
+        os.utime(self.cube.bulk_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        synced = BoosterCache("boosters", self.cube.csv_path, self.cube.bulk_path)
+        self.assertNotEqual(synced.key, edited.key)
+
+        pandas = BoosterCache("boosters", self.cube.csv_path, self.cube.bulk_path, "pandas")
+        self.assertNotEqual(BoosterCache("boosters", self.cube.csv_path, self.cube.bulk_path, "csv").key, pandas.key)
+        with mock.patch("cube_list_printer.booster_cache.code_fingerprint", return_value="edited"):
+            self.assertNotEqual(BoosterCache("boosters", self.cube.csv_path, self.cube.bulk_path).key, synced.key)
+
+        synced.store({})
+        self.assertEqual(os.listdir(synced.dir), [os.path.basename(synced.path)])
+        with open(synced.path, "wb") as f:
+            f.write(b"not a pickle")
+        with self.assertLogs(level="WARNING"):
+            self.assertIsNone(synced.load())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+from cube_list_printer import bulk_index
+from cube_list_printer.bulk_index import BulkIndex, build_index, ensure_index, get_index_path
+from cube_list_printer.data_loader import load_scryfall_map
+
+CARDS = [
+    {
+        "id": "b0000000-0000-0000-0000-000000000000",
+        "name": "Card B",
+        "mana_cost": "{1}{U}",
+        "image_uris": {"large": "http://example.com/b.jpg"},
+        "prices": {"usd": None, "usd_foil": "3.10", "usd_etched": None},
+    },
+    {
+        "id": "a0000000-0000-0000-0000-000000000000",
+        "name": "Card A",
+        "mana_cost": "{W} // {B}",
+        "prices": {"usd": "0.25", "usd_foil": None, "usd_etched": None},
+    },
+    {"name": "No ID"},
+]
+
+
+def write_bulk(path, cards):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cards, f)
+
+
+class TestBulkIndex(unittest.TestCase):
+    def test_lookup(self):
+        write_bulk("bulk.json", CARDS)
+        build_index("bulk.json")
+
+        with BulkIndex(get_index_path("bulk.json")) as index:
+            self.assertEqual(len(index), 2)
+            self.assertIn(CARDS[0]["id"], index)
+            self.assertNotIn("missing", index)
+            self.assertEqual(
+                index.get(CARDS[0]["id"]),
+                {
+                    "id": CARDS[0]["id"],
+                    "mana_cost": "{1}{U}",
+                    "image_uris": {"large": "http://example.com/b.jpg"},
+                    "prices": {"usd": None, "usd_foil": "3.10", "usd_etched": None},
+                },
+            )
+            self.assertEqual(index.get(CARDS[1]["id"])["mana_cost"], "{W} // {B}")
+            self.assertEqual(list(index.lookup([CARDS[1]["id"], "missing"])), [CARDS[1]["id"]])
+
+    def test_load_scryfall_map_uses_index(self):
+        write_bulk("bulk.json", CARDS)
+        scryfall_map = load_scryfall_map("bulk.json", [CARDS[1]["id"]])
+        self.assertTrue(os.path.exists(get_index_path("bulk.json")))
+        self.assertEqual(scryfall_map[CARDS[1]["id"]]["prices"]["usd"], "0.25")
+
+    def test_rebuilds_only_when_source_changes(self):
+        write_bulk("bulk.json", CARDS)
+        ensure_index("bulk.json").close()
+
+        with mock.patch.object(bulk_index, "build_index", wraps=build_index) as build:
+            ensure_index("bulk.json").close()
+            build.assert_not_called()
+
+            stat = os.stat("bulk.json")
+            os.utime("bulk.json", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            ensure_index("bulk.json").close()
+            build.assert_not_called()
+
+            write_bulk("bulk.json", CARDS[:1])
+            with ensure_index("bulk.json") as index:
+                self.assertEqual(len(index), 1)
+            build.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
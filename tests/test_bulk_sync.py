@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+import unittest
+
+from cube_list_printer.bulk_sync import sync_bulk_data
+from cube_list_printer.data_loader import load_scryfall_map
+from tests.http_stub import StubServer
+
+CARDS = [
+    {"id": "idA", "name": "Card A", "mana_cost": "{W}", "prices": {"usd": "1.00"}},
+    {"id": "idB", "name": "Card B", "mana_cost": "{U}", "prices": {"usd": None}},
+]
+DUMP = json.dumps(CARDS).encode()
+GZIPPED_DUMP = gzip.compress(DUMP, mtime=0)
+
+
+class TestBulkSync(unittest.TestCase):
+    def make_server(self, dump_route):
+        server = StubServer({"/dump.json": dump_route})
+        self.updated_at = "2024-01-01T10:00:00+00:00"
+
+        def bulk_index(headers):
+            entry = {"type": "default_cards", "updated_at": self.updated_at, "download_uri": f"{server.url}/dump.json"}
+            return 200, {"Content-Type": "application/json"}, json.dumps({"data": [entry]}).encode()
+
+        server.routes["/bulk-data"] = bulk_index
+        return server
+
+    def dump_paths(self, server):
+        return [path for _, path, _ in server.requests if path == "/dump.json"]
+
+    def test_downloads_only_when_updated(self):
+        def gzipped(headers):
+            return 200, {"Content-Type": "application/json", "Content-Encoding": "gzip"}, GZIPPED_DUMP
+
+        with self.make_server(gzipped) as server:
+            url = f"{server.url}/bulk-data"
+            self.assertTrue(sync_bulk_data("data/bulk.json.gz", api_url=url))
+            self.assertFalse(sync_bulk_data("data/bulk.json.gz", api_url=url))
+            self.assertEqual(len(self.dump_paths(server)), 1)
+
+            self.updated_at = "2024-01-02T10:00:00+00:00"
+            self.assertTrue(sync_bulk_data("data/bulk.json.gz", api_url=url))
+            self.assertEqual(len(self.dump_paths(server)), 2)
+
+        with open("data/bulk.json.gz", "rb") as f:
+            self.assertEqual(f.read(), GZIPPED_DUMP)
+        self.assertEqual(sorted(os.listdir("data")), ["bulk.json.gz", "bulk.json.gz.sync.json"])
+        for use_index in (False, True):
+            scryfall_map = load_scryfall_map("data/bulk.json.gz", {"idA"}, use_index=use_index)
+            self.assertEqual(scryfall_map["idA"]["mana_cost"], "{W}")
+
+    def test_plain_download_is_compressed(self):
+        def plain(headers):
+            return 200, {"Content-Type": "application/json"}, DUMP
+
+        with self.make_server(plain) as server:
+            sync_bulk_data("bulk.json.gz", api_url=f"{server.url}/bulk-data")
+
+        with gzip.open("bulk.json.gz", "rb") as f:
+            self.assertEqual(f.read(), DUMP)
+
+    def test_dump_synced_to_a_plain_json_path_still_loads(self):
+        def plain(headers):
+            return 200, {"Content-Type": "application/json"}, DUMP
+
+        with self.make_server(plain) as server:
+            sync_bulk_data("bulk.json", api_url=f"{server.url}/bulk-data")
+
+        for use_index in (False, True):
+            scryfall_map = load_scryfall_map("bulk.json", {"idB"}, use_index=use_index)
+            self.assertEqual(scryfall_map["idB"]["mana_cost"], "{U}")
+
+    def test_corrupt_download_keeps_previous_dump(self):
+        with open("bulk.json.gz", "wb") as f:
+            f.write(gzip.compress(b"[]"))
+
+        def truncated(headers):
+            return 200, {"Content-Encoding": "gzip"}, GZIPPED_DUMP[:-12]
+
+        with self.make_server(truncated) as server, self.assertRaises(ValueError):
+            sync_bulk_data("bulk.json.gz", api_url=f"{server.url}/bulk-data")
+
+        with gzip.open("bulk.json.gz", "rb") as f:
+            self.assertEqual(f.read(), b"[]")
+        self.assertEqual(os.listdir("."), ["bulk.json.gz"])
+
+
+if __name__ == "__main__":
+    unittest.main()
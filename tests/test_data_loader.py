@@ -1,9 +1,22 @@
+import io
+import json
+import logging
+import os
+import tempfile
 import unittest
 import pandas as pd
+from cube_list_printer.card import Card
 from cube_list_printer.data_loader import (
+    CSV_OPTIONS,
     get_boosters_from_dataframe,
     enrich_boosters_with_scryfall_data,
+    iter_boosters_csv,
+    iter_json_array,
+    load_data,
+    read_boosters_csv,
 )
+from cube_list_printer.main import read_boosters
+from cube_list_printer.synthetic import generate_cube
 
 
 class TestDataLoader(unittest.TestCase):
@@ -17,21 +30,110 @@ class TestDataLoader(unittest.TestCase):
         boosters = get_boosters_from_dataframe(df)
         self.assertIn("Booster1", boosters)
         self.assertEqual(len(boosters["Booster1"]["cards"]), 2)
-        self.assertEqual(boosters["Booster1"]["cards"][0]["name"], "Card A")
+        self.assertEqual(boosters["Booster1"]["cards"][0].name, "Card A")
+
+    def test_csv_reader_matches_pandas(self):
+        pd.DataFrame(
+            {
+                "Binder Name": ["Booster2", "Booster1", None, "Booster2", "Booster1", "Booster3"],
+                "Name": ["Card A", "Card B", "Card C", "Card D", "Card E", "Card F"],
+                "Scryfall ID": ["idA", None, "idC", "idD", "idE", None],
+                "Set": ["one", "two", "three", "four", "five", "six"],
+            }
+        ).to_csv("boosters.csv", index=False)
+        pd.DataFrame({"Binder Name": ["Booster1"], "Name": ["Card A"]}).to_csv("no_ids.csv", index=False)
+        cube = generate_cube("cube", boosters=4, cards_per_booster=5, extra_cards=0)
+
+        for csv_path in ("boosters.csv", "no_ids.csv", cube.csv_path):
+            with self.subTest(csv_path=csv_path):
+                with self.assertLogs(level="WARNING") as expected:
+                    logging.warning("start")
+                    boosters = get_boosters_from_dataframe(pd.read_csv(csv_path, **CSV_OPTIONS))
+                with self.assertLogs(level="WARNING") as actual, open(csv_path, newline="") as f:
+                    logging.warning("start")
+                    streamed = read_boosters_csv(f)
+
+                self.assertEqual(list(streamed.items()), list(boosters.items()))
+                self.assertEqual(actual.output, expected.output)
+
+    def test_readers_agree_on_numeric_binder_names(self):
+        rows = [("10", "Card A", "idA"), ("9", "Card B", "idB"), ("02", "Card C", "NA"), ("10", "Card D", "idD")]
+        rows.append(("NA", "Card E", "idE"))
+        with open("boosters.csv", "w", newline="") as f:
+            f.write("Binder Name,Name,Scryfall ID\n" + "".join(",".join(row) + "\n" for row in rows))
+
+        boosters = read_boosters({"csv_reader": "pandas"}, "boosters.csv")
+        self.assertEqual(read_boosters({"csv_reader": "csv"}, "boosters.csv"), boosters)
+        self.assertEqual(list(boosters), ["02", "10", "9", "NA"])
+        self.assertEqual(boosters["02"]["cards"], [Card("Card C", "NA")])
+
+        # Streaming keeps file order, so it needs each binder's rows together.
+        with open("boosters.csv", newline="") as f, self.assertRaisesRegex(ValueError, "booster '10'"):
+            list(iter_boosters_csv(f))
+        rows.sort(key=lambda row: row[0])
+        with open("sorted.csv", "w", newline="") as f:
+            f.write("Binder Name,Name,Scryfall ID\n" + "".join(",".join(row) + "\n" for row in rows))
+        with open("sorted.csv", newline="") as f:
+            self.assertEqual(dict(iter_boosters_csv(f)), boosters)
+
+    def test_iter_boosters_csv_yields_in_file_order(self):
+        text = "Binder Name,Name,Scryfall ID\nB2,Card A,idA\nB2,Card B,\nB1,Card C,idC\n,Card D,idD\nB2,Card E,idE\n"
+        boosters = iter_boosters_csv(io.StringIO(text))
+
+        self.assertEqual(next(boosters), ("B2", {"cards": [Card("Card A", "idA")]}))
+        self.assertEqual(next(boosters), ("B1", {"cards": [Card("Card C", "idC")]}))
+        with self.assertRaises(ValueError):
+            next(boosters)
 
     def test_enrich_boosters_with_scryfall_data(self):
-        boosters = {"Booster1": {"cards": [{"name": "Card A", "scryfall_id": "idA"}]}}
+        cards = [Card("Card B", "idB"), Card("Card A", "idA"), Card("Card C", "idC"), Card("Card D", "idD")]
+        boosters = {"Booster1": {"cards": cards}, "Booster2": {"cards": []}}
         scryfall_map = {
             "idA": {
                 "id": "idA",
                 "mana_cost": "{W}{U}",
-                "image_uris": {"normal": "http://example.com/cardA.jpg"},
-                "usd": "1.50",
-            }
+                "image_uris": {"small": "http://example.com/small.jpg", "normal": "http://example.com/cardA.jpg"},
+                "prices": {"usd": "1.50"},
+            },
+            "idB": {"id": "idB", "prices": {"usd": None, "usd_foil": "1.50"}},
+            "idC": {"id": "idC", "prices": {"usd": "0.50"}},
         }
         enrich_boosters_with_scryfall_data(boosters, scryfall_map)
-        self.assertEqual(boosters["Booster1"]["cards"][0]["mana_cost"], "{W}{U}")
-        self.assertEqual(boosters["Booster1"]["cards"][0]["value"], 1.5)
+        self.assertEqual(cards[1].mana_cost, "{W}{U}")
+        self.assertEqual(cards[1].image_uri, "http://example.com/cardA.jpg")
+        self.assertEqual(cards[1].value, 1.5)
+        self.assertEqual((cards[3].mana_cost, cards[3].image_uri, cards[3].value), ("", None, 0.0))
+        # Ties go to the card whose name sorts first, as with max() over the sorted list.
+        self.assertIs(boosters["Booster1"]["most_valuable"], cards[1])
+        self.assertIsNone(boosters["Booster2"]["most_valuable"])
+
+    def test_iter_json_array_across_chunks(self):
+        items = [{"id": f"id{i}", "price": i * 1.25, "name": "Card \\" + "x" * i} for i in range(50)]
+        text = json.dumps(items, indent=1)
+        for chunk_size in (1, 7, 64, len(text)):
+            self.assertEqual(list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)), items)
+        self.assertEqual(list(iter_json_array(io.StringIO(" [ ] "))), [])
+
+    def test_load_data_keeps_only_wanted_cards(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "boosters.csv")
+            json_path = os.path.join(tmp, "bulk.json")
+            pd.DataFrame(
+                {"Binder Name": ["Booster1", "Booster1"], "Name": ["Card A", "Card B"], "Scryfall ID": ["idA", None]}
+            ).to_csv(csv_path, index=False)
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    [
+                        {"id": "idA", "name": "Card A", "mana_cost": "{W}", "oracle_text": "...", "prices": {}},
+                        {"id": "idB", "name": "Card B", "mana_cost": "{U}"},
+                    ],
+                    f,
+                )
+
+            df, scryfall_map = load_data(csv_path, json_path, use_index=False)
+
+        self.assertEqual(len(df), 2)
+        self.assertEqual(scryfall_map, {"idA": {"id": "idA", "mana_cost": "{W}", "prices": {}}})
 
 
 if __name__ == "__main__":
@@ -0,0 +1,151 @@
+import os
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from cube_list_printer.http_client import retry_delay
+from cube_list_printer.image_cache import ImageCache, load_index
+from cube_list_printer.image_handler import fetch_images, get_resampled_image
+from cube_list_printer.rate_limit import TokenBucket
+from tests.http_stub import StubServer
+
+
+def jpeg_bytes():
+    buf = BytesIO()
+    Image.new("RGB", (4, 4), color="red").save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+class TestImageHandler(unittest.TestCase):
+    def test_fetch_images_falls_back_per_card(self):
+        image = jpeg_bytes()
+        flaky = iter([(503, {"Retry-After": "0"}, b"busy")])
+
+        def good_route(headers):
+            return 200, {"Content-Type": "image/jpeg"}, image
+
+        def flaky_route(headers):
+            return next(flaky, None) or good_route(headers)
+
+        def html_route(headers):
+            return 200, {"Content-Type": "text/html"}, b"<html></html>"
+
+        with StubServer({"/good.jpg": good_route, "/flaky.jpg": flaky_route, "/html.jpg": html_route}) as server:
+            uris = {name: f"{server.url}/{name}.jpg" for name in ("good", "flaky", "bad", "html")}
+            paths = fetch_images(dict(uris, none=None), ImageCache("images"), delay=0, max_workers=3)
+
+        self.assertEqual(paths["good"], os.path.join("images", "good.jpg"))
+        self.assertEqual(paths["flaky"], os.path.join("images", "flaky.jpg"))
+        self.assertEqual([path for _, path, _ in server.requests].count("/flaky.jpg"), 2)
+        for name in ("bad", "html", "none"):
+            self.assertEqual(paths[name], os.path.join("images", f"{name}_placeholder.png"))
+        self.assertTrue(all(os.path.exists(path) for path in paths.values()))
+        # Images are saved byte for byte as served.
+        with open(paths["good"], "rb") as f:
+            self.assertEqual(f.read(), image)
+
+    def test_retry_delay_honors_retry_after(self):
+        self.assertEqual(retry_delay(0, 0.5), 0.5)
+        self.assertEqual(retry_delay(2, 0.5), 2.0)
+        self.assertEqual(retry_delay(2, 0.5, "3"), 3.0)
+        self.assertEqual(retry_delay(0, 0.5, "Wed, 21 Oct 2015 07:28:00 GMT"), 0.0)
+        self.assertEqual(retry_delay(0, 0.5, "soon"), 0.5)
+
+    def test_token_bucket_enforces_rate(self):
+        bucket = TokenBucket.from_delay(0.05)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_resampled_images_are_cached_per_dpi(self):
+        Image.new("RGB", (1000, 1400), color="green").save("source.jpg", format="JPEG")
+
+        proof = get_resampled_image("source.jpg", "abc", 63, 88, 150, derived_dir="derived")
+        self.assertEqual(proof, os.path.join("derived", "abc_372x520_150dpi_q85.jpg"))
+        self.assertEqual(Image.open(proof).size, (372, 520))
+        mtime = os.path.getmtime(proof)
+        self.assertEqual(get_resampled_image("source.jpg", "abc", 63, 88, 150, derived_dir="derived"), proof)
+        self.assertEqual(os.path.getmtime(proof), mtime)
+
+        printed = get_resampled_image("source.jpg", "abc", 63, 88, 300, quality=90, derived_dir="derived")
+        self.assertEqual(printed, os.path.join("derived", "abc_744x1039_300dpi_q90.jpg"))
+        self.assertEqual(get_resampled_image("source.jpg", "abc", 63, 88, 600, derived_dir="derived"), "source.jpg")
+
+    def test_concurrent_resampling_writes_one_image(self):
+        Image.new("RGB", (1000, 1400), color="green").save("source.jpg", format="JPEG")
+
+        def resample(_):
+            return get_resampled_image("source.jpg", "abc", 63, 88, 150, derived_dir="derived")
+
+        with ThreadPoolExecutor(8) as pool:
+            paths = set(pool.map(resample, range(16)))
+        self.assertEqual(paths, {os.path.join("derived", "abc_372x520_150dpi_q85.jpg")})
+        self.assertEqual(os.listdir("derived"), ["abc_372x520_150dpi_q85.jpg"])
+        self.assertEqual(Image.open(paths.pop()).size, (372, 520))
+
+    def test_image_cache_evicts_least_recently_used(self):
+        cache = ImageCache("cache", max_bytes=250)
+        cache.put("a.jpg", b"a" * 100)
+        cache.put("b.jpg", b"b" * 100)
+        cache.flush()
+
+        later = ImageCache("cache", max_bytes=250)
+        self.assertIsNotNone(later.get("a.jpg"))
+        later.put("c.jpg", b"c" * 100)
+        self.assertIsNone(later.get("b.jpg"))
+        self.assertFalse(os.path.exists(os.path.join("cache", "b.jpg")))
+        # Images used through this instance are kept even when over budget.
+        later.put("d.jpg", b"d" * 100)
+        self.assertEqual(later.stats()["images"], 3)
+
+    def test_derived_images_count_against_the_budget(self):
+        derived_dir = os.path.join("cache", "derived")
+        cache = ImageCache("cache", derived_dir=derived_dir)
+        cache.put("a.jpg", b"a" * 100)
+        cache.flush()
+        os.makedirs(derived_dir)
+        derived_path = os.path.join(derived_dir, "a_10x10_150dpi_q85.jpg")
+        with open(derived_path, "wb") as f:
+            f.write(b"d" * 200)
+        # Made before the source was last used, so it's evicted first.
+        os.utime(derived_path, (1, 1))
+
+        later = ImageCache("cache", max_bytes=250, derived_dir=derived_dir)
+        self.assertEqual(later.stats()["bytes"], 300)
+        later.prune(250)
+        self.assertFalse(os.path.exists(derived_path))
+        self.assertIsNotNone(later.get("a.jpg"))
+        self.assertEqual(later.stats()["bytes"], 100)
+
+    def test_image_cache_discards_damaged_images(self):
+        cache = ImageCache("cache")
+        cache.put("indexed.jpg", b"x" * 100)
+        cache.flush()
+        with open(os.path.join("cache", "indexed.jpg"), "wb") as f:
+            f.write(b"x" * 10)
+        Image.new("RGB", (4, 4)).save(os.path.join("cache", "legacy.jpg"), format="JPEG")
+        with open(os.path.join("cache", "truncated.jpg"), "wb") as f:
+            f.write(jpeg_bytes()[:20])
+        # Replaced by another process since it was indexed.
+        cache.put("replaced.jpg", b"x" * 100)
+        cache.flush()
+        Image.new("RGB", (8, 8)).save(os.path.join("cache", "replaced.jpg"), format="JPEG")
+
+        cache = ImageCache("cache")
+        self.assertIsNone(cache.get("indexed.jpg"))
+        self.assertEqual(cache.get("legacy.jpg"), os.path.join("cache", "legacy.jpg"))
+        self.assertIsNone(cache.get("truncated.jpg"))
+        self.assertEqual(cache.get("replaced.jpg"), os.path.join("cache", "replaced.jpg"))
+        self.assertEqual(sorted(os.listdir("cache")), ["index.json", "legacy.jpg", "replaced.jpg"])
+        cache.flush()
+        self.assertEqual(
+            load_index("cache")["replaced.jpg"]["size"], os.path.getsize(os.path.join("cache", "replaced.jpg"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from cube_list_printer.card import Card
+from cube_list_printer.layout import Glyph, LayoutEngine
+
+
+class TestLayoutEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = LayoutEngine(frozenset({"W", "U"}), "Times-Roman", 10, 10, " // ", 2)
+
+    def test_mana_run_positions(self):
+        run = self.engine.mana_run("{2}{w} // {U}")
+        two = stringWidth("2", "Times-Roman", 10)
+        sep = stringWidth(" // ", "Times-Roman", 10)
+        after_sep = two + 2 + 10 + sep + 2
+        self.assertEqual(
+            run.glyphs,
+            (
+                Glyph(False, "2", 0.0),
+                Glyph(True, "W", two + 2),
+                Glyph(False, " // ", two + 2 + 10),
+                Glyph(True, "U", after_sep),
+            ),
+        )
+        self.assertAlmostEqual(run.width, after_sep + 10 + 4)
+
+    def test_caches_are_counted(self):
+        cards = [Card("Card A", "a", mana_cost="{W}"), Card("Card A", "a", mana_cost="{W}"), Card("Card B", "b")]
+        lines = self.engine.layout_lines(cards)
+
+        self.assertEqual([line.name for line in lines], ["Card A", "Card A", "Card B"])
+        self.assertEqual(lines[2].mana.glyphs, ())
+        stats = self.engine.stats()
+        self.assertEqual((stats["mana_cost"]["hits"], stats["mana_cost"]["misses"]), (1, 1))
+        self.assertEqual((stats["text_width"]["hits"], stats["text_width"]["misses"]), (1, 2))
+        self.assertEqual(stats["mana_cost"]["hit_rate"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import json
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from cube_list_printer import metrics
+from cube_list_printer.image_cache import ImageCache
+from cube_list_printer.image_handler import fetch_image
+
+
+class TestMetrics(unittest.TestCase):
+    def test_stages_and_counters(self):
+        with metrics.collect(trace_memory=True) as run_metrics:
+            with metrics.stage("parse"):
+                data = [str(n) for n in range(10000)]
+            with metrics.stage("parse"):
+                pass
+            metrics.count("cards", len(data))
+            metrics.count("cards", 5)
+            metrics.set_counter("pages", 3)
+
+        result = run_metrics.as_dict()
+        self.assertEqual(result["stages"]["parse"]["calls"], 2)
+        self.assertGreater(result["stages"]["parse"]["wall_seconds"], 0)
+        self.assertGreater(result["stages"]["parse"]["peak_memory_bytes"], 0)
+        self.assertEqual(result["counters"], {"cards": 10005, "pages": 3})
+        # Outside `collect`, counts go to the default collector.
+        metrics.count("cards")
+        self.assertEqual(run_metrics.counters["cards"], 10005)
+
+    def test_nested_stages_keep_the_outer_peak(self):
+        with metrics.collect(trace_memory=True) as run_metrics:
+            with metrics.stage("outer"):
+                data = bytearray(8 * 2**20)
+                del data
+                with metrics.stage("inner"):
+                    data = bytearray(2**20)
+                    del data
+
+        stages = run_metrics.as_dict()["stages"]
+        self.assertGreaterEqual(stages["outer"]["peak_memory_bytes"], 8 * 2**20)
+        self.assertGreaterEqual(stages["inner"]["peak_memory_bytes"], 2**20)
+        self.assertLess(stages["inner"]["peak_memory_bytes"], 8 * 2**20)
+
+    def test_concurrent_stages_are_all_counted(self):
+        def work(_):
+            for _ in range(200):
+                with metrics.stage("work"):
+                    pass
+
+        with metrics.collect(trace_memory=True) as run_metrics:
+            with ThreadPoolExecutor(8) as pool:
+                list(pool.map(work, range(8)))
+
+        self.assertEqual(run_metrics.stages["work"].calls, 8 * 200)
+        self.assertEqual(run_metrics._open, [])
+
+    def test_image_cache_hits_and_json_report(self):
+        os.makedirs("cache")
+        Image.new("RGB", (4, 4)).save(os.path.join("cache", "abc.jpg"), format="JPEG")
+
+        cache = ImageCache("cache")
+        with metrics.collect() as run_metrics:
+            fetch_image("abc", None, cache)
+            fetch_image("def", None, cache)
+        metrics.report(run_metrics, os.path.join("out", "metrics.json"), summary=True)
+
+        with open(os.path.join("out", "metrics.json")) as f:
+            counters = json.load(f)["counters"]
+        self.assertEqual(counters["images.cache_hits"], 1)
+        self.assertEqual(counters["images.cache_misses"], 1)
+        self.assertEqual(counters["images.placeholders"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,176 @@
+import os
+import re
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
+from pypdf import PdfReader
+
+from cube_list_printer.card import Card, most_valuable_card
+from cube_list_printer.pdf_generator import generate_pdf, generate_pdf_bytes, generate_pdf_streaming
+from cube_list_printer.pdf_merge import count_embedded_images
+from cube_list_printer.vector_symbol import VectorSymbol
+
+CIRCLE_SVG = '<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 2 2"><circle cx="1" cy="1" r="1" fill="{}"/></svg>'
+
+
+def make_boosters(count, bg_paths):
+    boosters = {}
+    for n in range(count):
+        cards = [
+            Card(
+                f"Card {n}-{i}",
+                f"id{n}-{i}",
+                mana_cost="{W}{U} // {2}{B/G}",
+                value=float(i),
+                image_local_path=bg_paths[n % len(bg_paths)],
+            )
+            for i in range(15)
+        ]
+        boosters[f"Booster {n}"] = {"cards": cards, "most_valuable": most_valuable_card(cards)}
+    return boosters
+
+
+def count_images(pdf_path):
+    with open(pdf_path, "rb") as f:
+        return f.read().count(b"/Subtype /Image")
+
+
+class TestPDFResources(unittest.TestCase):
+    def setUp(self):
+        self.bg_paths = []
+        for name, color in (("a.jpg", "red"), ("b.jpg", "blue")):
+            Image.new("RGB", (48, 68), color=color).save(name, format="JPEG")
+            self.bg_paths.append(name)
+        self.icon_map = {sym: Image.new("RGBA", (16, 16), color) for sym, color in (("W", "white"), ("U", "blue"))}
+
+    def test_icons_and_backgrounds_are_forms_drawn_by_reference(self):
+        for booster_count in (2, 20):
+            output_path = f"out_{booster_count}.pdf"
+            generate_pdf(output_path, make_boosters(booster_count, self.bg_paths), self.icon_map, 63, 88)
+            with open(output_path, "rb") as f:
+                data = f.read()
+            # One form per background and per icon, however many boosters use them.
+            self.assertEqual(data.count(b"/Subtype /Form"), 2 + 2)
+
+            contents = b"".join(page.get_contents().get_data() for page in PdfReader(output_path).pages)
+            uses = re.findall(rb"/FormXob\.(Background|Icon)_\w+ Do", contents)
+            self.assertEqual(uses.count(b"Background"), booster_count)
+            # Each booster's 15 costs of "{W}{U} // {2}{B/G}" draw W and U once each.
+            self.assertEqual(uses.count(b"Icon"), booster_count * 15 * 2)
+            # Small chunks split the marker across reads.
+            self.assertEqual(count_embedded_images(output_path, chunk_size=5), count_images(output_path))
+
+    def test_parallel_rendering_matches_serial(self):
+        boosters = make_boosters(40, self.bg_paths)
+        generate_pdf("serial.pdf", boosters, self.icon_map, 63, 88)
+        generate_pdf("parallel.pdf", boosters, self.icon_map, 63, 88, workers=3)
+
+        serial = PdfReader("serial.pdf")
+        parallel = PdfReader("parallel.pdf")
+        self.assertEqual(len(parallel.pages), 5)
+        self.assertEqual(
+            [page.get_contents().get_data() for page in serial.pages],
+            [page.get_contents().get_data() for page in parallel.pages],
+        )
+        self.assertEqual(count_images("parallel.pdf"), count_images("serial.pdf"))
+
+    def test_incremental_rebuild_reuses_unchanged_pages(self):
+        boosters = make_boosters(25, self.bg_paths)
+        first = generate_pdf("cached.pdf", boosters, self.icon_map, 63, 88, page_cache_dir="pages")
+        self.assertEqual((first.pages, first.reused, first.rendered), (3, 0, 3))
+
+        boosters["Booster 12"]["cards"][3].mana_cost = "{G}"
+        second = generate_pdf("cached.pdf", boosters, self.icon_map, 63, 88, page_cache_dir="pages")
+        self.assertEqual((second.pages, second.reused, second.rendered), (3, 2, 1))
+
+        generate_pdf("serial.pdf", boosters, self.icon_map, 63, 88)
+        self.assertEqual(
+            [page.get_contents().get_data() for page in PdfReader("serial.pdf").pages],
+            [page.get_contents().get_data() for page in PdfReader("cached.pdf").pages],
+        )
+
+    def test_drawing_code_changes_invalidate_cached_pages(self):
+        boosters = make_boosters(25, self.bg_paths)
+        generate_pdf("cached.pdf", boosters, self.icon_map, 63, 88, page_cache_dir="pages")
+        with mock.patch("cube_list_printer.pdf_generator.source_fingerprint", return_value="edited"):
+            report = generate_pdf("cached.pdf", boosters, self.icon_map, 63, 88, page_cache_dir="pages")
+        self.assertEqual((report.reused, report.rendered), (0, 3))
+
+    def test_failed_build_leaves_no_cached_pages(self):
+        boosters = make_boosters(25, self.bg_paths)
+        with mock.patch("cube_list_printer.pdf_generator.create_card", side_effect=[None] * 12 + [OSError("disk")]):
+            with self.assertRaises(OSError):
+                generate_pdf("cached.pdf", boosters, self.icon_map, 63, 88, page_cache_dir="pages")
+        self.assertEqual([files for _, _, files in os.walk("pages")], [[], []])
+
+        report = generate_pdf("cached.pdf", boosters, self.icon_map, 63, 88, page_cache_dir="pages")
+        self.assertEqual((report.reused, report.rendered), (0, 3))
+
+    def test_streaming_matches_serial(self):
+        boosters = make_boosters(40, self.bg_paths)
+        generate_pdf("serial.pdf", boosters, self.icon_map, 63, 88)
+        ids = list(boosters)
+        chunks = ({booster_id: boosters[booster_id] for booster_id in ids[n : n + 18]} for n in range(0, 40, 18))
+        report = generate_pdf_streaming("streamed.pdf", chunks, self.icon_map, 63, 88)
+
+        streamed = PdfReader("streamed.pdf", strict=True)
+        self.assertEqual((report.pages, len(streamed.pages)), (5, 5))
+        self.assertEqual(streamed.metadata.title, "Booster Cards")
+        self.assertEqual(
+            [page.get_contents().get_data() for page in PdfReader("serial.pdf").pages],
+            [page.get_contents().get_data() for page in streamed.pages],
+        )
+        self.assertEqual(count_images("streamed.pdf"), count_images("serial.pdf"))
+
+    def test_vector_icons_are_drawn_once_without_images(self):
+        colors = {"W": "#fff", "U": "#00f"}
+        icon_map = {sym: VectorSymbol(CIRCLE_SVG.format(color).encode()) for sym, color in colors.items()}
+        boosters = make_boosters(20, self.bg_paths)
+        generate_pdf("raster.pdf", boosters, self.icon_map, 63, 88)
+        generate_pdf("vector.pdf", boosters, icon_map, 63, 88, page_cache_dir="pages")
+
+        # Only the two backgrounds are images, and each icon is one form used everywhere.
+        self.assertEqual(count_images("vector.pdf"), 2)
+        self.assertGreater(count_images("raster.pdf"), 2)
+        with open("vector.pdf", "rb") as f:
+            data = f.read()
+        self.assertEqual(data.count(b"/Subtype /Form"), 2 + 2)
+        self.assertLess(len(data), os.path.getsize("raster.pdf"))
+
+    def test_missing_backgrounds_use_the_in_memory_placeholder(self):
+        boosters = make_boosters(3, ["missing.jpg"])
+        report = generate_pdf("cached.pdf", boosters, self.icon_map, 63, 88, dpi=150, page_cache_dir="pages")
+        self.assertEqual(report.rendered, 1)
+        generate_pdf("serial.pdf", boosters, self.icon_map, 63, 88)
+
+        self.assertFalse(os.path.exists("data"))
+        self.assertEqual(count_images("serial.pdf"), count_images("cached.pdf"))
+
+    def test_in_memory_rendering_writes_no_files(self):
+        boosters = make_boosters(20, self.bg_paths)
+        generate_pdf("serial.pdf", boosters, self.icon_map, 63, 88)
+        backgrounds = {}
+        for data in boosters.values():
+            with open(data["most_valuable"].image_local_path, "rb") as f:
+                backgrounds[data["most_valuable"].scryfall_id] = f.read()
+        # This booster gets the placeholder.
+        del backgrounds[boosters["Booster 0"]["most_valuable"].scryfall_id]
+        files = sorted(os.listdir("."))
+
+        with ThreadPoolExecutor(4) as pool:
+            pdfs = list(pool.map(lambda _: generate_pdf_bytes(boosters, self.icon_map, 63, 88, backgrounds), range(4)))
+
+        self.assertEqual(sorted(os.listdir(".")), files)
+        contents = [[page.get_contents().get_data() for page in PdfReader(BytesIO(pdf)).pages] for pdf in pdfs]
+        self.assertEqual(len(contents[0]), 3)
+        self.assertTrue(all(pages == contents[0] for pages in contents))
+        # Backgrounds are embedded once per distinct image, plus the placeholder.
+        self.assertEqual(pdfs[0].count(b"/Subtype /Image"), count_images("serial.pdf") + 1)
+
+
 # import unittest
 # import os
 # from cube_list_printer.pdf_generator import generate_pdf
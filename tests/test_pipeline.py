@@ -0,0 +1,93 @@
+import threading
+import unittest
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
+from pypdf import PdfReader
+
+from cube_list_printer import pdf_generator
+from cube_list_printer.card import Card, most_valuable_card
+from cube_list_printer.main import render_pipelined
+from cube_list_printer.pipeline import Prefetcher
+from tests.http_stub import StubServer
+
+
+class TestPrefetcher(unittest.TestCase):
+    def test_results_are_in_order_and_bounded(self):
+        started = []
+        lock = threading.Lock()
+
+        def square(n):
+            with lock:
+                started.append(n)
+            return n * n
+
+        with Prefetcher(square, range(20), workers=4, ahead=3) as results:
+            for taken, result in enumerate(results, 1):
+                self.assertEqual(result, (taken - 1) ** 2)
+                with lock:
+                    self.assertLessEqual(len(started), taken + 3)
+        self.assertEqual(sorted(started), list(range(20)))
+
+    def test_errors_surface_in_turn(self):
+        def check(n):
+            if n == 2:
+                raise ValueError(n)
+            return n
+
+        results = Prefetcher(check, range(5), ahead=5)
+        self.assertEqual([next(results), next(results)], [0, 1])
+        with self.assertRaises(ValueError):
+            next(results)
+        results.close()
+
+
+class TestRenderPipelined(unittest.TestCase):
+    def test_pages_are_drawn_while_backgrounds_download(self):
+        buf = BytesIO()
+        Image.new("RGB", (48, 68), color="red").save(buf, format="JPEG")
+
+        def image_route(headers):
+            return 200, {"Content-Type": "image/jpeg"}, buf.getvalue()
+
+        server = StubServer({f"/{n}.jpg": image_route for n in range(36)})
+        boosters = {}
+        for n in range(40):
+            # Three boosters reuse an earlier image and one has none.
+            image = n % 36 if n != 39 else None
+            uri = f"{server.url}/{image}.jpg" if image is not None else None
+            cards = [Card(f"Card {n}-{i}", f"id{image}-{i}", "{W}", uri, float(i)) for i in range(3)]
+            boosters[f"Booster {n}"] = {"cards": cards, "most_valuable": most_valuable_card(cards)}
+        config = {
+            "paths": {"image_cache_dir": "images"},
+            "fetch_delay": 0,
+            "fetch_workers": 1,
+            "pipeline_prefetch": 9,
+            "card_width_mm": 63,
+            "card_height_mm": 88,
+        }
+
+        draw_page = pdf_generator.draw_page
+        downloaded_at_draw = []
+
+        def recording_draw_page(*args):
+            downloaded_at_draw.append(len(server.requests))
+            draw_page(*args)
+
+        with server, mock.patch("cube_list_printer.main.load_icons", return_value={}), mock.patch.object(
+            pdf_generator, "draw_page", recording_draw_page
+        ):
+            report, image_paths = render_pipelined(config, boosters, "pipelined.pdf")
+
+        self.assertEqual((report.pages, len(PdfReader("pipelined.pdf").pages)), (5, 5))
+        self.assertEqual(len(server.requests), 36)
+        self.assertEqual(len(image_paths), 37)
+        # The first page only waited for its own backgrounds and the bounded prefetch after them.
+        self.assertLessEqual(downloaded_at_draw[0], 9 + 9)
+        self.assertEqual(boosters["Booster 38"]["most_valuable"].image_local_path, image_paths["id2-2"])
+        self.assertTrue(image_paths["idNone-2"].endswith("_placeholder.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
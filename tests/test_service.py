@@ -0,0 +1,90 @@
+import http.client
+import json
+import os
+import random
+import shutil
+import threading
+import unittest
+from unittest import mock
+
+import pandas as pd
+import requests
+
+from cube_list_printer.pdf_generator import load_mana_icons
+from cube_list_printer.service import RenderService, ServiceBusy, create_server
+from cube_list_printer.synthetic import generate_cube, random_card
+
+
+class TestRenderService(unittest.TestCase):
+    def setUp(self):
+        self.cube = generate_cube("cube", boosters=2, cards_per_booster=3, extra_cards=5)
+        os.makedirs("images")
+        for s_id in pd.read_csv(self.cube.csv_path)["Scryfall ID"]:
+            shutil.copy(self.cube.image_paths[0], os.path.join("images", f"{s_id}.jpg"))
+        config = {
+            "paths": {"scryfall_bulk": self.cube.bulk_path, "image_cache_dir": "images"},
+            "fetch_delay": 0,
+            "card_width_mm": 63,
+            "card_height_mm": 88,
+        }
+        icon_map = load_mana_icons(self.cube.symbol_map)
+        with mock.patch("cube_list_printer.service.load_icons", return_value=icon_map):
+            self.service = RenderService(config, max_concurrency=1, max_queue=0)
+        self.addCleanup(self.service.close)
+        with open(self.cube.csv_path, "rb") as f:
+            self.csv_data = f.read()
+
+    def test_render_over_http(self):
+        server = create_server(self.service, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        url = "http://%s:%d" % server.server_address
+
+        resp = requests.post(f"{url}/render", data=self.csv_data, timeout=10)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.headers["Content-Type"], "application/pdf")
+        self.assertTrue(resp.content.startswith(b"%PDF"))
+
+        health = requests.get(f"{url}/health", timeout=10).json()
+        self.assertEqual((health["cards"], health["images"], health["rendered"]), (11, 2, 1))
+
+        self.assertEqual(requests.post(f"{url}/render", timeout=10).status_code, 400)
+        conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+        conn.request("POST", "/render", headers={"Content-Length": "many"})
+        self.assertEqual(conn.getresponse().status, 400)
+        conn.close()
+
+    def test_failed_downloads_are_retried_on_the_next_request(self):
+        shutil.rmtree("images")
+        with mock.patch("cube_list_printer.image_handler.fetch_image", side_effect=OSError("offline")):
+            self.service.render(self.csv_data)
+        self.assertEqual(self.service.health()["images"], 0)
+
+        with mock.patch("cube_list_printer.image_handler.fetch_image", return_value=self.cube.image_paths[0]) as fetch:
+            self.service.render(self.csv_data)
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(self.service.health()["images"], 2)
+
+    def test_rejects_when_queue_is_full(self):
+        self.service._admitted.acquire()
+        try:
+            with self.assertRaises(ServiceBusy):
+                self.service.render(self.csv_data)
+        finally:
+            self.service._admitted.release()
+
+    def test_reloads_changed_bulk_file(self):
+        extra = random_card(random.Random(1), 99)
+        with open(self.cube.bulk_path, "r") as f:
+            bulk = f.read().rstrip().rstrip("]")
+        with open(self.cube.bulk_path, "w") as f:
+            f.write(bulk + ",\n" + json.dumps(extra) + "\n]\n")
+
+        self.assertIn(extra["id"], self.service.lookup([extra["id"]]))
+        self.assertEqual(self.service.health()["reloads"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
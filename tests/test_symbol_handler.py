@@ -0,0 +1,126 @@
+import json
+import os
+import unittest
+
+from PIL import Image
+
+from cube_list_printer.pdf_generator import load_mana_icons
+from cube_list_printer.symbol_handler import MANIFEST_NAME, fetch_symbols
+from cube_list_printer.vector_symbol import VectorSymbol
+from tests.http_stub import StubServer
+
+try:
+    import cairosvg  # noqa: F401
+
+    HAVE_CAIRO = True
+except (ImportError, OSError):
+    HAVE_CAIRO = False
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"><circle cx="5" cy="5" r="4"/></svg>'
+
+
+def symbology(base_url):
+    data = {
+        "data": [
+            {"symbol": "{W}", "represents_mana": True, "appears_in_mana_costs": True, "svg_uri": f"{base_url}/W.svg"},
+            {
+                "symbol": "{W/U}",
+                "represents_mana": True,
+                "appears_in_mana_costs": True,
+                "svg_uri": f"{base_url}/WU.svg",
+            },
+            {
+                "symbol": "{T}",
+                "represents_mana": False,
+                "appears_in_mana_costs": False,
+                "svg_uri": f"{base_url}/T.svg",
+            },
+        ]
+    }
+
+    def route(headers):
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {}, b""
+        return 200, {"ETag": '"v1"', "Content-Type": "application/json"}, json.dumps(data).encode()
+
+    return route
+
+
+def svg_route(headers):
+    return 200, {"Content-Type": "image/svg+xml"}, SVG
+
+
+def write_cached_pngs(symbol_cache_dir, *names):
+    os.makedirs(symbol_cache_dir, exist_ok=True)
+    for name in names:
+        Image.new("RGB", (4, 4), "white").save(os.path.join(symbol_cache_dir, name), "PNG")
+
+
+class TestSymbolHandler(unittest.TestCase):
+    def make_server(self):
+        server = StubServer({})
+        server.routes.update({"/symbology": symbology(server.url), "/W.svg": svg_route, "/WU.svg": svg_route})
+        return server
+
+    def test_warm_run_makes_no_requests(self):
+        write_cached_pngs("symbols", "W.png", "W_U.png")
+        with self.make_server() as server:
+            fetch_symbols("symbols", fetch_delay=0, symbology_url=f"{server.url}/symbology")
+            self.assertEqual(len(server.requests), 1)
+
+            symbol_map = fetch_symbols("symbols", fetch_delay=0, symbology_url=f"{server.url}/symbology")
+            self.assertEqual(len(server.requests), 1)
+
+        self.assertEqual(
+            symbol_map, {"W": os.path.join("symbols", "W.png"), "W/U": os.path.join("symbols", "W_U.png")}
+        )
+        self.assertTrue(os.path.exists(os.path.join("symbols", MANIFEST_NAME)))
+
+    def test_revalidation_is_conditional(self):
+        write_cached_pngs("symbols", "W.png", "W_U.png")
+        with self.make_server() as server:
+            url = f"{server.url}/symbology"
+            fetch_symbols("symbols", fetch_delay=0, symbology_url=url)
+            fetch_symbols("symbols", fetch_delay=0, symbology_url=url, revalidate=True)
+            fetch_symbols("symbols", fetch_delay=0, symbology_url=url, ttl=-1)
+
+        paths = [path for _, path, _ in server.requests]
+        self.assertEqual(paths, ["/symbology"] * 3)
+        self.assertEqual(server.requests[1][2].get("If-None-Match"), '"v1"')
+
+    def test_offline_uses_cached_symbols(self):
+        write_cached_pngs("symbols", "W.png", "W_U.png")
+        symbol_map = fetch_symbols("symbols", revalidate=True, symbology_url="http://127.0.0.1:9/symbology")
+        self.assertEqual(set(symbol_map), {"W", "W/U"})
+
+    def test_vector_symbols_are_cached_as_svg(self):
+        write_cached_pngs("symbols", "W.png", "W_U.png")
+        with self.make_server() as server:
+            # svglib can't convert this one, but it's still cached, so it isn't downloaded again.
+            server.routes["/WU.svg"] = lambda headers: (200, {"Content-Type": "image/svg+xml"}, b"<svg")
+            url = f"{server.url}/symbology"
+            symbol_map = fetch_symbols("symbols", fetch_delay=0, symbology_url=url, symbol_format="vector")
+            self.assertEqual(
+                symbol_map, {"W": os.path.join("symbols", "W.svg"), "W/U": os.path.join("symbols", "W_U.svg")}
+            )
+            fetch_symbols("symbols", fetch_delay=0, symbology_url=url, symbol_format="vector")
+
+        self.assertEqual(sorted(path for _, path, _ in server.requests), ["/W.svg", "/WU.svg", "/symbology"])
+        with self.assertLogs(level="WARNING"):
+            icons = load_mana_icons(symbol_map)
+        self.assertEqual(list(icons), ["W"])
+        self.assertIsInstance(icons["W"], VectorSymbol)
+        self.assertEqual(icons["W"].drawing.width, icons["W"].drawing.height)
+
+    @unittest.skipUnless(HAVE_CAIRO, "cairosvg needs the cairo library")
+    def test_cold_run_rasterizes_missing_symbols(self):
+        write_cached_pngs("symbols", "W.png")
+        with self.make_server() as server:
+            symbol_map = fetch_symbols("symbols", fetch_delay=0, symbology_url=f"{server.url}/symbology")
+
+        self.assertEqual([path for _, path, _ in server.requests], ["/symbology", "/WU.svg"])
+        self.assertEqual(Image.open(symbol_map["W/U"]).format, "PNG")
+
+
+if __name__ == "__main__":
+    unittest.main()
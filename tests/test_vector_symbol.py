@@ -0,0 +1,83 @@
+import pickle
+import re
+import unittest
+from io import BytesIO
+
+from lxml import etree
+from reportlab.pdfgen import canvas
+
+from cube_list_printer.vector_symbol import VectorSymbol, fold_opacity
+
+SVG_NS = 'xmlns="http://www.w3.org/2000/svg"'
+# Symbols built the way Scryfall's are: a coloured disc, or two half discs for hybrids, under dark glyphs.
+HYBRID_WU = f"""<svg {SVG_NS} viewBox="0 0 100 100">
+<path fill="#F0F2C0" d="M14.6 14.6A50 50 0 0 0 85.4 85.4Z"/>
+<path fill="#A9E0F9" d="M85.4 85.4A50 50 0 0 0 14.6 14.6Z"/>
+<path fill="#0D0F0F" d="M30 20l5 15h15l-12 9 5 15-13-9-13 9 5-15-12-9h15z"/>
+<path fill="#0D0F0F" d="M60 55c10 0 15 8 15 18s-5 17-15 17-15-7-15-17 5-18 15-18z"/>
+</svg>""".encode()
+PHYREXIAN_W = f"""<svg {SVG_NS} viewBox="0 0 600 600">
+<defs><clipPath id="disc"><circle cx="300" cy="300" r="300"/></clipPath></defs>
+<g clip-path="url(#disc)"><rect width="600" height="600" fill="#F0F2C0"/></g>
+<path fill="none" stroke="#0D0F0F" stroke-width="40" stroke-linecap="round" stroke-linejoin="round"
+ d="M300 120v360M180 300a120 120 0 0 1 240 0"/>
+</svg>""".encode()
+SHADED_C = f"""<svg {SVG_NS} width="32" height="32" viewBox="0 0 32 32">
+<circle cx="16" cy="16.5" r="15.5" fill="#000" opacity=".4"/>
+<g opacity="0.5"><circle cx="16" cy="16" r="15" fill="#CAC5C0" fill-opacity=".5"/></g>
+<path style="fill:#0D0F0F;opacity:50%" d="M16 6a10 10 0 1 0 0 20 10 10 0 1 0 0-20z"/>
+</svg>""".encode()
+
+
+def draw_page(symbol):
+    buf = BytesIO()
+    c = canvas.Canvas(buf, pageCompression=0)
+    symbol.draw(c, 10)
+    c.save()
+    return buf.getvalue()
+
+
+class TestVectorSymbol(unittest.TestCase):
+    def test_scryfall_symbols_are_drawn_as_paths(self):
+        for svg in (HYBRID_WU, PHYREXIAN_W, SHADED_C):
+            with self.subTest(svg=svg[:60]):
+                symbol = VectorSymbol(svg)
+                self.assertEqual(symbol.drawing.width, symbol.drawing.height)
+                pdf = draw_page(symbol)
+                self.assertNotIn(b"/Subtype /Image", pdf)
+                self.assertEqual(pickle.loads(pickle.dumps(symbol)), symbol)
+
+        phyrexian = draw_page(VectorSymbol(PHYREXIAN_W))
+        self.assertIn(b" W n", phyrexian)
+        self.assertIn(b"1 J", phyrexian)
+        self.assertIn(b"1 j", phyrexian)
+
+    def test_opacity_is_kept(self):
+        pdf = draw_page(VectorSymbol(SHADED_C))
+        self.assertEqual(set(re.findall(rb"/ca ([\d.]+)", pdf)), {b".4", b".25", b".5"})
+
+    def test_opacity_folds_into_fill_and_stroke_opacity(self):
+        root = etree.fromstring(SHADED_C)
+        fold_opacity(root)
+        shadow, group, glyph = root
+        self.assertEqual((shadow.get("fill-opacity"), shadow.get("opacity")), ("0.4", None))
+        self.assertEqual(group[0].get("fill-opacity"), "0.25")
+        self.assertEqual(group[0].get("stroke-opacity"), "0.5")
+        self.assertEqual((glyph.get("fill-opacity"), glyph.get("style")), ("0.5", "fill:#0D0F0F"))
+
+    def test_symbols_are_centred(self):
+        wide = VectorSymbol(f'<svg {SVG_NS} viewBox="0 0 200 100"><rect width="200" height="100"/></svg>'.encode())
+        buf = BytesIO()
+        c = canvas.Canvas(buf, pageCompression=0)
+        wide.draw(c, 10)
+        c.save()
+        self.assertIn(b".066667 0 0 .066667 0 2.5 cm", buf.getvalue())
+
+    def test_invalid_documents_are_rejected(self):
+        for data in (b"<svg", b"<html/>", f"<svg {SVG_NS}/>".encode()):
+            with self.subTest(data=data), self.assertRaises(ValueError):
+                VectorSymbol(data)
+
+
+if __name__ == "__main__":
+    unittest.main()